@@ -3,7 +3,14 @@ from .core.config import load_config, apply_overrides
 from .core.db import init_db
 from .services.sms_retry import start_sms_retry_loop
 from .services.password_expiry import start_password_expiry_loop
-from .adapters.ldap_client import LDAPClient
+from .services.directory_sync import start_directory_sync_loop
+from .services.ou_tree import start_ou_tree_loop
+from .services.job_worker import start_job_workers
+from .services.audit_retention import start_audit_maintenance_loop
+from .services.audit_writer import start_audit_writer
+from .services.audit_stats import start_rollup_fold_loop
+from .adapters.ldap_client import ldap_client_from_config
+from .adapters.ldap_schema import load_directory_info
 from .services.config_service import get_config
 from .api.routes import api_bp
 
@@ -11,11 +18,21 @@ from .api.routes import api_bp
 def create_app() -> Flask:
     app = Flask(__name__)
     app.config.update(load_config())
+    if app.config.get("LDAP_URL") and app.config.get("LDAP_SCHEMA_CACHE_FILE"):
+        load_directory_info(app.config["LDAP_URL"], app.config["LDAP_SCHEMA_CACHE_FILE"])
     if app.config.get("DB_URL"):
         init_db(app.config["DB_URL"])
         overrides = get_config(app.config["DB_URL"])
         if overrides:
             apply_overrides(app.config, overrides)
+        if app.config.get("AUDIT_ASYNC_ENABLE"):
+            start_audit_writer(
+                db_url=app.config["DB_URL"],
+                queue_size=app.config["AUDIT_QUEUE_SIZE"],
+                batch_size=app.config["AUDIT_BATCH_SIZE"],
+                flush_interval_ms=app.config["AUDIT_FLUSH_INTERVAL_MS"],
+                spool_dir=app.config["AUDIT_SPOOL_DIR"],
+            )
         if app.config.get("SMS_AUTO_RETRY"):
             start_sms_retry_loop(
                 db_url=app.config["DB_URL"],
@@ -27,13 +44,7 @@ def create_app() -> Flask:
             )
         if app.config.get("PASSWORD_EXPIRY_ENABLE"):
             start_password_expiry_loop(
-                ldap_client_factory=lambda: LDAPClient(
-                    url=app.config["LDAP_URL"],
-                    bind_dn=app.config["LDAP_BIND_DN"],
-                    bind_password=app.config["LDAP_BIND_PASSWORD"],
-                    base_dn=app.config["LDAP_BASE_DN"],
-                    ca_cert=app.config["LDAP_CA_CERT"],
-                ),
+                ldap_client_factory=lambda: ldap_client_from_config(app.config),
                 db_url=app.config["DB_URL"],
                 days_value=app.config["PASSWORD_EXPIRY_DAYS"],
                 interval_seconds=app.config["PASSWORD_EXPIRY_CHECK_INTERVAL"],
@@ -41,9 +52,46 @@ def create_app() -> Flask:
                 aliyun_access_key_secret=app.config["ALIYUN_ACCESS_KEY_SECRET"],
                 aliyun_sign_name=app.config["ALIYUN_SMS_SIGN_NAME"],
                 aliyun_template_code=app.config["ALIYUN_SMS_TEMPLATE_NOTIFY"],
+                use_mirror=app.config["DIRECTORY_READ_SOURCE"] == "mirror",
+            )
+        if app.config.get("DIRECTORY_SYNC_ENABLE"):
+            start_directory_sync_loop(
+                ldap_client_factory=lambda: ldap_client_from_config(app.config),
+                db_url=app.config["DB_URL"],
+                interval_seconds=app.config["DIRECTORY_SYNC_INTERVAL"],
+                full_interval_seconds=app.config["DIRECTORY_SYNC_FULL_INTERVAL"],
             )
         app.config["SMS_RETRY_LOOP_STARTED"] = app.config.get("SMS_AUTO_RETRY", False)
         app.config["EXPIRY_LOOP_STARTED"] = app.config.get("PASSWORD_EXPIRY_ENABLE", False)
+        start_audit_maintenance_loop(
+            db_url=app.config["DB_URL"],
+            interval_seconds=app.config["AUDIT_MAINTENANCE_INTERVAL"],
+            months_ahead=app.config["AUDIT_PARTITION_MONTHS_AHEAD"],
+            retention_months=app.config["AUDIT_RETENTION_MONTHS"],
+            archive_dir=app.config["AUDIT_ARCHIVE_DIR"],
+        )
+        start_rollup_fold_loop(
+            db_url=app.config["DB_URL"],
+            interval_seconds=max(app.config["AUDIT_ROLLUP_INTERVAL"], 1),
+        )
+        if app.config.get("JOBS_ENABLE") and app.config.get("JOB_WORKER_THREADS", 0) > 0:
+            start_job_workers(
+                db_url=app.config["DB_URL"],
+                config_factory=lambda: app.config,
+                threads=app.config["JOB_WORKER_THREADS"],
+                poll_interval=app.config["JOB_POLL_INTERVAL"],
+                stale_seconds=app.config["JOB_STALE_SECONDS"],
+                max_attempts=app.config["JOB_MAX_ATTEMPTS"],
+            )
+            app.config["JOB_WORKERS_STARTED"] = True
+        app.config["DIRECTORY_SYNC_LOOP_STARTED"] = app.config.get("DIRECTORY_SYNC_ENABLE", False)
+    if app.config.get("OU_TREE_ENABLE") and app.config.get("LDAP_URL"):
+        start_ou_tree_loop(
+            ldap_client_factory=lambda: ldap_client_from_config(app.config),
+            interval_seconds=app.config["OU_TREE_REFRESH_INTERVAL"],
+            count_interval_seconds=app.config["OU_TREE_COUNT_INTERVAL"],
+        )
+        app.config["OU_TREE_LOOP_STARTED"] = True
 
     app.register_blueprint(api_bp, url_prefix="/api")
     return app
@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+# Assumed latency for a DC that has not answered anything yet.
+DEFAULT_LATENCY = 0.05
+
+
+class _DCState:
+    __slots__ = ("url", "latency", "error_rate", "failures", "open_until", "samples", "requests", "errors")
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.samples: deque = deque(maxlen=200)
+        self.requests = 0
+        self.errors = 0
+
+
+class DCBalancer:
+    def __init__(
+        self,
+        urls: Iterable[str],
+        *,
+        failure_threshold: int = 3,
+        open_seconds: int = 30,
+        alpha: float = 0.2,
+    ) -> None:
+        self._states = {url: _DCState(url) for url in urls}
+        self.failure_threshold = max(failure_threshold, 1)
+        self.open_seconds = open_seconds
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> list[str]:
+        return list(self._states)
+
+    def candidates(self, exclude: Iterable[str] = ()) -> list[str]:
+        # Healthy DCs in weighted-random order (Efraimidis-Spirakis), then open circuits by
+        # reopen time as a last resort, so a fully "open" cluster is still tried.
+        skip = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            states = [s for s in self._states.values() if s.url not in skip]
+            closed = [s for s in states if s.open_until <= now]
+            opened = sorted((s for s in states if s.open_until > now), key=lambda s: s.open_until)
+            keyed = [(random.random() ** (1.0 / self._weight(s)), s.url) for s in closed]
+        keyed.sort(reverse=True)
+        return [url for _, url in keyed] + [s.url for s in opened]
+
+    def choose(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        candidates = self.candidates(exclude)
+        return candidates[0] if candidates else None
+
+    def preferred(self) -> Optional[str]:
+        # First DC in configured order whose circuit is closed: stable across calls, unlike choose().
+        now = time.monotonic()
+        with self._lock:
+            for state in self._states.values():
+                if state.open_until <= now:
+                    return state.url
+        return self.choose()
+
+    def record_success(self, url: str, latency: Optional[float] = None) -> None:
+        # latency is None for operations whose duration says nothing about the DC (e.g. streamed scans).
+        with self._lock:
+            state = self._states.get(url)
+            if state is None:
+                return
+            state.requests += 1
+            state.error_rate *= 1 - self.alpha
+            state.failures = 0
+            state.open_until = 0.0
+            if latency is None:
+                return
+            state.latency = latency if state.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * state.latency
+            )
+            state.samples.append(latency)
+
+    def record_failure(self, url: str) -> None:
+        with self._lock:
+            state = self._states.get(url)
+            if state is None:
+                return
+            state.requests += 1
+            state.errors += 1
+            state.error_rate = self.alpha + (1 - self.alpha) * state.error_rate
+            state.failures += 1
+            if state.failures >= self.failure_threshold:
+                # Half-open once this passes: the next request is a probe, and one more failure reopens it.
+                state.open_until = time.monotonic() + self.open_seconds
+
+    def p95(self, url: str) -> Optional[float]:
+        with self._lock:
+            state = self._states.get(url)
+            samples = sorted(state.samples) if state else []
+        if len(samples) < 20:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            states = list(self._states.values())
+            return [
+                {
+                    "url": s.url,
+                    "latency_ms": round(s.latency * 1000, 1) if s.latency is not None else None,
+                    "error_rate": round(s.error_rate, 3),
+                    "requests": s.requests,
+                    "errors": s.errors,
+                    "circuit_open": s.open_until > now,
+                }
+                for s in states
+            ]
+
+    def _weight(self, state: _DCState) -> float:
+        latency = state.latency if state.latency is not None else DEFAULT_LATENCY
+        return 1.0 / (max(latency, 0.001) * (1.0 + 10.0 * state.error_rate))
+
+
+_balancers: dict[tuple, DCBalancer] = {}
+_balancers_lock = threading.Lock()
+
+
+def get_balancer(urls: Iterable[str], **options) -> DCBalancer:
+    # Health is learned per worker process and shared by all short-lived client instances.
+    key = tuple(dict.fromkeys(urls))
+    with _balancers_lock:
+        balancer = _balancers.get(key)
+        if balancer is None:
+            balancer = DCBalancer(key, **options)
+            _balancers[key] = balancer
+        return balancer
@@ -1,15 +1,39 @@
 import logging
+import os
 import ssl
-from datetime import datetime, timedelta, timezone
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
 
-from ldap3 import Server, Connection, ALL, BASE, MODIFY_REPLACE, Tls
-from ldap3.core.exceptions import LDAPException
+from ldap3 import Server, Connection, ALL, BASE, MODIFY_REPLACE, NONE, SIMPLE, SUBTREE, Tls
+from ldap3.abstract.entry import Entry
+from ldap3.core.exceptions import LDAPBindError, LDAPException
+from ldap3.utils.conv import escape_filter_chars
 
+from ..core.cache import TTLCache, get_cache
 from ..core.errors import ADConnectionError, ADAuthError
+from .ldap_balancer import DCBalancer, get_balancer
+from .ldap_controls import decode_vlv_response, sort_control, vlv_control
+from .ldap_pool import LDAPConnectionPool, get_pool
+from .ldap_records import (
+    TICKS_PER_DAY,
+    UserRecord,
+    filetime_datetime,
+    now_filetime,
+    raw_entries,
+    raw_guid,
+    raw_int,
+    raw_text,
+    valid_filetime,
+)
+from .ldap_schema import DirectoryInfo, get_directory_info
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class LDAPClient:
     def __init__(
@@ -21,116 +45,400 @@ class LDAPClient:
         ca_cert: str,
         tls_verify: bool = True,
         tls_allow_weak: bool = False,
+        pool_size: int = 5,
+        pool_max_age: int = 600,
+        pool_max_idle: int = 120,
+        schema_cache_ttl: int = 86400,
+        schema_cache_file: str = "",
+        page_size: int = 500,
+        dn_cache_size: int = 10000,
+        dn_cache_ttl: int = 300,
+        fast_bind: bool = True,
+        auth_pool_size: int = 3,
+        circuit_failures: int = 3,
+        circuit_open_seconds: int = 30,
+        hedge: bool = False,
+        hedge_max_ms: int = 1000,
+        admin_cache_ttl: int = 60,
+        policy_cache_ttl: int = 600,
     ) -> None:
+        # LDAP_URL may list several DCs of the same domain, separated by commas. Repeats are
+        # dropped: hedging and the circuit breaker assume one entry per DC.
         self.url = url
+        self.urls = list(dict.fromkeys(u.strip() for u in url.split(",") if u.strip()))
         self.bind_dn = bind_dn
         self.bind_password = bind_password
         self.base_dn = base_dn
         self.ca_cert = ca_cert
         self.tls_verify = tls_verify
         self.tls_allow_weak = tls_allow_weak
+        self.pool_size = pool_size
+        self.pool_max_age = pool_max_age
+        self.pool_max_idle = pool_max_idle
+        self.schema_cache_ttl = schema_cache_ttl
+        self.schema_cache_file = schema_cache_file
+        self.page_size = page_size
+        self.dn_cache_size = dn_cache_size
+        self.dn_cache_ttl = dn_cache_ttl
+        self.fast_bind = fast_bind
+        self.auth_pool_size = auth_pool_size
+        self.circuit_failures = circuit_failures
+        self.circuit_open_seconds = circuit_open_seconds
+        self.hedge = hedge
+        self.hedge_max_ms = hedge_max_ms
+        self.admin_cache_ttl = admin_cache_ttl
+        self.policy_cache_ttl = policy_cache_ttl
+        self._pinned_url: Optional[str] = None
 
-    def _server(self) -> Server:
-        tls = None
-        if self.url.lower().startswith("ldaps") and self.ca_cert:
+    def _tls(self, url: str) -> Optional[Tls]:
+        if url.lower().startswith("ldaps") and self.ca_cert:
             validate = ssl.CERT_REQUIRED if self.tls_verify else ssl.CERT_NONE
             ciphers = "DEFAULT:@SECLEVEL=0" if self.tls_allow_weak else None
-            tls = Tls(validate=validate, ca_certs_file=self.ca_cert, ciphers=ciphers)
-        return Server(self.url, get_info=ALL, tls=tls)
+            return Tls(validate=validate, ca_certs_file=self.ca_cert, ciphers=ciphers)
+        return None
+
+    def _server(self, url: str) -> Server:
+        # All DCs of the domain share one schema, so it is cached under the configured LDAP_URL.
+        info, schema = get_directory_info(
+            self.url,
+            lambda: self._fetch_directory_info(url),
+            ttl=self.schema_cache_ttl,
+            cache_file=self.schema_cache_file,
+        )
+        server = Server(url, get_info=NONE, tls=self._tls(url))
+        if info is not None and schema is not None:
+            # Same as Server.from_definition(), which does not accept a Tls object.
+            server._dsa_info = info
+            server._schema_info = schema
+        return server
+
+    def _fetch_directory_info(self, url: str) -> DirectoryInfo:
+        server = Server(url, get_info=ALL, tls=self._tls(url))
+        try:
+            conn = Connection(server, user=self.bind_dn, password=self.bind_password, auto_bind=True)
+        except LDAPException as exc:
+            raise ADConnectionError(str(exc)) from exc
+        conn.unbind()
+        return server.info, server.schema
 
-    def _service_conn(self) -> Connection:
+    def _service_bind(self, url: str) -> Connection:
         try:
-            conn = Connection(self._server(), user=self.bind_dn, password=self.bind_password, auto_bind=True)
+            conn = Connection(self._server(url), user=self.bind_dn, password=self.bind_password, auto_bind=True)
         except LDAPException as exc:
-            logger.error("AD service bind failed: bind_dn=%s error=%s", self.bind_dn, exc)
+            logger.error("AD service bind failed: url=%s bind_dn=%s error=%s", url, self.bind_dn, exc)
             raise ADConnectionError(str(exc)) from exc
         return conn
 
+    def _balancer(self) -> DCBalancer:
+        return get_balancer(
+            self.urls,
+            failure_threshold=self.circuit_failures,
+            open_seconds=self.circuit_open_seconds,
+        )
+
+    def _pool(self, url: str) -> LDAPConnectionPool:
+        # One pool per worker process, DC and service identity, shared by all client instances.
+        key = (url, self.bind_dn, self.bind_password, self.ca_cert, self.tls_verify, self.tls_allow_weak)
+        return get_pool(
+            key,
+            lambda: self._service_bind(url),
+            size=self.pool_size,
+            max_age=self.pool_max_age,
+            max_idle=self.pool_max_idle,
+        )
+
+    def _candidates(self) -> list[str]:
+        if self._pinned_url:
+            return [self._pinned_url]
+        return self._balancer().candidates()
+
+    def pin(self, url: Optional[str] = None) -> str:
+        # Keep every later operation of this client on one DC: USNs are per DC, and AD
+        # replication means a write on one DC is not immediately visible on the others.
+        if url:
+            self._pinned_url = url
+        elif not self._pinned_url:
+            self._pinned_url = self._balancer().preferred()
+        return self._pinned_url
+
+    @contextmanager
+    def _dc_conn(
+        self,
+        url: Optional[str] = None,
+        *,
+        write: bool = False,
+        timed: bool = True,
+        pooled: bool = True,
+    ) -> Iterator[tuple[str, Connection]]:
+        balancer = self._balancer()
+        urls = [url] if url else self._candidates()
+        try:
+            with ExitStack() as stack:
+                conn = None
+                error: Optional[Exception] = None
+                for url in urls:
+                    try:
+                        source = self._pool(url).connection() if pooled else self._unpooled_conn(url)
+                        conn = stack.enter_context(source)
+                        break
+                    except (ADConnectionError, LDAPException) as exc:
+                        balancer.record_failure(url)
+                        logger.warning("AD DC unavailable: url=%s error=%s", url, exc)
+                        error = exc
+                if conn is None:
+                    raise ADConnectionError(str(error or "no domain controller available"))
+                if write and not self._pinned_url:
+                    self.pin(url)
+                started = time.monotonic()
+                yield url, conn
+                balancer.record_success(url, time.monotonic() - started if timed else None)
+        except LDAPException as exc:
+            balancer.record_failure(url)
+            logger.error("AD service connection failed: url=%s bind_dn=%s error=%s", url, self.bind_dn, exc)
+            raise ADConnectionError(str(exc)) from exc
+
+    @contextmanager
+    def _unpooled_conn(self, url: str) -> Iterator[Connection]:
+        # For scans whose pace is set by a slow consumer: holding a pooled connection that long
+        # would starve logins and other short reads of the small per-DC pool.
+        conn = self._service_bind(url)
+        try:
+            yield conn
+        finally:
+            try:
+                conn.unbind()
+            except LDAPException:
+                pass
+
+    @contextmanager
+    def _service_conn(self, url: Optional[str] = None, *, write: bool = False) -> Iterator[Connection]:
+        with self._dc_conn(url, write=write) as (_, conn):
+            yield conn
+
+    def _read(self, fn: Callable[[Connection], T]) -> T:
+        # Single read-only searches; hedged to a second DC when the first is slower than its p95.
+        if not self.hedge or self._pinned_url or len(self.urls) < 2:
+            with self._service_conn() as conn:
+                return fn(conn)
+        primary, secondary = self._balancer().candidates()[:2]
+        executor = _hedge_executor()
+        first = executor.submit(self._read_on, primary, fn)
+        delay = self._hedge_delay(primary)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            logger.info("AD hedged read: slow=%s hedge=%s delay_ms=%d", primary, secondary, delay * 1000)
+        except ADConnectionError as exc:
+            logger.warning("AD read failed, retrying on another DC: url=%s error=%s", primary, exc)
+            return self._read_on(secondary, fn)
+        second = executor.submit(self._read_on, secondary, fn)
+        error: Optional[Exception] = None
+        for future in as_completed([first, second]):
+            try:
+                return future.result()
+            except ADConnectionError as exc:
+                error = exc
+        raise error
+
+    def _read_on(self, url: str, fn: Callable[[Connection], T]) -> T:
+        with self._service_conn(url) as conn:
+            return fn(conn)
+
+    def _hedge_delay(self, url: str) -> float:
+        limit = self.hedge_max_ms / 1000
+        p95 = self._balancer().p95(url)
+        if p95 is None:
+            return limit
+        return min(max(p95, 0.02), limit)
+
+    def _dn_cache(self) -> TTLCache:
+        return get_cache(
+            "ldap_user_dn",
+            (self.url, self.base_dn),
+            maxsize=self.dn_cache_size,
+            ttl=self.dn_cache_ttl,
+        )
+
+    def _group_cache(self) -> TTLCache:
+        return get_cache("ldap_group_members", (self.url,), maxsize=64, ttl=self.admin_cache_ttl)
+
     def get_user_dn(self, username: str) -> Optional[str]:
-        conn = self._service_conn()
-        search_filter = f"(sAMAccountName={username})"
-        if not conn.search(self.base_dn, search_filter, attributes=["distinguishedName"]):
-            logger.warning("AD search user dn failed: username=%s result=%s", username, conn.result)
-            return None
-        if not conn.entries:
+        cache = self._dn_cache()
+        # sAMAccountName is case-insensitive in AD.
+        cached = cache.get(username.lower())
+        if cached:
+            return cached
+
+        def search(conn: Connection) -> Optional[str]:
+            search_filter = f"(sAMAccountName={escape_filter_chars(username)})"
+            if not conn.search(self.base_dn, search_filter, attributes=["distinguishedName"]):
+                logger.warning("AD search user dn failed: username=%s result=%s", username, conn.result)
+                return None
+            if not conn.entries:
+                return None
+            return str(conn.entries[0].entry_dn)
+
+        user_dn = self._read(search)
+        if not user_dn:
             return None
-        return str(conn.entries[0].entry_dn)
+        cache.set(username.lower(), user_dn)
+        return user_dn
+
+    def existing_usernames(self, usernames: Iterable[str], chunk_size: int = 200) -> set[str]:
+        # One OR-filter search per chunk instead of a lookup per name; returns lowercased names.
+        # No objectClass clause: groups and computers share the sAMAccountName namespace.
+        names = list(dict.fromkeys(u.lower() for u in usernames if u))
+        found: set[str] = set()
+        cache = self._dn_cache()
+        for start in range(0, len(names), chunk_size):
+            terms = "".join(f"(sAMAccountName={escape_filter_chars(n)})" for n in names[start : start + chunk_size])
+            search_filter = f"(|{terms})"
+            for item in self._paged_search(self.base_dn, search_filter, ["sAMAccountName"], raw=True):
+                name = raw_text(item.get("raw_attributes") or {}, "sAMAccountName")
+                if name:
+                    found.add(name.lower())
+                    cache.set(name.lower(), item["dn"])
+        return found
+
+    def existing_dns(self, dns: Iterable[str]) -> set[str]:
+        # Base-scope reads on one connection; returns the lowercased DNs that exist.
+        def search(conn: Connection) -> set[str]:
+            found = set()
+            for dn in dict.fromkeys(dns):
+                if dn and conn.search(dn, "(objectClass=*)", search_scope=BASE, attributes=["1.1"]):
+                    found.add(dn.lower())
+            return found
+
+        return self._read(search)
+
+    def cache_stats(self) -> dict:
+        return {
+            "dn": self._dn_cache().stats(),
+            "group_members": self._group_cache().stats(),
+            "password_policy": self._policy_cache().stats(),
+            "pools": {url: self._pool(url).stats() for url in self.urls},
+            "dcs": self._balancer().stats(),
+        }
 
     def authenticate_user(self, username: str, password: str) -> bool:
         user_dn = self.get_user_dn(username)
         if not user_dn:
             return False
-        try:
-            conn = Connection(self._server(), user=user_dn, password=password, auto_bind=True)
-            conn.unbind()
-            return True
-        except LDAPException as exc:
-            logger.warning("AD user bind failed: username=%s dn=%s error=%s", username, user_dn, exc)
-            return False
+        return self._check_credentials(username, user_dn, password)
+
+    def login_user(self, username: str, password: str, admin_group_dn: str = "") -> Optional[dict]:
+        # One service search returns DN, profile and memberOf; then a single user bind checks the password.
+        def search(conn: Connection) -> Optional[UserRecord]:
+            search_filter = f"(sAMAccountName={escape_filter_chars(username)})"
+            if not conn.search(self.base_dn, search_filter, attributes=USER_INFO_ATTRIBUTES):
+                logger.warning("AD login search failed: username=%s result=%s", username, conn.result)
+                return None
+            items = raw_entries(conn.response)
+            return UserRecord.from_response(items[0]) if items else None
 
-    def get_user_info(self, username: str) -> Optional[dict]:
-        conn = self._service_conn()
-        search_filter = f"(sAMAccountName={username})"
-        if not conn.search(
-            self.base_dn,
-            search_filter,
-            attributes=[
-                "sAMAccountName",
-                "displayName",
-                "mail",
-                "mobile",
-                "department",
-                "title",
-                "memberOf",
-                "msDS-UserPasswordExpiryTimeComputed",
-                "userAccountControl",
-                "accountExpires",
-            ],
-        ):
+        record = self._read(search)
+        if record is None:
             return None
-        if not conn.entries:
+        user_dn = record.dn
+        self._dn_cache().set(username.lower(), user_dn)
+        if not self._check_credentials(username, user_dn, password):
             return None
-        entry = conn.entries[0]
-        expiry_raw = getattr(entry, "msDS-UserPasswordExpiryTimeComputed", None)
-        expiry_dt = _filetime_to_datetime(expiry_raw.value if expiry_raw else None)
-        days_left = None
-        expiry_date = None
-        if expiry_dt:
-            now = datetime.now(timezone.utc)
-            days_left = max((expiry_dt - now).days, 0)
-            expiry_date = expiry_dt.date().isoformat()
-        account_raw = getattr(entry, "accountExpires", None)
-        account_raw_value = account_raw.value if account_raw else None
-        account_dt = _filetime_to_datetime(account_raw_value)
-        if not account_dt and account_raw_value and str(account_raw_value).isdigit():
-            account_dt = _filetime_to_datetime(str(account_raw_value))
-        account_expiry_date = account_dt.date().isoformat() if account_dt else None
-        logger.info(
-            "AD accountExpires read: user=%s raw=%s parsed=%s",
-            username,
-            account_raw_value,
-            account_expiry_date,
+        info = _user_info(username, record, USER_INFO_FIELDS)
+        return {"user": info, "is_admin": self.is_dn_admin(user_dn, admin_group_dn)}
+
+    def _check_credentials(self, username: str, user_dn: str, password: str) -> bool:
+        if not password:
+            # AD treats a simple bind with an empty password as an anonymous bind that "succeeds".
+            return False
+        balancer = self._balancer()
+        for url in self._candidates():
+            if self.fast_bind and url not in _fast_bind_unsupported:
+                result = self._fast_bind_check(url, username, user_dn, password)
+                if result is not None:
+                    return result
+            try:
+                conn = Connection(self._server(url), user=user_dn, password=password, auto_bind=True)
+                conn.unbind()
+                return True
+            except LDAPBindError as exc:
+                logger.warning("AD user bind failed: username=%s dn=%s error=%s", username, user_dn, exc)
+                return False
+            except LDAPException as exc:
+                # The DC itself is unreachable; that says nothing about the password, so try the next one.
+                balancer.record_failure(url)
+                logger.warning("AD user bind unavailable: url=%s username=%s error=%s", url, username, exc)
+        return False
+
+    def _fast_bind_check(self, url: str, username: str, user_dn: str, password: str) -> Optional[bool]:
+        # Returns None when fast bind cannot be used, so the caller falls back to a full bind.
+        try:
+            with self._auth_pool(url).connection() as conn:
+                conn.user = user_dn
+                conn.password = password
+                try:
+                    ok = conn.bind(read_server_info=False)
+                finally:
+                    conn.password = None
+                if not ok:
+                    logger.warning(
+                        "AD user fast bind failed: username=%s dn=%s result=%s",
+                        username,
+                        user_dn,
+                        conn.result.get("description"),
+                    )
+                return bool(ok)
+        except (ADConnectionError, LDAPException) as exc:
+            logger.warning("AD fast bind unavailable: url=%s error=%s", url, exc)
+            return None
+
+    def _auth_pool(self, url: str) -> LDAPConnectionPool:
+        key = ("fast_bind", url, self.ca_cert, self.tls_verify, self.tls_allow_weak)
+        return get_pool(
+            key,
+            lambda: self._fast_bind_conn(url),
+            size=self.auth_pool_size,
+            max_age=self.pool_max_age,
+            max_idle=self.pool_max_idle,
+            require_bound=False,
         )
-        uac = getattr(entry, "userAccountControl", None)
-        uac_value = uac.value if uac else 0
-        pwd_never_expires = False
+
+    def _fast_bind_conn(self, url: str) -> Connection:
+        # LDAP_SERVER_FAST_BIND_OID: later simple binds on this socket only verify the password,
+        # without building a security token. SIMPLE is set up front because ldap3 refuses a
+        # user name on a connection created as ANONYMOUS.
+        conn = Connection(self._server(url), authentication=SIMPLE)
         try:
-            pwd_never_expires = bool(int(uac_value) & 0x10000)
-        except Exception:
-            pwd_never_expires = False
-        return {
-            "sAMAccountName": getattr(entry, "sAMAccountName", None).value,
-            "displayName": getattr(entry, "displayName", None).value,
-            "mail": getattr(entry, "mail", None).value,
-            "mobile": getattr(entry, "mobile", None).value,
-            "department": getattr(entry, "department", None).value,
-            "title": getattr(entry, "title", None).value,
-            "memberOf": getattr(entry, "memberOf", None).values if hasattr(entry, "memberOf") else [],
-            "days_left": days_left,
-            "password_expiry_date": expiry_date,
-            "account_expiry_date": account_expiry_date,
-            "password_never_expires": pwd_never_expires,
-        }
+            conn.open()
+            conn.extended(FAST_BIND_OID)
+        except LDAPException as exc:
+            raise ADConnectionError(str(exc)) from exc
+        result = conn.result or {}
+        if result.get("result") != 0:
+            conn.unbind()
+            if result.get("result") in _FAST_BIND_REJECTED:
+                # The DC does not offer fast bind at all; stop asking it on every login.
+                _fast_bind_unsupported.add(url)
+                logger.warning("AD fast bind not supported: url=%s result=%s", url, result)
+            else:
+                logger.warning("AD fast bind request failed: url=%s result=%s", url, result)
+            raise ADConnectionError(result.get("message") or "fast bind not supported")
+        return conn
+
+    def get_user_info(self, username: str, fields: Optional[Iterable[str]] = None) -> Optional[dict]:
+        fields = tuple(fields or USER_INFO_FIELDS)
+        attributes = user_attributes(fields)
+
+        def search(conn: Connection) -> Optional[UserRecord]:
+            search_filter = f"(sAMAccountName={escape_filter_chars(username)})"
+            if not conn.search(self.base_dn, search_filter, attributes=attributes):
+                return None
+            items = raw_entries(conn.response)
+            return UserRecord.from_response(items[0]) if items else None
+
+        record = self._read(search)
+        if record is None:
+            return None
+        return _user_info(username, record, fields)
 
     def is_user_admin(self, username: str, admin_group_dn: str) -> bool:
         if not admin_group_dn:
@@ -138,91 +446,104 @@ class LDAPClient:
         user_dn = self.get_user_dn(username)
         if not user_dn:
             return False
-        conn = self._service_conn()
-        # Check membership by querying the admin group entry directly.
-        if not conn.search(
-            admin_group_dn,
-            f"(member={user_dn})",
-            search_scope=BASE,
-            attributes=["member"],
-        ):
+        return self.is_dn_admin(user_dn, admin_group_dn)
+
+    def is_dn_admin(self, user_dn: str, admin_group_dn: str) -> bool:
+        if not admin_group_dn:
             return False
-        return bool(conn.entries)
+        return user_dn.lower() in self.get_group_members(admin_group_dn)
+
+    def get_group_members(self, group_dn: str) -> frozenset[str]:
+        # Lowercased DNs of every user in the group, nested groups included; cached briefly
+        # so role checks are a set lookup instead of a directory round trip.
+        cache = self._group_cache()
+        key = group_dn.lower()
+        members = cache.get(key)
+        if members is not None:
+            return members
+        # LDAP_MATCHING_RULE_IN_CHAIN expands the whole membership tree on the DC in one search.
+        # Rooted at the domain, not base_dn: members may live outside the managed OU.
+        search_filter = f"(&(objectClass=user)(memberOf:{IN_CHAIN_OID}:={escape_filter_chars(group_dn)}))"
+        items = self._paged_search(self._naming_context(), search_filter, ["1.1"], raw=True)
+        members = frozenset(item["dn"].lower() for item in items)
+        cache.set(key, members)
+        return members
+
+    def search_users(
+        self,
+        query: str = "",
+        ou_dn: str = "",
+        enabled: Optional[bool] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> list[dict]:
+        return list(self.iter_users(query=query, ou_dn=ou_dn, enabled=enabled, fields=fields))
 
-    def search_users(self, query: str = "", ou_dn: str = "", enabled: Optional[bool] = None) -> list[dict]:
-        conn = self._service_conn()
+    def iter_users(
+        self,
+        query: str = "",
+        ou_dn: str = "",
+        enabled: Optional[bool] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Iterator[dict]:
+        fields = tuple(fields or USER_LIST_FIELDS)
+        now = now_filetime()
+        for record in self.iter_user_records(query=query, ou_dn=ou_dn, enabled=enabled, fields=fields):
+            yield record.to_dict(fields, now)
+
+    def iter_user_records(
+        self,
+        query: str = "",
+        ou_dn: str = "",
+        enabled: Optional[bool] = None,
+        fields: Optional[Iterable[str]] = None,
+        stream: bool = False,
+    ) -> Iterator[UserRecord]:
+        # Compact records decoded from raw attributes; callers serialize only what they return.
+        # stream=True for consumers that hold the iterator open for long, e.g. a download.
         base = ou_dn or self.base_dn
-        # Only return person user objects; exclude computer/builtin accounts.
-        filter_parts = ["(objectClass=user)", "(objectClass=person)", "(!(objectClass=computer))"]
-        if query:
-            q = query.replace("*", "")
-            filter_parts.append(
-                f"(|(sAMAccountName=*{q}*)(displayName=*{q}*)(cn=*{q}*)(mail=*{q}*)(mobile=*{q}*))"
-            )
-        if enabled is True:
-            filter_parts.append("(!(userAccountControl:1.2.840.113556.1.4.803:=2))")
-        if enabled is False:
-            filter_parts.append("(userAccountControl:1.2.840.113556.1.4.803:=2)")
-        search_filter = f"(&{''.join(filter_parts)})"
-        conn.search(
-            base,
-            search_filter,
-            attributes=[
-                "sAMAccountName",
-                "displayName",
-                "mail",
-                "mobile",
-                "department",
-                "title",
-                "userAccountControl",
-                "msDS-UserPasswordExpiryTimeComputed",
-                "accountExpires",
-            ],
-        )
-        users = []
-        now = datetime.now(timezone.utc)
-        for entry in conn.entries:
-            uac = getattr(entry, "userAccountControl", None)
-            uac_value = uac.value if uac else 0
-            enabled_flag = True
-            try:
-                enabled_flag = not (int(uac_value) & 2)
-            except Exception:
-                enabled_flag = True
-            pwd_never_expires = False
-            try:
-                pwd_never_expires = bool(int(uac_value) & 0x10000)
-            except Exception:
-                pwd_never_expires = False
-            expiry_raw = getattr(entry, "msDS-UserPasswordExpiryTimeComputed", None)
-            expiry_dt = _filetime_to_datetime(expiry_raw.value if expiry_raw else None)
-            password_expiry_date = expiry_dt.date().isoformat() if expiry_dt else None
-            days_left = None
-            if expiry_dt:
-                days_left = max((expiry_dt - now).days, 0)
-            account_raw = getattr(entry, "accountExpires", None)
-            account_raw_value = account_raw.value if account_raw else None
-            account_dt = _filetime_to_datetime(account_raw_value)
-            if not account_dt and account_raw_value and str(account_raw_value).isdigit():
-                account_dt = _filetime_to_datetime(str(account_raw_value))
-            account_expiry_date = account_dt.date().isoformat() if account_dt else None
-            users.append(
-                {
-                    "dn": str(entry.entry_dn),
-                    "sAMAccountName": getattr(entry, "sAMAccountName", None).value,
-                    "displayName": getattr(entry, "displayName", None).value,
-                    "mail": getattr(entry, "mail", None).value,
-                    "mobile": getattr(entry, "mobile", None).value,
-                    "department": getattr(entry, "department", None).value,
-                    "title": getattr(entry, "title", None).value,
-                    "enabled": enabled_flag,
-                    "days_left": days_left,
-                    "password_expiry_date": password_expiry_date,
-                    "account_expiry_date": account_expiry_date,
-                    "password_never_expires": pwd_never_expires,
-                }
-            )
-        return users
+        search_filter = _user_filter(query, enabled)
+        attributes = user_attributes(fields or USER_LIST_FIELDS)
+        for item in self._paged_search(base, search_filter, attributes, raw=True, stream=stream):
+            yield UserRecord.from_response(item)
+
+    def search_users_page(
+        self,
+        query: str = "",
+        ou_dn: str = "",
+        enabled: Optional[bool] = None,
+        *,
+        offset: int = 0,
+        limit: int = 15,
+        sort: str = "displayName",
+        reverse: bool = False,
+        require_mobile: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Optional[tuple[list[dict], int]]:
+        # Server side sort + VLV: the DC returns only the requested window and the total count.
+        # Returns None when the DC refuses the controls so callers can fall back to a paged scan.
+        base = ou_dn or self.base_dn
+        search_filter = _user_filter(query, enabled, require_mobile=require_mobile)
+        controls = [sort_control(sort, reverse), vlv_control(offset + 1, limit)]
+        fields = tuple(fields or USER_LIST_FIELDS)
+        attributes = user_attributes(fields)
+
+        def search(conn: Connection) -> Optional[tuple[dict, list[dict]]]:
+            conn.search(base, search_filter, attributes=attributes, controls=controls)
+            vlv = decode_vlv_response(conn.result)
+            if vlv is None or vlv["result"] != 0:
+                logger.warning("AD VLV search unavailable: base=%s result=%s", base, conn.result)
+                return None
+            return vlv, raw_entries(conn.response)
+
+        found = self._read(search)
+        if found is None:
+            return None
+        vlv, items = found
+        total = vlv["content_count"]
+        if offset >= total:
+            return [], total
+        now = now_filetime()
+        return [UserRecord.from_response(item).to_dict(fields, now) for item in items[:limit]], total
 
     def create_user(
         self,
@@ -234,159 +555,284 @@ class LDAPClient:
         attributes: dict,
         force_change: bool = False,
     ) -> None:
-        conn = self._service_conn()
+        # One add carries the password, flags and pwdLastSet, so a rejected password never
+        # leaves a disabled half-created account behind (AD accepts unicodePwd on add over TLS).
         user_dn = f"CN={displayName},{ou_dn}"
         user_principal = f"{sAMAccountName}@{self._domain_from_base_dn()}"
+        attributes = dict(attributes)
+        uac = 0x200
+        if attributes.pop("password_never_expires", False):
+            uac |= 0x10000
         attrs = {
             "sAMAccountName": sAMAccountName,
             "displayName": displayName,
             "userPrincipalName": user_principal,
             "objectClass": ["top", "person", "organizationalPerson", "user"],
         }
-        if "password_never_expires" in attributes:
-            if attributes.get("password_never_expires"):
-                # Create as disabled user with "password never expires" flag set.
-                attrs["userAccountControl"] = 0x200 | 0x2 | 0x10000
-            attributes = {k: v for k, v in attributes.items() if k != "password_never_expires"}
-        attrs.update(attributes)
+        attrs.update({k: v for k, v in attributes.items() if v not in (None, "")})
         logger.info("AD create user attrs: dn=%s attrs=%s", user_dn, attrs)
-        if not conn.add(user_dn, attributes=attrs):
-            logger.error("AD create user failed: dn=%s result=%s", user_dn, conn.result)
-            raise ADConnectionError(conn.result.get("message", "add failed"))
-        logger.info("AD create user success: dn=%s result=%s", user_dn, conn.result)
-        self._set_password(conn, user_dn, password)
+        attrs["unicodePwd"] = f'"{password}"'.encode("utf-16-le")
+        attrs["userAccountControl"] = uac
         if force_change:
-            self._set_pwd_must_change(conn, user_dn)
-        self._set_enabled(conn, user_dn, True)
+            attrs["pwdLastSet"] = 0
+        with self._service_conn(write=True) as conn:
+            if not conn.add(user_dn, attributes=attrs):
+                logger.error("AD create user failed: dn=%s result=%s", user_dn, conn.result)
+                raise ADConnectionError(conn.result.get("message", "add failed"))
+            logger.info("AD create user success: dn=%s result=%s", user_dn, conn.result)
+        self._dn_cache().set(sAMAccountName.lower(), user_dn)
 
     def update_user(self, user_dn: str, changes: dict) -> None:
-        conn = self._service_conn()
-        if "password_never_expires" in changes:
-            current_uac = 512
-            conn.search(user_dn, "(objectClass=*)", attributes=["userAccountControl"])
-            if conn.entries:
-                current_uac = getattr(conn.entries[0], "userAccountControl", None).value or 512
-            try:
-                current_uac = int(current_uac)
-            except Exception:
+        with self._service_conn(write=True) as conn:
+            if "password_never_expires" in changes:
                 current_uac = 512
-            if changes["password_never_expires"]:
-                changes["userAccountControl"] = current_uac | 0x10000
-            else:
-                changes["userAccountControl"] = current_uac & ~0x10000
-            changes.pop("password_never_expires", None)
-        mod = {k: [(MODIFY_REPLACE, [v])] for k, v in changes.items()}
-        if not conn.modify(user_dn, mod):
-            logger.error("AD update user failed: dn=%s changes=%s result=%s", user_dn, changes, conn.result)
-            raise ADConnectionError(conn.result.get("message", "modify failed"))
-        logger.info("AD update user success: dn=%s result=%s", user_dn, conn.result)
+                conn.search(user_dn, "(objectClass=*)", attributes=["userAccountControl"])
+                if conn.entries:
+                    current_uac = getattr(conn.entries[0], "userAccountControl", None).value or 512
+                try:
+                    current_uac = int(current_uac)
+                except Exception:
+                    current_uac = 512
+                if changes["password_never_expires"]:
+                    changes["userAccountControl"] = current_uac | 0x10000
+                else:
+                    changes["userAccountControl"] = current_uac & ~0x10000
+                changes.pop("password_never_expires", None)
+            mod = {k: [(MODIFY_REPLACE, [v])] for k, v in changes.items()}
+            if not conn.modify(user_dn, mod):
+                logger.error("AD update user failed: dn=%s changes=%s result=%s", user_dn, changes, conn.result)
+                raise ADConnectionError(conn.result.get("message", "modify failed"))
+            logger.info("AD update user success: dn=%s result=%s", user_dn, conn.result)
 
     def set_user_enabled(self, user_dn: str, enabled: bool) -> None:
-        conn = self._service_conn()
-        self._set_enabled(conn, user_dn, enabled)
+        with self._service_conn(write=True) as conn:
+            self._set_enabled(conn, user_dn, enabled)
 
     def reset_password(self, user_dn: str, new_password: str, force_change: bool = False) -> None:
-        conn = self._service_conn()
-        self._set_password(conn, user_dn, new_password)
-        if force_change:
-            self._set_pwd_must_change(conn, user_dn)
-        logger.info("AD reset password success: dn=%s force_change=%s", user_dn, force_change)
+        with self._service_conn(write=True) as conn:
+            self._set_password(conn, user_dn, new_password)
+            if force_change:
+                self._set_pwd_must_change(conn, user_dn)
+            logger.info("AD reset password success: dn=%s force_change=%s", user_dn, force_change)
 
     def change_password(self, username: str, old_password: str, new_password: str) -> None:
         user_dn = self.get_user_dn(username)
         if not user_dn:
             raise ADConnectionError("user not found")
         try:
-            conn = Connection(self._server(), user=user_dn, password=old_password, auto_bind=True)
+            conn = Connection(self._server(self.pin()), user=user_dn, password=old_password, auto_bind=True)
         except LDAPException as exc:
             logger.warning("AD change password bind failed: username=%s dn=%s", username, user_dn)
             raise ADConnectionError("old password invalid") from exc
-        if not conn.extend.microsoft.modify_password(user_dn, new_password, old_password):
-            logger.error("AD change password failed: username=%s dn=%s result=%s", username, user_dn, conn.result)
-            raise ADConnectionError(conn.result.get("message", "change password failed"))
-        logger.info("AD change password success: username=%s dn=%s result=%s", username, user_dn, conn.result)
+        try:
+            if not conn.extend.microsoft.modify_password(user_dn, new_password, old_password):
+                logger.error("AD change password failed: username=%s dn=%s result=%s", username, user_dn, conn.result)
+                raise ADConnectionError(conn.result.get("message", "change password failed"))
+            logger.info("AD change password success: username=%s dn=%s result=%s", username, user_dn, conn.result)
+        finally:
+            conn.unbind()
 
     def delete_user(self, user_dn: str) -> None:
-        conn = self._service_conn()
-        if not conn.delete(user_dn):
-            raise ADConnectionError(conn.result.get("message", "delete failed"))
+        with self._service_conn(write=True) as conn:
+            if not conn.delete(user_dn):
+                raise ADConnectionError(conn.result.get("message", "delete failed"))
+        self._dn_cache().discard_where(lambda _, dn: dn.lower() == user_dn.lower())
 
     def move_user(self, user_dn: str, target_ou_dn: str) -> None:
-        conn = self._service_conn()
-        new_rdn = user_dn.split(",", 1)[0]
-        if not conn.modify_dn(user_dn, new_rdn, new_superior=target_ou_dn):
-            raise ADConnectionError(conn.result.get("message", "move failed"))
+        with self._service_conn(write=True) as conn:
+            new_rdn = user_dn.split(",", 1)[0]
+            if not conn.modify_dn(user_dn, new_rdn, new_superior=target_ou_dn):
+                raise ADConnectionError(conn.result.get("message", "move failed"))
+        cache = self._dn_cache()
+        for username, dn in cache.items():
+            if dn.lower() == user_dn.lower():
+                cache.set(username, f"{new_rdn},{target_ou_dn}")
 
     def list_ous(self, base_dn: str = "") -> list[dict]:
-        conn = self._service_conn()
+        return list(self.iter_ous(base_dn))
+
+    def iter_ous(self, base_dn: str = "") -> Iterator[dict]:
         base = base_dn or self.base_dn
-        conn.search(base, "(objectClass=organizationalUnit)", attributes=["ou", "description"])
-        ous = []
-        for entry in conn.entries:
-            ous.append(
-                {
-                    "dn": str(entry.entry_dn),
-                    "name": getattr(entry, "ou", None).value,
-                    "description": getattr(entry, "description", None).value,
-                }
-            )
-        return ous
+        for entry in self._paged_search(base, "(objectClass=organizationalUnit)", ["ou", "description"]):
+            yield {
+                "dn": str(entry.entry_dn),
+                "name": getattr(entry, "ou", None).value,
+                "description": getattr(entry, "description", None).value,
+            }
 
     def list_users_password_expiring(self, max_days: int) -> list[dict]:
-        conn = self._service_conn()
-        base = self.base_dn
+        return list(self.iter_users_password_expiring(max_days))
+
+    def iter_users_password_expiring(self, max_days: int) -> Iterator[dict]:
         search_filter = "(&(objectClass=user)(!(userAccountControl:1.2.840.113556.1.4.803:=2)))"
-        conn.search(
-            base,
-            search_filter,
-            attributes=[
-                "sAMAccountName",
-                "displayName",
-                "mail",
-                "mobile",
-                "msDS-UserPasswordExpiryTimeComputed",
-            ],
-        )
-        items = []
-        now = datetime.now(timezone.utc)
-        for entry in conn.entries:
-            expiry_raw = getattr(entry, "msDS-UserPasswordExpiryTimeComputed", None)
-            expiry_dt = _filetime_to_datetime(expiry_raw.value if expiry_raw else None)
-            if not expiry_dt:
+        attributes = [
+            "sAMAccountName",
+            "displayName",
+            "mail",
+            "mobile",
+            "msDS-UserPasswordExpiryTimeComputed",
+        ]
+        now = now_filetime()
+        # The caller sends a notification per user while iterating, so the scan gets its own connection.
+        for item in self._paged_search(self.base_dn, search_filter, attributes, raw=True, stream=True):
+            record = UserRecord.from_response(item)
+            if not valid_filetime(record.password_expiry):
                 continue
-            days_left = (expiry_dt - now).days
+            days_left = (record.password_expiry - now) // TICKS_PER_DAY
             if days_left < 0 or days_left > max_days:
                 continue
-            items.append(
-                {
-                    "sAMAccountName": getattr(entry, "sAMAccountName", None).value,
-                    "displayName": getattr(entry, "displayName", None).value,
-                    "mail": getattr(entry, "mail", None).value,
-                    "mobile": getattr(entry, "mobile", None).value,
-                    "days_left": days_left,
-                }
+            yield {
+                "sAMAccountName": record.sAMAccountName,
+                "displayName": record.displayName,
+                "mail": record.mail,
+                "mobile": record.mobile,
+                "days_left": days_left,
+            }
+
+    def get_sync_position(self) -> dict:
+        # Read the live rootDSE (not the cached schema copy): USNs are per DC and move constantly.
+        with self._service_conn() as conn:
+            conn.search("", "(objectClass=*)", search_scope=BASE, attributes=["highestCommittedUSN", "dsServiceName"])
+            if not conn.entries:
+                raise ADConnectionError("rootDSE unavailable")
+            entry = conn.entries[0]
+            return {
+                "server": str(getattr(entry, "dsServiceName", None).value or ""),
+                "highest_usn": _to_int(getattr(entry, "highestCommittedUSN", None)) or 0,
+            }
+
+    def iter_directory_users(self, since_usn: int = 0) -> Iterator[dict]:
+        search_filter = _user_filter("", None)
+        if since_usn:
+            search_filter = f"(&{search_filter}(uSNChanged>={since_usn}))"
+        attributes = USER_LIST_ATTRIBUTES + ["objectGUID", "uSNChanged"]
+        for item in self._paged_search(self.base_dn, search_filter, attributes, raw=True):
+            raw = item.get("raw_attributes") or {}
+            record = UserRecord(item["dn"], raw)
+            yield {
+                "guid": raw_guid(raw),
+                "dn": record.dn,
+                "sAMAccountName": record.sAMAccountName,
+                "displayName": record.displayName,
+                "mail": record.mail,
+                "mobile": record.mobile,
+                "department": record.department,
+                "title": record.title,
+                "userAccountControl": record.uac if record.uac is not None else 512,
+                "password_expiry_at": filetime_datetime(record.password_expiry),
+                "account_expires_at": filetime_datetime(record.account_expires),
+                "usn_changed": raw_int(raw, "uSNChanged") or 0,
+            }
+
+    def iter_user_dns(self) -> Iterator[str]:
+        # "1.1" asks for no attributes: only the DNs come back.
+        for item in self._paged_search(self.base_dn, _user_filter("", None), ["1.1"], raw=True):
+            yield item["dn"]
+
+    def iter_directory_ous(self, since_usn: int = 0) -> Iterator[dict]:
+        search_filter = "(objectClass=organizationalUnit)"
+        if since_usn:
+            search_filter = f"(&{search_filter}(uSNChanged>={since_usn}))"
+        attributes = ["ou", "description", "objectGUID", "uSNChanged"]
+        for item in self._paged_search(self.base_dn, search_filter, attributes, raw=True):
+            raw = item.get("raw_attributes") or {}
+            yield {
+                "guid": raw_guid(raw),
+                "dn": item["dn"],
+                "name": raw_text(raw, "ou"),
+                "description": raw_text(raw, "description"),
+                "usn_changed": raw_int(raw, "uSNChanged") or 0,
+            }
+
+    def iter_deleted_guids(self, since_usn: int) -> Iterator[str]:
+        # Tombstones live under CN=Deleted Objects of the domain NC and need the Show Deleted control.
+        controls = [(SHOW_DELETED_OID, True, None)]
+        base = self._naming_context()
+        if not self._deleted_objects_readable(base, controls):
+            return
+        search_filter = f"(&(isDeleted=TRUE)(uSNChanged>={since_usn}))"
+        for item in self._paged_search(base, search_filter, ["objectGUID"], controls=controls, raw=True):
+            guid = raw_guid(item.get("raw_attributes") or {})
+            if guid:
+                yield guid
+
+    def _deleted_objects_readable(self, base: str, controls: list) -> bool:
+        # Without List Contents on Deleted Objects, AD hides every tombstone and the search
+        # above "succeeds" empty. Checked once an hour per process.
+        cache = get_cache("ldap_deleted_objects", (self.url,), maxsize=4, ttl=3600)
+        readable = cache.get(base.lower())
+        if readable is not None:
+            return readable
+        container = f"<WKGUID={DELETED_OBJECTS_WKGUID},{base}>"
+
+        def search(conn: Connection) -> bool:
+            conn.search(container, "(objectClass=*)", search_scope=BASE, attributes=["1.1"], controls=controls)
+            return bool(raw_entries(conn.response))
+
+        readable = self._read(search)
+        if not readable:
+            logger.warning(
+                "AD Deleted Objects not readable by %s; deletions only show up after the next full reload",
+                self.bind_dn,
             )
-        return items
+        cache.set(base.lower(), readable)
+        return readable
 
-    def get_password_policy(self) -> dict:
-        conn = self._service_conn()
-        # Domain password policy is stored on the domain root object.
-        conn.search(
-            self.base_dn,
-            "(objectClass=domainDNS)",
-            search_scope=BASE,
-            attributes=[
-                "minPwdLength",
-                "pwdHistoryLength",
-                "maxPwdAge",
-                "minPwdAge",
-                "pwdProperties",
-                "lockoutThreshold",
-            ],
+    def _policy_cache(self) -> TTLCache:
+        return get_cache(
+            "ldap_password_policy",
+            (self.url, self.base_dn),
+            maxsize=self.dn_cache_size,
+            ttl=self.policy_cache_ttl,
         )
-        if not conn.entries:
+
+    def get_password_policy(self) -> dict:
+        # Refreshed from the DC at most once per LDAP_POLICY_CACHE_TTL.
+        cache = self._policy_cache()
+        policy = cache.get("domain")
+        if policy is None:
+            policy = self._fetch_domain_policy()
+            cache.set("domain", policy)
+        return policy
+
+    def get_user_password_policy(self, user_dn: str) -> dict:
+        # The fine-grained policy (PSO) that applies to the user, else the domain policy.
+        cache = self._policy_cache()
+        key = ("user", user_dn.lower())
+        pso_dn = cache.get(key)
+        if pso_dn is None:
+            pso_dn = self._read(lambda conn: _resultant_pso(conn, user_dn))
+            cache.set(key, pso_dn)
+        if not pso_dn:
+            return self.get_password_policy()
+        key = ("pso", pso_dn.lower())
+        policy = cache.get(key)
+        if policy is None:
+            policy = self._read(lambda conn: _read_pso(conn, pso_dn))
+            cache.set(key, policy)
+        return policy or self.get_password_policy()
+
+    def _fetch_domain_policy(self) -> dict:
+        def search(conn: Connection) -> Optional[Entry]:
+            # Domain password policy is stored on the domain root object.
+            conn.search(
+                self.base_dn,
+                "(objectClass=domainDNS)",
+                search_scope=BASE,
+                attributes=[
+                    "minPwdLength",
+                    "pwdHistoryLength",
+                    "maxPwdAge",
+                    "minPwdAge",
+                    "pwdProperties",
+                    "lockoutThreshold",
+                ],
+            )
+            return conn.entries[0] if conn.entries else None
+
+        entry = self._read(search)
+        if entry is None:
             return {}
-        entry = conn.entries[0]
         min_len = _to_int(getattr(entry, "minPwdLength", None))
         history_len = _to_int(getattr(entry, "pwdHistoryLength", None))
         max_age = _interval_to_days(getattr(entry, "maxPwdAge", None))
@@ -402,31 +848,69 @@ class LDAPClient:
             "lockout_threshold": lockout,
             "complexity_enabled": bool(pwd_props & 1) if pwd_props is not None else None,
             "reversible_encryption": bool(pwd_props & 128) if pwd_props is not None else None,
+            "source": "domain",
         }
 
     def create_ou(self, name: str, parent_dn: str, description: str = "") -> None:
-        conn = self._service_conn()
-        ou_dn = f"OU={name},{parent_dn}"
-        attrs = {"ou": name, "objectClass": ["top", "organizationalUnit"]}
-        if description:
-            attrs["description"] = description
-        if not conn.add(ou_dn, attributes=attrs):
-            raise ADConnectionError(conn.result.get("message", "add ou failed"))
+        with self._service_conn(write=True) as conn:
+            ou_dn = f"OU={name},{parent_dn}"
+            attrs = {"ou": name, "objectClass": ["top", "organizationalUnit"]}
+            if description:
+                attrs["description"] = description
+            if not conn.add(ou_dn, attributes=attrs):
+                raise ADConnectionError(conn.result.get("message", "add ou failed"))
 
     def update_ou(self, ou_dn: str, name: Optional[str], description: Optional[str]) -> None:
-        conn = self._service_conn()
-        if name:
-            if not conn.modify_dn(ou_dn, f"OU={name}"):
-                raise ADConnectionError(conn.result.get("message", "rename ou failed"))
-            ou_dn = f"OU={name}," + ou_dn.split(",", 1)[1]
-        if description is not None:
-            if not conn.modify(ou_dn, {"description": [(MODIFY_REPLACE, [description])]}):
-                raise ADConnectionError(conn.result.get("message", "update ou failed"))
+        with self._service_conn(write=True) as conn:
+            if name:
+                if not conn.modify_dn(ou_dn, f"OU={name}"):
+                    raise ADConnectionError(conn.result.get("message", "rename ou failed"))
+                # Every cached DN below the renamed OU is now stale.
+                suffix = f",{ou_dn}".lower()
+                self._dn_cache().discard_where(lambda _, dn: dn.lower().endswith(suffix))
+                ou_dn = f"OU={name}," + ou_dn.split(",", 1)[1]
+            if description is not None:
+                if not conn.modify(ou_dn, {"description": [(MODIFY_REPLACE, [description])]}):
+                    raise ADConnectionError(conn.result.get("message", "update ou failed"))
 
     def delete_ou(self, ou_dn: str) -> None:
-        conn = self._service_conn()
-        if not conn.delete(ou_dn):
-            raise ADConnectionError(conn.result.get("message", "delete ou failed"))
+        with self._service_conn(write=True) as conn:
+            if not conn.delete(ou_dn):
+                raise ADConnectionError(conn.result.get("message", "delete ou failed"))
+
+    def _paged_search(
+        self,
+        base: str,
+        search_filter: str,
+        attributes: list[str],
+        search_scope=SUBTREE,
+        controls: Optional[list] = None,
+        raw: bool = False,
+        stream: bool = False,
+    ) -> Iterator:
+        # RFC 2696 simple paged results: AD caps unpaged searches at MaxPageSize.
+        # Health is still recorded, but a scan's duration depends on its consumer, not the DC.
+        # AD keeps the paging state per connection, so a streamed scan gets one of its own
+        # rather than handing its pooled connection back between pages.
+        with self._dc_conn(timed=False, pooled=not stream) as (_, conn):
+            cookie = None
+            while True:
+                conn.search(
+                    base,
+                    search_filter,
+                    search_scope=search_scope,
+                    attributes=attributes,
+                    paged_size=self.page_size,
+                    paged_cookie=cookie,
+                    controls=controls,
+                )
+                # raw=True yields the response dicts and never builds ldap3 Entry objects.
+                entries = raw_entries(conn.response) if raw else conn.entries
+                for entry in entries:
+                    yield entry
+                cookie = _paged_cookie(conn.result)
+                if not cookie:
+                    break
 
     def _set_password(self, conn: Connection, user_dn: str, password: str) -> None:
         pwd = f'"{password}"'.encode("utf-16-le")
@@ -459,6 +943,18 @@ class LDAPClient:
         if not conn.modify(user_dn, {"pwdLastSet": [(MODIFY_REPLACE, [0])]}):
             raise ADConnectionError(conn.result.get("message", "set pwdLastSet failed"))
 
+    def _naming_context(self) -> str:
+        # defaultNamingContext from the cached rootDSE; the DC= part of base_dn if it is not cached.
+        info = self._server(self.url).info
+        if info is not None:
+            values = info.other.get("defaultNamingContext") or []
+            if values:
+                return str(values[0])
+        return self._domain_root_dn()
+
+    def _domain_root_dn(self) -> str:
+        return ",".join(part.strip() for part in self.base_dn.split(",") if part.strip().lower().startswith("dc="))
+
     def _domain_from_base_dn(self) -> str:
         parts = []
         for part in self.base_dn.split(","):
@@ -467,22 +963,225 @@ class LDAPClient:
         return ".".join(parts)
 
 
-def _filetime_to_datetime(value) -> Optional[datetime]:
-    if value is None:
-        return None
+USER_LIST_ATTRIBUTES = [
+    "sAMAccountName",
+    "displayName",
+    "mail",
+    "mobile",
+    "department",
+    "title",
+    "userAccountControl",
+    "msDS-UserPasswordExpiryTimeComputed",
+    "accountExpires",
+]
+
+USER_INFO_ATTRIBUTES = [
+    "sAMAccountName",
+    "displayName",
+    "mail",
+    "mobile",
+    "department",
+    "title",
+    "memberOf",
+    "msDS-UserPasswordExpiryTimeComputed",
+    "userAccountControl",
+    "accountExpires",
+]
+
+USER_SORT_ATTRIBUTES = {"displayName", "sAMAccountName", "department"}
+
+# Response field -> LDAP attributes needed to produce it.
+USER_FIELD_ATTRIBUTES = {
+    "dn": [],
+    "sAMAccountName": ["sAMAccountName"],
+    "displayName": ["displayName"],
+    "mail": ["mail"],
+    "mobile": ["mobile"],
+    "department": ["department"],
+    "title": ["title"],
+    "memberOf": ["memberOf"],
+    "enabled": ["userAccountControl"],
+    "days_left": ["msDS-UserPasswordExpiryTimeComputed"],
+    "password_expiry_date": ["msDS-UserPasswordExpiryTimeComputed"],
+    "account_expiry_date": ["accountExpires"],
+    "password_never_expires": ["userAccountControl"],
+}
+
+USER_LIST_FIELDS = (
+    "dn",
+    "sAMAccountName",
+    "displayName",
+    "mail",
+    "mobile",
+    "department",
+    "title",
+    "enabled",
+    "days_left",
+    "password_expiry_date",
+    "account_expiry_date",
+    "password_never_expires",
+)
+
+USER_INFO_FIELDS = (
+    "sAMAccountName",
+    "displayName",
+    "mail",
+    "mobile",
+    "department",
+    "title",
+    "memberOf",
+    "days_left",
+    "password_expiry_date",
+    "account_expiry_date",
+    "password_never_expires",
+)
+
+PSO_ATTRIBUTES = [
+    "msDS-MinimumPasswordLength",
+    "msDS-PasswordHistoryLength",
+    "msDS-MaximumPasswordAge",
+    "msDS-MinimumPasswordAge",
+    "msDS-PasswordComplexityEnabled",
+    "msDS-PasswordReversibleEncryptionEnabled",
+    "msDS-LockoutThreshold",
+]
+
+PAGED_RESULTS_OID = "1.2.840.113556.1.4.319"
+SHOW_DELETED_OID = "1.2.840.113556.1.4.417"
+DELETED_OBJECTS_WKGUID = "18e2ea80684f11d2b9aa00c04f79f805"
+FAST_BIND_OID = "1.2.840.113556.1.4.1781"
+IN_CHAIN_OID = "1.2.840.113556.1.4.1941"
+
+# protocolError, unavailableCriticalExtension, unwillingToPerform: the DC will never accept it.
+_FAST_BIND_REJECTED = frozenset({2, 12, 53})
+_fast_bind_unsupported: set[str] = set()
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_pid = 0
+_hedge_pool_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_pool, _hedge_pool_pid
+    with _hedge_pool_lock:
+        if _hedge_pool is None or _hedge_pool_pid != os.getpid():
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ldap-hedge")
+            _hedge_pool_pid = os.getpid()
+        return _hedge_pool
+
+
+def _paged_cookie(result: dict) -> Optional[bytes]:
     try:
-        if isinstance(value, datetime):
-            return value.astimezone(timezone.utc)
-        if isinstance(value, str):
-            value = int(value)
-        if value <= 0:
-            return None
-        base = datetime(1601, 1, 1, tzinfo=timezone.utc)
-        return base + timedelta(microseconds=value / 10)
-    except Exception:
+        return result["controls"][PAGED_RESULTS_OID]["value"]["cookie"] or None
+    except (KeyError, TypeError):
         return None
 
 
+def _user_filter(query: str, enabled: Optional[bool], require_mobile: bool = False) -> str:
+    # Only return person user objects; exclude computer/builtin accounts.
+    filter_parts = ["(objectClass=user)", "(objectClass=person)", "(!(objectClass=computer))"]
+    if query:
+        q = query.replace("*", "")
+        filter_parts.append(
+            f"(|(sAMAccountName=*{q}*)(displayName=*{q}*)(cn=*{q}*)(mail=*{q}*)(mobile=*{q}*))"
+        )
+    if enabled is True:
+        filter_parts.append("(!(userAccountControl:1.2.840.113556.1.4.803:=2))")
+    if enabled is False:
+        filter_parts.append("(userAccountControl:1.2.840.113556.1.4.803:=2)")
+    if require_mobile:
+        filter_parts.append("(mobile=*)")
+    return f"(&{''.join(filter_parts)})"
+
+
+def parse_user_fields(value: str) -> Optional[tuple[str, ...]]:
+    # "fields=a,b,c" query parameter; None means the endpoint's default set.
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in USER_FIELD_ATTRIBUTES]
+    if unknown:
+        raise ValueError(f"unknown fields: {','.join(unknown)}")
+    return tuple(dict.fromkeys(names))
+
+
+def user_attributes(fields: Iterable[str]) -> list[str]:
+    attributes = list(dict.fromkeys(attr for field in fields for attr in USER_FIELD_ATTRIBUTES[field]))
+    # "1.1" asks for no attributes at all, e.g. when only the DN is wanted.
+    return attributes or ["1.1"]
+
+
+def _user_info(username: str, record: UserRecord, fields: Iterable[str]) -> dict:
+    info = record.to_dict(fields)
+    if "account_expiry_date" in info:
+        logger.info(
+            "AD accountExpires read: user=%s raw=%s parsed=%s",
+            username,
+            record.account_expires,
+            info["account_expiry_date"],
+        )
+    return info
+
+
+def _resultant_pso(conn: Connection, user_dn: str) -> str:
+    # msDS-ResultantPSO is constructed per user; empty when only the domain policy applies
+    # (or when the service account may not read it).
+    conn.search(user_dn, "(objectClass=*)", search_scope=BASE, attributes=["msDS-ResultantPSO"])
+    items = raw_entries(conn.response)
+    if not items:
+        return ""
+    return raw_text(items[0].get("raw_attributes") or {}, "msDS-ResultantPSO") or ""
+
+
+def _read_pso(conn: Connection, pso_dn: str) -> dict:
+    conn.search(pso_dn, "(objectClass=msDS-PasswordSettings)", search_scope=BASE, attributes=PSO_ATTRIBUTES)
+    items = raw_entries(conn.response)
+    if not items:
+        return {}
+    raw = items[0].get("raw_attributes") or {}
+    complexity = raw_text(raw, "msDS-PasswordComplexityEnabled")
+    reversible = raw_text(raw, "msDS-PasswordReversibleEncryptionEnabled")
+    return {
+        "min_length": raw_int(raw, "msDS-MinimumPasswordLength"),
+        "history_length": raw_int(raw, "msDS-PasswordHistoryLength"),
+        "max_age_days": _interval_to_days(raw_int(raw, "msDS-MaximumPasswordAge")),
+        "min_age_days": _interval_to_days(raw_int(raw, "msDS-MinimumPasswordAge")),
+        "pwd_properties": None,
+        "lockout_threshold": raw_int(raw, "msDS-LockoutThreshold"),
+        "complexity_enabled": complexity.upper() == "TRUE" if complexity else None,
+        "reversible_encryption": reversible.upper() == "TRUE" if reversible else None,
+        "source": pso_dn,
+    }
+
+
+def ldap_client_from_config(config) -> LDAPClient:
+    return LDAPClient(
+        url=config["LDAP_URL"],
+        bind_dn=config["LDAP_BIND_DN"],
+        bind_password=config["LDAP_BIND_PASSWORD"],
+        base_dn=config["LDAP_BASE_DN"],
+        ca_cert=config["LDAP_CA_CERT"],
+        tls_verify=config.get("LDAP_TLS_VERIFY", True),
+        tls_allow_weak=config.get("LDAP_TLS_ALLOW_WEAK", False),
+        pool_size=config.get("LDAP_POOL_SIZE", 5),
+        pool_max_age=config.get("LDAP_POOL_MAX_AGE", 600),
+        pool_max_idle=config.get("LDAP_POOL_MAX_IDLE", 120),
+        schema_cache_ttl=config.get("LDAP_SCHEMA_CACHE_TTL", 86400),
+        schema_cache_file=config.get("LDAP_SCHEMA_CACHE_FILE", ""),
+        page_size=config.get("LDAP_PAGE_SIZE", 500),
+        dn_cache_size=config.get("LDAP_DN_CACHE_SIZE", 10000),
+        dn_cache_ttl=config.get("LDAP_DN_CACHE_TTL", 300),
+        fast_bind=config.get("LDAP_FAST_BIND_ENABLE", True),
+        auth_pool_size=config.get("LDAP_AUTH_POOL_SIZE", 3),
+        circuit_failures=config.get("LDAP_CIRCUIT_FAILURES", 3),
+        circuit_open_seconds=config.get("LDAP_CIRCUIT_OPEN_SECONDS", 30),
+        hedge=config.get("LDAP_HEDGE_ENABLE", False),
+        hedge_max_ms=config.get("LDAP_HEDGE_MAX_MS", 1000),
+        admin_cache_ttl=config.get("LDAP_ADMIN_CACHE_TTL", 60),
+        policy_cache_ttl=config.get("LDAP_POLICY_CACHE_TTL", 600),
+    )
+
+
 def _to_int(value) -> Optional[int]:
     if value is None:
         return None
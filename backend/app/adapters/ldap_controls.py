@@ -0,0 +1,107 @@
+from typing import Optional
+
+from pyasn1.codec.ber import decoder, encoder
+from pyasn1.type import namedtype, tag, univ
+
+SORT_REQUEST_OID = "1.2.840.113556.1.4.473"
+VLV_REQUEST_OID = "2.16.840.1.113730.3.4.9"
+VLV_RESPONSE_OID = "2.16.840.1.113730.3.4.10"
+
+
+# RFC 2891 server side sorting
+class SortKey(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("attributeType", univ.OctetString()),
+        namedtype.OptionalNamedType(
+            "orderingRule",
+            univ.OctetString().subtype(implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 0)),
+        ),
+        namedtype.DefaultedNamedType(
+            "reverseOrder",
+            univ.Boolean(False).subtype(implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 1)),
+        ),
+    )
+
+
+class SortKeyList(univ.SequenceOf):
+    componentType = SortKey()
+
+
+# draft-ietf-ldapext-ldapv3-vlv-09, as implemented by AD
+class ByOffset(univ.Sequence):
+    tagSet = univ.Sequence.tagSet.tagImplicitly(tag.Tag(tag.tagClassContext, tag.tagFormatConstructed, 0))
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("offset", univ.Integer()),
+        namedtype.NamedType("contentCount", univ.Integer()),
+    )
+
+
+class VLVTarget(univ.Choice):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("byOffset", ByOffset()),
+        namedtype.NamedType(
+            "greaterThanOrEqual",
+            univ.OctetString().subtype(implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 1)),
+        ),
+    )
+
+
+class VLVRequest(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("beforeCount", univ.Integer()),
+        namedtype.NamedType("afterCount", univ.Integer()),
+        namedtype.NamedType("target", VLVTarget()),
+        namedtype.OptionalNamedType("contextID", univ.OctetString()),
+    )
+
+
+class VLVResponse(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType("targetPosition", univ.Integer()),
+        namedtype.NamedType("contentCount", univ.Integer()),
+        namedtype.NamedType("virtualListViewResult", univ.Enumerated()),
+        namedtype.OptionalNamedType("contextID", univ.OctetString()),
+    )
+
+
+def sort_control(attribute: str, reverse: bool = False, criticality: bool = True) -> tuple:
+    key = SortKey()
+    key["attributeType"] = attribute
+    if reverse:
+        key["reverseOrder"] = True
+    keys = SortKeyList()
+    keys.setComponentByPosition(0, key)
+    return SORT_REQUEST_OID, criticality, encoder.encode(keys)
+
+
+def vlv_control(offset: int, count: int, content_count: int = 0, context_id: Optional[bytes] = None) -> tuple:
+    # offset is 1-based; the server returns the target entry plus `count - 1` entries after it.
+    by_offset = ByOffset()
+    by_offset["offset"] = offset
+    by_offset["contentCount"] = content_count
+    target = VLVTarget()
+    target["byOffset"] = by_offset
+    request = VLVRequest()
+    request["beforeCount"] = 0
+    request["afterCount"] = max(count - 1, 0)
+    request["target"] = target
+    if context_id:
+        request["contextID"] = context_id
+    return VLV_REQUEST_OID, True, encoder.encode(request)
+
+
+def decode_vlv_response(result: dict) -> Optional[dict]:
+    control = (result.get("controls") or {}).get(VLV_RESPONSE_OID)
+    if not control or not isinstance(control.get("value"), bytes):
+        return None
+    try:
+        value, _ = decoder.decode(control["value"], asn1Spec=VLVResponse())
+    except Exception:
+        return None
+    context_id = value["contextID"]
+    return {
+        "target_position": int(value["targetPosition"]),
+        "content_count": int(value["contentCount"]),
+        "result": int(value["virtualListViewResult"]),
+        "context_id": bytes(context_id) if context_id.isValue else None,
+    }
@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from ldap3 import BASE, Connection
+from ldap3.core.exceptions import LDAPException
+
+from ..core.errors import ADConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledConn:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class LDAPConnectionPool:
+    def __init__(
+        self,
+        factory: Callable[[], Connection],
+        *,
+        size: int = 5,
+        max_age: int = 600,
+        max_idle: int = 120,
+        check_interval: int = 30,
+        acquire_timeout: float = 10.0,
+        require_bound: bool = True,
+    ) -> None:
+        self._factory = factory
+        self.size = max(size, 1)
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.acquire_timeout = acquire_timeout
+        # Fast-bind connections stay anonymous between credential checks, so they are never "bound".
+        self.require_bound = require_bound
+        self._idle: list[_PooledConn] = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {"created": 0, "reused": 0, "discarded": 0}
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        item = self._acquire()
+        discard = False
+        try:
+            yield item.conn
+        except LDAPException:
+            # Socket/protocol level failures leave the connection in an unknown state.
+            discard = True
+            raise
+        finally:
+            self._release(item, discard)
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for item in idle:
+            _close(item.conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                **self._stats,
+            }
+
+    def _acquire(self) -> _PooledConn:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                item = self._idle.pop() if self._idle else None
+                if item is None:
+                    if self._open < self.size:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ADConnectionError("ldap connection pool exhausted")
+                    self._cond.wait(remaining)
+                    continue
+            if self._usable(item):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return item
+            self._drop(item)
+        try:
+            item = _PooledConn(self._factory())
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return item
+
+    def _release(self, item: _PooledConn, discard: bool) -> None:
+        now = time.monotonic()
+        if discard or not self._alive(item.conn) or now - item.created_at > self.max_age:
+            self._drop(item)
+            return
+        item.last_used = now
+        with self._cond:
+            self._idle.append(item)
+            self._cond.notify()
+
+    def _usable(self, item: _PooledConn) -> bool:
+        now = time.monotonic()
+        if not self._alive(item.conn):
+            return False
+        if now - item.created_at > self.max_age or now - item.last_used > self.max_idle:
+            return False
+        if now - item.last_used > self.check_interval:
+            # DCs drop idle sessions silently; probe the rootDSE before handing it out.
+            try:
+                return bool(item.conn.search("", "(objectClass=*)", search_scope=BASE, attributes=["1.1"]))
+            except LDAPException as exc:
+                logger.info("AD pooled connection health check failed: error=%s", exc)
+                return False
+        return True
+
+    def _alive(self, conn: Connection) -> bool:
+        return not conn.closed and (conn.bound or not self.require_bound)
+
+    def _drop(self, item: _PooledConn) -> None:
+        _close(item.conn)
+        with self._cond:
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+
+def _close(conn: Connection) -> None:
+    try:
+        conn.unbind()
+    except Exception:
+        pass
+
+
+_pools: dict[tuple, LDAPConnectionPool] = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(key: tuple, factory: Callable[[], Connection], **options) -> LDAPConnectionPool:
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Sockets inherited across a fork must not be shared with the parent.
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = LDAPConnectionPool(factory, **options)
+            _pools[key] = pool
+        return pool
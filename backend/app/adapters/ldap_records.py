@@ -0,0 +1,138 @@
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, Optional
+
+TICKS_PER_DAY = 864_000_000_000
+# accountExpires / msDS-UserPasswordExpiryTimeComputed use this for "never".
+FILETIME_NEVER = 0x7FFFFFFFFFFFFFFF
+UNIX_EPOCH_FILETIME = 116_444_736_000_000_000
+FILETIME_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+FILETIME_EPOCH_ORDINAL = FILETIME_EPOCH.toordinal()
+
+PLAIN_FIELDS = frozenset({"sAMAccountName", "displayName", "mail", "mobile", "department", "title"})
+
+
+def now_filetime() -> int:
+    return int(time.time() * 10_000_000) + UNIX_EPOCH_FILETIME
+
+
+def valid_filetime(value: Optional[int]) -> bool:
+    return value is not None and 0 < value < FILETIME_NEVER
+
+
+@lru_cache(maxsize=65536)
+def _day_iso(day: int) -> Optional[str]:
+    # Most users share a handful of expiry days, so each day is converted once.
+    try:
+        return date.fromordinal(FILETIME_EPOCH_ORDINAL + day).isoformat()
+    except (ValueError, OverflowError):
+        return None
+
+
+def filetime_date(value: Optional[int]) -> Optional[str]:
+    if not valid_filetime(value):
+        return None
+    return _day_iso(value // TICKS_PER_DAY)
+
+
+def filetime_datetime(value: Optional[int]) -> Optional[datetime]:
+    if not valid_filetime(value):
+        return None
+    try:
+        return FILETIME_EPOCH + timedelta(microseconds=value // 10)
+    except OverflowError:
+        return None
+
+
+def raw_entries(response: Optional[list]) -> list[dict]:
+    # Search result entries straight from conn.response, without building ldap3 Entry objects.
+    return [item for item in response or [] if item.get("type") == "searchResEntry"]
+
+
+def raw_text(raw: dict, name: str) -> Optional[str]:
+    values = raw.get(name)
+    if not values:
+        return None
+    return values[0].decode("utf-8", "replace")
+
+
+def raw_int(raw: dict, name: str) -> Optional[int]:
+    values = raw.get(name)
+    if not values:
+        return None
+    try:
+        return int(values[0])
+    except ValueError:
+        return None
+
+
+def raw_guid(raw: dict) -> Optional[str]:
+    values = raw.get("objectGUID")
+    if not values:
+        return None
+    try:
+        return str(uuid.UUID(bytes_le=bytes(values[0])))
+    except ValueError:
+        return None
+
+
+class UserRecord:
+    __slots__ = (
+        "dn",
+        "sAMAccountName",
+        "displayName",
+        "mail",
+        "mobile",
+        "department",
+        "title",
+        "member_of",
+        "uac",
+        "password_expiry",
+        "account_expires",
+    )
+
+    def __init__(self, dn: str, raw: dict) -> None:
+        self.dn = dn
+        self.sAMAccountName = raw_text(raw, "sAMAccountName")
+        self.displayName = raw_text(raw, "displayName")
+        self.mail = raw_text(raw, "mail")
+        self.mobile = raw_text(raw, "mobile")
+        self.department = raw_text(raw, "department")
+        self.title = raw_text(raw, "title")
+        member_of = raw.get("memberOf")
+        self.member_of = [v.decode("utf-8", "replace") for v in member_of] if member_of else None
+        self.uac = raw_int(raw, "userAccountControl")
+        # FILETIME values stay integers; dates are only produced for fields that are serialized.
+        self.password_expiry = raw_int(raw, "msDS-UserPasswordExpiryTimeComputed")
+        self.account_expires = raw_int(raw, "accountExpires")
+
+    @classmethod
+    def from_response(cls, item: dict) -> "UserRecord":
+        return cls(item["dn"], item.get("raw_attributes") or {})
+
+    def get(self, field: str, now: Optional[int] = None):
+        if field in PLAIN_FIELDS:
+            return getattr(self, field)
+        if field == "dn":
+            return self.dn
+        if field == "memberOf":
+            return self.member_of or []
+        if field == "enabled":
+            return not ((self.uac or 0) & 2)
+        if field == "password_never_expires":
+            return bool((self.uac or 0) & 0x10000)
+        if field == "days_left":
+            if not valid_filetime(self.password_expiry):
+                return None
+            return max((self.password_expiry - (now or now_filetime())) // TICKS_PER_DAY, 0)
+        if field == "password_expiry_date":
+            return filetime_date(self.password_expiry)
+        if field == "account_expiry_date":
+            return filetime_date(self.account_expires)
+        return None
+
+    def to_dict(self, fields: Iterable[str], now: Optional[int] = None) -> dict:
+        now = now or now_filetime()
+        return {field: self.get(field, now) for field in fields}
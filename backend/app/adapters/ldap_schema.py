@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from ldap3.protocol.rfc4512 import DsaInfo, SchemaInfo
+
+logger = logging.getLogger(__name__)
+
+DirectoryInfo = Tuple[Optional[DsaInfo], Optional[SchemaInfo]]
+
+# A failed fetch is not retried for this long; connections meanwhile go without a schema.
+FAILURE_TTL = 60
+
+_cache: dict[str, dict] = {}
+_failed_until: dict[str, float] = {}
+_fetch_locks: dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+def get_directory_info(
+    url: str,
+    fetch: Callable[[], DirectoryInfo],
+    *,
+    ttl: int,
+    cache_file: str = "",
+) -> DirectoryInfo:
+    # _lock only guards the dicts; the fetch itself runs under a per-URL lock, so one slow DC
+    # never holds up lookups for another.
+    with _lock:
+        item = _cached(url, cache_file)
+        if item and time.time() - item["fetched_at"] < ttl:
+            return item["info"], item["schema"]
+        if _failed_until.get(url, 0) > time.monotonic():
+            return _pair(item)
+        fetch_lock = _fetch_locks.setdefault(url, threading.Lock())
+    # With a stale copy at hand, let whoever is already refreshing finish and serve the copy.
+    if not fetch_lock.acquire(blocking=item is None):
+        return _pair(item)
+    try:
+        # Whoever held the lock before us may already have refreshed or failed.
+        with _lock:
+            item = _cache.get(url)
+            if item and time.time() - item["fetched_at"] < ttl:
+                return item["info"], item["schema"]
+            if _failed_until.get(url, 0) > time.monotonic():
+                return _pair(item)
+        try:
+            info, schema = fetch()
+        except Exception as exc:
+            logger.warning("AD schema fetch failed: url=%s error=%s", url, exc)
+            info, schema = None, None
+        if info is None or schema is None:
+            # A stale schema is still far better than downloading it on every connection.
+            with _lock:
+                _failed_until[url] = time.monotonic() + FAILURE_TTL
+            return _pair(item)
+        item = {"info": info, "schema": schema, "fetched_at": time.time()}
+        with _lock:
+            _cache[url] = item
+            _failed_until.pop(url, None)
+        if cache_file:
+            _save_file(url, cache_file, item)
+        logger.info("AD schema cached: url=%s", url)
+        return info, schema
+    finally:
+        fetch_lock.release()
+
+
+def _cached(url: str, cache_file: str) -> Optional[dict]:
+    item = _cache.get(url)
+    if item is None and cache_file:
+        item = _load_file(url, cache_file)
+        if item:
+            _cache[url] = item
+    return item
+
+
+def _pair(item: Optional[dict]) -> DirectoryInfo:
+    return (item["info"], item["schema"]) if item else (None, None)
+
+
+def load_directory_info(url: str, cache_file: str) -> bool:
+    if not cache_file:
+        return False
+    item = _load_file(url, cache_file)
+    if not item:
+        return False
+    with _lock:
+        _cache[url] = item
+    return True
+
+
+def clear_directory_info(url: str = "") -> None:
+    with _lock:
+        if url:
+            _cache.pop(url, None)
+            _failed_until.pop(url, None)
+        else:
+            _cache.clear()
+            _failed_until.clear()
+
+
+def _load_file(url: str, cache_file: str) -> Optional[dict]:
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get("url") != url:
+            return None
+        schema = SchemaInfo.from_json(data["schema"])
+        info = DsaInfo.from_json(data["info"], schema)
+        return {"info": info, "schema": schema, "fetched_at": float(data.get("fetched_at", 0))}
+    except Exception as exc:
+        logger.warning("AD schema cache file unreadable: path=%s error=%s", cache_file, exc)
+        return None
+
+
+def _save_file(url: str, cache_file: str, item: dict) -> None:
+    tmp_path = f"{cache_file}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "url": url,
+                    "fetched_at": item["fetched_at"],
+                    "info": item["info"].to_json(),
+                    "schema": item["schema"].to_json(),
+                },
+                fh,
+            )
+        os.replace(tmp_path, cache_file)
+    except Exception as exc:
+        logger.warning("AD schema cache file write failed: path=%s error=%s", cache_file, exc)
@@ -1,8 +1,19 @@
-from datetime import datetime, timezone
-
-from flask import Blueprint, current_app, jsonify, request
-
-from ..adapters.ldap_client import LDAPClient
+import io
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
+
+from ..adapters.ldap_client import (
+    USER_INFO_FIELDS,
+    USER_LIST_FIELDS,
+    USER_SORT_ATTRIBUTES,
+    LDAPClient,
+    ldap_client_from_config,
+    parse_user_fields,
+)
+from ..adapters.ldap_records import now_filetime
 from ..core.auth import issue_token, verify_token
 from ..services.otp_service import (
     create_secret,
@@ -12,8 +23,9 @@ from ..services.otp_service import (
     has_valid_action_otp,
     record_action_otp,
 )
-from ..services.audit_service import list_logs, write_log
-from ..services.audit_export import export_csv
+from ..services.audit_service import list_logs, list_logs_page, write_log
+from ..services.audit_export import export_audit_csv, export_notifies_csv, export_sms_csv
+from ..services.audit_stats import STATS_INTERVALS, audit_stats, stats_range
 from ..services.sms_service import (
     can_send,
     create_code,
@@ -25,19 +37,29 @@ from ..services.sms_service import (
     send_via_aliyun,
 )
 from ..services.password_expiry import trigger_password_expiry_check
+from ..services.password_policy import check_password
 from ..services.notify_service import list_expiry_notifies
-from ..services.auth_service import clear_fail, is_locked, record_fail
+from ..services.auth_service import clear_fail, get_login_state, record_fail
+from ..services.batch_service import BATCH_ACTIONS, run_batch
+from ..services.user_import import report_csv, run_import
+from ..services.csv_stream import coalesce, gzip_chunks, iter_csv
+from ..services.jobs import cancel_job, enqueue_job, get_job, list_jobs
+from ..services.job_worker import start_job_workers
 from ..services.config_service import get_config, set_config, list_history, rollback
 from ..services.email_service import create_code as create_email_code, verify_code as verify_email_code, send_email
 from ..services.health_service import check_db, check_ldap
 from ..core.config import apply_overrides
 from ..services.sms_retry import start_sms_retry_loop
 from ..services.password_expiry import start_password_expiry_loop
+from ..services import directory_mirror
+from ..services.directory_sync import get_directory_sync_status, run_directory_sync, start_directory_sync_loop
+from ..services.ou_tree import get_ou_tree, start_ou_tree_loop
 from ..core.errors import ADConnectionError
 
 api_bp = Blueprint("api", __name__)
 
 OTP_TOKEN_TTL = 300
+_MISSING = object()
 
 
 def _require_admin_action_otp(actor: dict) -> bool:
@@ -54,15 +76,71 @@ def _date_to_filetime(date_str: str) -> int:
 
 
 def _ldap_client() -> LDAPClient:
-    return LDAPClient(
-        url=current_app.config["LDAP_URL"],
-        bind_dn=current_app.config["LDAP_BIND_DN"],
-        bind_password=current_app.config["LDAP_BIND_PASSWORD"],
-        base_dn=current_app.config["LDAP_BASE_DN"],
-        ca_cert=current_app.config["LDAP_CA_CERT"],
-        tls_verify=current_app.config.get("LDAP_TLS_VERIFY", True),
-        tls_allow_weak=current_app.config.get("LDAP_TLS_ALLOW_WEAK", False),
-    )
+    return ldap_client_from_config(current_app.config)
+
+
+def _ou_tree(ldap_client: LDAPClient):
+    tree = get_ou_tree(ldap_client)
+    tree.ensure(ldap_client, current_app.config["OU_TREE_REFRESH_INTERVAL"])
+    return tree
+
+
+def _job_accepted(job_id: int):
+    return jsonify({"status": "queued", "jobId": job_id}), 202
+
+
+def _use_mirror() -> bool:
+    source = request.args.get("source", "").strip().lower() or current_app.config.get("DIRECTORY_READ_SOURCE", "ldap")
+    return source == "mirror"
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return str(value)
+
+
+def _prime(items: Iterator) -> Iterator:
+    # Pull the first item before the response starts, so connection errors still get a JSON status.
+    items = iter(items)
+    first = next(items, _MISSING)
+    return items if first is _MISSING else itertools.chain([first], items)
+
+
+def _csv_response(filename: str, chunks: Iterable[bytes]):
+    mimetype = "text/csv"
+    if request.args.get("gzip", "").lower() in {"1", "true", "yes"}:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        mimetype = "application/gzip"
+    resp = current_app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    # Stop nginx from buffering the whole body before passing it on.
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+def _parse_time(value: str, end: bool = False) -> Optional[datetime]:
+    # "YYYY-MM-DD" or an ISO timestamp; a bare date used as an upper bound covers the whole day.
+    value = value.strip()
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def _time_range() -> tuple[Optional[datetime], Optional[datetime]]:
+    return _parse_time(request.args.get("from", "")), _parse_time(request.args.get("to", ""), end=True)
+
+
+def _policy_violation(reason: str):
+    return jsonify({"code": "AD_POLICY_VIOLATION", "message": "密码策略不符合要求", "reason": reason}), 400
 
 
 def _get_bearer_token() -> str:
@@ -115,8 +193,9 @@ def health():
 @api_bp.get("/health/details")
 def health_details():
     db_ok = check_db(current_app.config["DB_URL"])
-    ldap_ok = check_ldap(_ldap_client())
-    return jsonify({"api": True, "db": db_ok, "ldap": ldap_ok})
+    ldap_client = _ldap_client()
+    ldap_ok = check_ldap(ldap_client)
+    return jsonify({"api": True, "db": db_ok, "ldap": ldap_ok, "ldap_cache": ldap_client.cache_stats()})
 
 
 @api_bp.post("/auth/login")
@@ -127,21 +206,22 @@ def login():
     role_hint = payload.get("roleHint", "")
     if not username or not password:
         return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
-    locked_until = is_locked(current_app.config["DB_URL"], username)
-    if locked_until:
+    login_state = get_login_state(current_app.config["DB_URL"], username)
+    if login_state and login_state["locked_until"]:
         return (
             jsonify(
                 {
                     "code": "RATE_LIMITED",
                     "message": "账号已锁定，请稍后再试",
-                    "locked_until": locked_until.isoformat(),
+                    "locked_until": login_state["locked_until"].isoformat(),
                 }
             ),
             429,
         )
 
     ldap_client = _ldap_client()
-    if not ldap_client.authenticate_user(username, password):
+    login_result = ldap_client.login_user(username, password, current_app.config["ADMIN_GROUP_DN"])
+    if not login_result:
         current_app.logger.warning("login failed: username=%s role=%s", username, role_hint)
         record_fail(
             current_app.config["DB_URL"],
@@ -150,10 +230,11 @@ def login():
             current_app.config.get("LOGIN_LOCK_MINUTES", 10),
         )
         return jsonify({"code": "AUTH_INVALID", "message": "账号或密码错误"}), 401
-    clear_fail(current_app.config["DB_URL"], username)
+    if login_state and login_state["fail_count"]:
+        clear_fail(current_app.config["DB_URL"], username)
 
-    user_info = ldap_client.get_user_info(username) or {}
-    is_admin = ldap_client.is_user_admin(username, current_app.config["ADMIN_GROUP_DN"])
+    user_info = login_result["user"]
+    is_admin = login_result["is_admin"]
     if role_hint == "admin" and not is_admin:
         return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
 
@@ -217,6 +298,10 @@ def otp_verify():
     if not verify_code(otp_record["secret"], code, current_app.config["OTP_WINDOW"]):
         return jsonify({"code": "AUTH_INVALID", "message": "验证码无效或已过期"}), 401
 
+    # Membership may have been revoked since the password step; this is a cached set lookup.
+    if not _ldap_client().is_user_admin(username, current_app.config["ADMIN_GROUP_DN"]):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+
     enable_secret(current_app.config["DB_URL"], username)
     session_token = issue_token(
         current_app.config["APP_SECRET"], {"type": "session", "username": username, "role": "admin"}
@@ -272,9 +357,13 @@ def me():
     if not data:
         return jsonify({"code": "AUTH_REQUIRED", "message": "未登录"}), 401
 
+    try:
+        fields = parse_user_fields(request.args.get("fields", ""))
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
     username = data.get("username", "")
     ldap_client = _ldap_client()
-    user_info = ldap_client.get_user_info(username)
+    user_info = ldap_client.get_user_info(username, fields)
     if not user_info:
         return jsonify({"code": "OBJECT_NOT_FOUND", "message": "用户不存在"}), 404
     return jsonify(user_info)
@@ -405,6 +494,25 @@ def list_sms_logs():
     return jsonify({"items": items})
 
 
+@api_bp.get("/sms/export")
+def export_sms_logs():
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    try:
+        since, until = _time_range()
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    chunks = export_sms_csv(
+        current_app.config["DB_URL"],
+        username=request.args.get("username", "").strip(),
+        scene=request.args.get("scene", "").strip(),
+        status=request.args.get("status", "").strip(),
+        since=since,
+        until=until,
+    )
+    return _csv_response("sms_codes.csv", coalesce(_prime(chunks)))
+
+
 @api_bp.post("/auth/forgot/reset")
 def forgot_reset():
     payload = request.get_json(silent=True) or {}
@@ -413,12 +521,22 @@ def forgot_reset():
     new_password = payload.get("newPassword", "")
     if not username or not code or not new_password:
         return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    ldap_client = _ldap_client()
     if not verify_sms_code(current_app.config["DB_URL"], username, "forgot", code):
         return jsonify({"code": "AUTH_INVALID", "message": "验证码无效或已过期"}), 401
-    ldap_client = _ldap_client()
     user_dn = ldap_client.get_user_dn(username)
     if not user_dn:
         return jsonify({"code": "OBJECT_NOT_FOUND", "message": "用户不存在"}), 404
+    reason = check_password(ldap_client, username, new_password, user_dn)
+    if reason:
+        _audit(
+            {"username": username, "role": "user"},
+            "PASSWORD_RESET_FORGOT",
+            username,
+            "error",
+            f"password policy: {reason}",
+        )
+        return _policy_violation(reason)
     try:
         ldap_client.reset_password(user_dn, new_password)
     except ADConnectionError as exc:
@@ -516,12 +634,22 @@ def email_reset():
     new_password = payload.get("newPassword", "")
     if not username or not code or not new_password:
         return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    ldap_client = _ldap_client()
     if not verify_email_code(current_app.config["DB_URL"], username, "forgot", code):
         return jsonify({"code": "AUTH_INVALID", "message": "验证码无效或已过期"}), 401
-    ldap_client = _ldap_client()
     user_dn = ldap_client.get_user_dn(username)
     if not user_dn:
         return jsonify({"code": "OBJECT_NOT_FOUND", "message": "用户不存在"}), 404
+    reason = check_password(ldap_client, username, new_password, user_dn)
+    if reason:
+        _audit(
+            {"username": username, "role": "user"},
+            "PASSWORD_RESET_FORGOT",
+            username,
+            "error",
+            f"password policy: {reason}",
+        )
+        return _policy_violation(reason)
     try:
         ldap_client.reset_password(user_dn, new_password)
     except ADConnectionError as exc:
@@ -552,9 +680,13 @@ def change_password():
     if not old_password or not new_password or not code:
         return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
     username = actor.get("username", "")
+    ldap_client = _ldap_client()
+    reason = check_password(ldap_client, username, new_password, lookup=True)
+    if reason:
+        _audit(actor, "PASSWORD_CHANGE_SELF", username, "error", f"password policy: {reason}")
+        return _policy_violation(reason)
     if not verify_sms_code(current_app.config["DB_URL"], username, "change", code):
         return jsonify({"code": "AUTH_INVALID", "message": "验证码无效或已过期"}), 401
-    ldap_client = _ldap_client()
     try:
         ldap_client.change_password(username, old_password, new_password)
     except ADConnectionError as exc:
@@ -596,6 +728,14 @@ def list_users():
         page_size_i = 15
     if page_size_i > 200:
         page_size_i = 200
+    sort = request.args.get("sort", "").strip()
+    if sort and sort not in USER_SORT_ATTRIBUTES:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    reverse = request.args.get("order", "asc").strip().lower() == "desc"
+    try:
+        fields = parse_user_fields(request.args.get("fields", ""))
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
     enabled = None
     if status == "enabled":
         enabled = True
@@ -603,14 +743,60 @@ def list_users():
         enabled = False
     elif not q:
         enabled = True
-    ldap_client = _ldap_client()
-    users = ldap_client.search_users(query=q, ou_dn=ou, enabled=enabled)
-    if not q and not ou:
-        users = [u for u in users if (u.get("mobile") or "").strip()]
-    total = len(users)
+    require_mobile = not q and not ou
     start = (page_i - 1) * page_size_i
     end = start + page_size_i
-    items = users[start:end]
+    if _use_mirror():
+        # Exact on the first page (or when asked); later pages reuse the planner estimate.
+        exact_count = page_i == 1 or request.args.get("total", "").strip().lower() == "exact"
+        items, total, estimated = directory_mirror.search_users(
+            current_app.config["DB_URL"],
+            query=q,
+            ou_dn=ou,
+            enabled=enabled,
+            require_mobile=require_mobile,
+            sort=sort or "displayName",
+            reverse=reverse,
+            limit=page_size_i,
+            offset=start,
+            fields=fields,
+            exact_count=exact_count,
+        )
+        return jsonify(
+            {"items": items, "total": total, "totalEstimated": estimated, "page": page_i, "pageSize": page_size_i}
+        )
+    ldap_client = _ldap_client()
+    if current_app.config.get("LDAP_VLV_ENABLE", True):
+        page_result = ldap_client.search_users_page(
+            query=q,
+            ou_dn=ou,
+            enabled=enabled,
+            offset=start,
+            limit=page_size_i,
+            sort=sort or "displayName",
+            reverse=reverse,
+            require_mobile=require_mobile,
+            fields=fields,
+        )
+        if page_result is not None:
+            items, total = page_result
+            return jsonify({"items": items, "total": total, "page": page_i, "pageSize": page_size_i})
+    fetch_fields = fields
+    if fields:
+        # The in-process filter and sort below need their columns even when not returned.
+        fetch_fields = tuple(dict.fromkeys(fields + (sort or "displayName", "mobile")))
+    users = ldap_client.iter_user_records(query=q, ou_dn=ou, enabled=enabled, fields=fetch_fields)
+    if require_mobile:
+        users = (u for u in users if (u.mobile or "").strip())
+    if sort:
+        users = sorted(users, key=lambda u: (u.get(sort) or "").lower(), reverse=reverse)
+    total = 0
+    items = []
+    now = now_filetime()
+    for u in users:
+        if start <= total < end:
+            items.append(u.to_dict(fields or USER_LIST_FIELDS, now))
+        total += 1
     return jsonify({"items": items, "total": total, "page": page_i, "pageSize": page_size_i})
 
 
@@ -619,11 +805,14 @@ def get_user_detail(username: str):
     actor = _require_session("admin")
     if not actor:
         return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    try:
+        fields = parse_user_fields(request.args.get("fields", ""))
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
     ldap_client = _ldap_client()
-    info = ldap_client.get_user_info(username)
+    info = ldap_client.get_user_info(username, fields or USER_INFO_FIELDS + ("dn",))
     if not info:
         return jsonify({"code": "OBJECT_NOT_FOUND", "message": "用户不存在"}), 404
-    info["dn"] = ldap_client.get_user_dn(username)
     return jsonify({"item": info})
 
 
@@ -804,16 +993,23 @@ def export_users():
         enabled = True
     elif status == "disabled":
         enabled = False
-    ldap_client = _ldap_client()
-    users = ldap_client.search_users(query=q, ou_dn=ou, enabled=enabled)
-    header = ["sAMAccountName", "displayName", "mail", "mobile", "department", "title", "dn"]
-    rows = [header]
-    for u in users:
-        rows.append([u.get(k, "") or "" for k in header])
-    csv_text = "\n".join([",".join(row) for row in rows])
-    resp = current_app.response_class(csv_text, mimetype="text/csv")
-    resp.headers["Content-Disposition"] = "attachment; filename=users.csv"
-    return resp
+    try:
+        fields = parse_user_fields(request.args.get("fields", ""))
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    header = list(fields or ("sAMAccountName", "displayName", "mail", "mobile", "department", "title", "dn"))
+    if _use_mirror():
+        users = directory_mirror.iter_users(
+            current_app.config["DB_URL"], query=q, ou_dn=ou, enabled=enabled, fields=header
+        )
+    else:
+        users = _ldap_client().iter_user_records(query=q, ou_dn=ou, enabled=enabled, fields=header, stream=True)
+    try:
+        users = _prime(users)
+    except ADConnectionError as exc:
+        return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    rows = ([_csv_value(u.get(k)) for k in header] for u in users)
+    return _csv_response("users.csv", iter_csv(header, rows))
 
 
 @api_bp.post("/users/import")
@@ -823,36 +1019,51 @@ def import_users():
         return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
     if not _require_admin_action_otp(actor):
         return jsonify({"code": "OTP_REQUIRED", "message": "需要OTP验证"}), 403
-    payload = request.get_json(silent=True) or {}
-    csv_text = payload.get("csv", "")
-    if not csv_text:
+    # multipart "file", a raw text/csv or gzip body, or the legacy {"csv": "..."} JSON payload.
+    upload = request.files.get("file")
+    dry_run_value = request.values.get("dryRun")
+    if upload is not None:
+        stream = upload.stream
+    elif request.is_json:
+        payload = request.get_json(silent=True) or {}
+        csv_text = payload.get("csv", "")
+        stream = io.BytesIO(csv_text.encode("utf-8")) if csv_text else None
+        if dry_run_value is None:
+            dry_run_value = payload.get("dryRun")
+    else:
+        stream = request.stream if request.content_length else None
+    if stream is None:
         return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
-    import csv
-    import io
-
-    ldap_client = _ldap_client()
-    reader = csv.DictReader(io.StringIO(csv_text))
-    created = 0
-    errors = 0
-    for row in reader:
-        try:
-            ldap_client.create_user(
-                sAMAccountName=row.get("sAMAccountName", ""),
-                displayName=row.get("displayName", ""),
-                ou_dn=row.get("ouDn", ""),
-                password=row.get("password", ""),
-                attributes={
-                    "mail": row.get("mail", ""),
-                    "mobile": row.get("mobile", ""),
-                    "department": row.get("department", ""),
-                    "title": row.get("title", ""),
-                },
-                force_change=str(row.get("forceChangeAtFirstLogin", "")).lower() in {"1", "true", "yes"},
-            )
-            created += 1
-        except Exception:
-            errors += 1
-    return jsonify({"created": created, "errors": errors})
+    dry_run = str(dry_run_value or "").lower() in {"1", "true", "yes"}
+    if current_app.config.get("JOBS_ENABLE"):
+        job_id = enqueue_job(
+            current_app.config["DB_URL"],
+            "user_import",
+            actor.get("username", ""),
+            {"dryRun": dry_run, "filename": upload.filename if upload is not None else ""},
+            stream.read(),
+        )
+        return _job_accepted(job_id)
+    try:
+        result = run_import(
+            _ldap_client(),
+            stream,
+            concurrency=current_app.config.get("LDAP_BATCH_CONCURRENCY", 4),
+            max_rows=current_app.config["USER_IMPORT_MAX_ROWS"],
+            dry_run=dry_run,
+        )
+    except ValueError as exc:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败", "reason": str(exc)}), 400
+    except ADConnectionError as exc:
+        _audit(actor, "USER_IMPORT", "users", "error", str(exc))
+        return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    if not dry_run:
+        _audit(actor, "USER_IMPORT", "users", "ok", after=result["counts"])
+    if request.args.get("format") == "csv":
+        resp = current_app.response_class(report_csv(result["items"]), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = "attachment; filename=import_report.csv"
+        return resp
+    return jsonify(result)
 
 
 @api_bp.post("/users/batch")
@@ -867,28 +1078,26 @@ def batch_users():
     usernames = payload.get("usernames", [])
     if not action or not isinstance(usernames, list) or not usernames:
         return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
-    ldap_client = _ldap_client()
-    count = 0
-    for username in usernames:
-        user_dn = ldap_client.get_user_dn(username)
-        if not user_dn:
-            continue
-        try:
-            if action == "enable":
-                ldap_client.set_user_enabled(user_dn, True)
-            elif action == "disable":
-                ldap_client.set_user_enabled(user_dn, False)
-            elif action == "move":
-                target_ou = payload.get("targetOuDn", "")
-                if not target_ou:
-                    return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
-                ldap_client.move_user(user_dn, target_ou)
-            else:
-                return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
-            count += 1
-        except Exception:
-            continue
-    return jsonify({"count": count})
+    target_ou = payload.get("targetOuDn", "")
+    if action not in BATCH_ACTIONS or (action == "move" and not target_ou):
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    if current_app.config.get("JOBS_ENABLE"):
+        job_id = enqueue_job(
+            current_app.config["DB_URL"],
+            "user_batch",
+            actor.get("username", ""),
+            {"action": action, "usernames": usernames, "targetOuDn": target_ou},
+        )
+        return _job_accepted(job_id)
+    results = run_batch(
+        _ldap_client(),
+        action=action,
+        usernames=usernames,
+        target_ou=target_ou,
+        concurrency=current_app.config.get("LDAP_BATCH_CONCURRENCY", 4),
+    )
+    count = sum(1 for r in results if r["status"] == "ok")
+    return jsonify({"count": count, "failed": len(results) - count, "items": results})
 
 
 @api_bp.delete("/users/<username>")
@@ -947,9 +1156,58 @@ def move_user(username: str):
 def list_ous():
     if not _require_session("admin"):
         return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    if _use_mirror():
+        return jsonify({"items": directory_mirror.list_ous(current_app.config["DB_URL"])})
     ldap_client = _ldap_client()
-    ous = ldap_client.list_ous()
-    return jsonify({"items": ous})
+    try:
+        tree = _ou_tree(ldap_client)
+    except ADConnectionError as exc:
+        return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    return jsonify({"items": tree.flat()})
+
+
+@api_bp.get("/ous/tree")
+def list_ou_tree():
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    parent_dn = request.args.get("parent", "").strip()
+    try:
+        tree = _ou_tree(_ldap_client())
+    except ADConnectionError as exc:
+        return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    items = tree.children(parent_dn)
+    if items is None:
+        return jsonify({"code": "OBJECT_NOT_FOUND", "message": "OU 不存在"}), 404
+    return jsonify({"items": items, "parentDn": parent_dn})
+
+
+@api_bp.get("/directory/sync")
+def directory_sync_status():
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    return jsonify({"item": get_directory_sync_status(current_app.config["DB_URL"])})
+
+
+@api_bp.post("/directory/sync")
+def directory_sync_trigger():
+    actor = _require_session("admin")
+    if not actor:
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    payload = request.get_json(silent=True) or {}
+    try:
+        stats = run_directory_sync(
+            ldap_client=_ldap_client(),
+            db_url=current_app.config["DB_URL"],
+            full=bool(payload.get("full", False)),
+            full_interval_seconds=current_app.config["DIRECTORY_SYNC_FULL_INTERVAL"],
+        )
+    except ADConnectionError as exc:
+        _audit(actor, "DIRECTORY_SYNC", "directory", "error", str(exc))
+        return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    if stats is None:
+        return jsonify({"code": "CONFLICT", "message": "同步正在进行中"}), 409
+    _audit(actor, "DIRECTORY_SYNC", "directory", "ok", after=stats)
+    return jsonify({"status": "ok", "item": stats})
 
 
 @api_bp.post("/ous")
@@ -971,6 +1229,7 @@ def create_ou():
     except ADConnectionError as exc:
         _audit(actor, "OU_CREATE", name, "error", str(exc))
         return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    get_ou_tree(ldap_client).invalidate()
     _audit(actor, "OU_CREATE", name, "ok", parent_dn)
     return jsonify({"status": "ok"})
 
@@ -994,6 +1253,7 @@ def update_ou():
     except ADConnectionError as exc:
         _audit(actor, "OU_UPDATE", ou_dn, "error", str(exc))
         return jsonify({"code": "AD_ERROR", "message": str(exc)}), 500
+    get_ou_tree(ldap_client).invalidate()
     _audit(actor, "OU_UPDATE", ou_dn, "ok")
     return jsonify({"status": "ok"})
 
@@ -1018,6 +1278,7 @@ def delete_ou():
         if "CANT_ON_NON_LEAF" in message:
             return jsonify({"code": "AD_NON_LEAF", "message": "该 OU 下还有子对象，无法删除"}), 400
         return jsonify({"code": "AD_ERROR", "message": message}), 500
+    get_ou_tree(ldap_client).invalidate()
     _audit(actor, "OU_DELETE", ou_dn, "ok")
     return jsonify({"status": "ok"})
 
@@ -1030,6 +1291,8 @@ def audit_logs():
     action = request.args.get("action", "").strip()
     target = request.args.get("target", "").strip()
     result = request.args.get("result", "").strip()
+    q = request.args.get("q", "").strip()
+    changed = request.args.get("changed", "").strip()
     page = request.args.get("page", "1").strip()
     page_size = request.args.get("pageSize", "15").strip()
     try:
@@ -1044,17 +1307,80 @@ def audit_logs():
         page_size_i = 15
     if page_size_i > 200:
         page_size_i = 200
-    offset = (page_i - 1) * page_size_i
-    items, total = list_logs(
-        current_app.config["DB_URL"],
-        actor=actor,
-        action=action,
-        target=target,
-        result=result,
-        limit=page_size_i,
-        offset=offset,
-    )
-    return jsonify({"items": items, "total": total, "page": page_i, "pageSize": page_size_i})
+    try:
+        since, until = _time_range()
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    if "page" in request.args and "cursor" not in request.args:
+        # Legacy OFFSET paging: the total stays exact unless the client asks otherwise.
+        if request.args.get("total", "exact").strip().lower() not in {"exact", "estimate"}:
+            return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+        offset = (page_i - 1) * page_size_i
+        items, total = list_logs(
+            current_app.config["DB_URL"],
+            actor=actor,
+            action=action,
+            target=target,
+            result=result,
+            since=since,
+            until=until,
+            q=q,
+            changed=changed,
+            limit=page_size_i,
+            offset=offset,
+            estimate=request.args.get("total", "").strip().lower() == "estimate",
+        )
+        return jsonify({"items": items, "total": total, "page": page_i, "pageSize": page_size_i})
+    total_mode = request.args.get("total", "estimate").strip().lower()
+    if total_mode not in {"exact", "estimate", "none"}:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    try:
+        data = list_logs_page(
+            current_app.config["DB_URL"],
+            actor=actor,
+            action=action,
+            target=target,
+            result=result,
+            since=since,
+            until=until,
+            q=q,
+            changed=changed,
+            limit=page_size_i,
+            cursor=request.args.get("cursor", "").strip(),
+            total=total_mode,
+            count_timeout_ms=current_app.config["AUDIT_COUNT_TIMEOUT_MS"],
+        )
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    data["pageSize"] = page_size_i
+    return jsonify(data)
+
+
+@api_bp.get("/audit/stats")
+def audit_stats_view():
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    interval = request.args.get("interval", "day").strip().lower()
+    if interval not in STATS_INTERVALS:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    try:
+        start, end = stats_range(*_time_range())
+        top = min(max(int(request.args.get("top", "10")), 1), 100)
+        if start >= end:
+            raise ValueError("empty range")
+        data = audit_stats(
+            current_app.config["DB_URL"],
+            start=start,
+            end=end,
+            interval=interval,
+            action=request.args.get("action", "").strip(),
+            result=request.args.get("result", "").strip(),
+            actor_role=request.args.get("actorRole", "").strip(),
+            top=top,
+        )
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    return jsonify(data)
 
 
 @api_bp.get("/password-policy")
@@ -1070,17 +1396,24 @@ def password_policy():
 def audit_export():
     if not _require_session("admin"):
         return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
-    actor = request.args.get("actor", "").strip()
-    action = request.args.get("action", "").strip()
-    target = request.args.get("target", "").strip()
-    result = request.args.get("result", "").strip()
-    limit = int(request.args.get("limit", "1000"))
-    csv_text = export_csv(
-        current_app.config["DB_URL"], actor=actor, action=action, target=target, result=result, limit=limit
+    try:
+        since, until = _time_range()
+        limit = max(int(request.args.get("limit", "0")), 0) or None
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    chunks = export_audit_csv(
+        current_app.config["DB_URL"],
+        actor=request.args.get("actor", "").strip(),
+        action=request.args.get("action", "").strip(),
+        target=request.args.get("target", "").strip(),
+        result=request.args.get("result", "").strip(),
+        since=since,
+        until=until,
+        q=request.args.get("q", "").strip(),
+        changed=request.args.get("changed", "").strip(),
+        limit=limit,
     )
-    resp = current_app.response_class(csv_text, mimetype="text/csv")
-    resp.headers["Content-Disposition"] = "attachment; filename=audit.csv"
-    return resp
+    return _csv_response("audit.csv", coalesce(_prime(chunks)))
 
 
 @api_bp.get("/notifications")
@@ -1105,10 +1438,32 @@ def password_expiry_list():
     return jsonify({"items": items})
 
 
+@api_bp.get("/password-expiry/export")
+def password_expiry_export():
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    try:
+        since, until = _time_range()
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    chunks = export_notifies_csv(
+        current_app.config["DB_URL"],
+        username=request.args.get("username", "").strip(),
+        status=request.args.get("status", "").strip(),
+        since=since,
+        until=until,
+    )
+    return _csv_response("password_expiry_notifies.csv", coalesce(_prime(chunks)))
+
+
 @api_bp.post("/password-expiry/trigger")
 def password_expiry_trigger():
-    if not _require_session("admin"):
+    actor = _require_session("admin")
+    if not actor:
         return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    if current_app.config.get("JOBS_ENABLE"):
+        job_id = enqueue_job(current_app.config["DB_URL"], "password_expiry_check", actor.get("username", ""), {})
+        return _job_accepted(job_id)
     ldap_client = _ldap_client()
     trigger_password_expiry_check(
         ldap_client=ldap_client,
@@ -1118,10 +1473,57 @@ def password_expiry_trigger():
         aliyun_access_key_secret=current_app.config["ALIYUN_ACCESS_KEY_SECRET"],
         aliyun_sign_name=current_app.config["ALIYUN_SMS_SIGN_NAME"],
         aliyun_template_code=current_app.config["ALIYUN_SMS_TEMPLATE_NOTIFY"],
+        use_mirror=current_app.config.get("DIRECTORY_READ_SOURCE") == "mirror",
     )
     return jsonify({"status": "ok"})
 
 
+@api_bp.get("/jobs")
+def jobs_list():
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    try:
+        limit = min(max(int(request.args.get("limit", "50")), 1), 200)
+    except ValueError:
+        return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+    items = list_jobs(
+        current_app.config["DB_URL"],
+        kind=request.args.get("kind", ""),
+        status=request.args.get("status", ""),
+        limit=limit,
+    )
+    return jsonify({"items": items})
+
+
+@api_bp.get("/jobs/<int:job_id>")
+def jobs_get(job_id: int):
+    if not _require_session("admin"):
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    job = get_job(current_app.config["DB_URL"], job_id)
+    if job is None:
+        return jsonify({"code": "OBJECT_NOT_FOUND", "message": "任务不存在"}), 404
+    if request.args.get("format") == "csv":
+        # Per-row report of a finished import job.
+        if job["kind"] != "user_import" or not job["result"]:
+            return jsonify({"code": "VALIDATION_ERROR", "message": "参数校验失败"}), 400
+        resp = current_app.response_class(report_csv(job["result"]["items"]), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = f"attachment; filename=import_report_{job_id}.csv"
+        return resp
+    return jsonify({"item": job})
+
+
+@api_bp.post("/jobs/<int:job_id>/cancel")
+def jobs_cancel(job_id: int):
+    actor = _require_session("admin")
+    if not actor:
+        return jsonify({"code": "PERMISSION_DENIED", "message": "无权限执行该操作"}), 403
+    status = cancel_job(current_app.config["DB_URL"], job_id)
+    if status is None:
+        return jsonify({"code": "OBJECT_NOT_FOUND", "message": "任务不存在"}), 404
+    _audit(actor, "JOB_CANCEL", str(job_id), "ok", status)
+    return jsonify({"status": status})
+
+
 @api_bp.get("/config")
 def config_get():
     if not _require_session("admin"):
@@ -1245,8 +1647,9 @@ def config_set():
         )
         current_app.config["SMS_RETRY_LOOP_STARTED"] = True
     if current_app.config.get("PASSWORD_EXPIRY_ENABLE") and not current_app.config.get("EXPIRY_LOOP_STARTED"):
+        app_config = current_app.config
         start_password_expiry_loop(
-            ldap_client_factory=lambda: _ldap_client(),
+            ldap_client_factory=lambda: ldap_client_from_config(app_config),
             db_url=current_app.config["DB_URL"],
             days_value=current_app.config["PASSWORD_EXPIRY_DAYS"],
             interval_seconds=current_app.config["PASSWORD_EXPIRY_CHECK_INTERVAL"],
@@ -1254,8 +1657,41 @@ def config_set():
             aliyun_access_key_secret=current_app.config["ALIYUN_ACCESS_KEY_SECRET"],
             aliyun_sign_name=current_app.config["ALIYUN_SMS_SIGN_NAME"],
             aliyun_template_code=current_app.config["ALIYUN_SMS_TEMPLATE_NOTIFY"],
+            use_mirror=current_app.config.get("DIRECTORY_READ_SOURCE") == "mirror",
         )
         current_app.config["EXPIRY_LOOP_STARTED"] = True
+    if current_app.config.get("DIRECTORY_SYNC_ENABLE") and not current_app.config.get("DIRECTORY_SYNC_LOOP_STARTED"):
+        app_config = current_app.config
+        start_directory_sync_loop(
+            ldap_client_factory=lambda: ldap_client_from_config(app_config),
+            db_url=current_app.config["DB_URL"],
+            interval_seconds=current_app.config["DIRECTORY_SYNC_INTERVAL"],
+            full_interval_seconds=current_app.config["DIRECTORY_SYNC_FULL_INTERVAL"],
+        )
+        current_app.config["DIRECTORY_SYNC_LOOP_STARTED"] = True
+    if current_app.config.get("OU_TREE_ENABLE") and not current_app.config.get("OU_TREE_LOOP_STARTED"):
+        app_config = current_app.config
+        start_ou_tree_loop(
+            ldap_client_factory=lambda: ldap_client_from_config(app_config),
+            interval_seconds=current_app.config["OU_TREE_REFRESH_INTERVAL"],
+            count_interval_seconds=current_app.config["OU_TREE_COUNT_INTERVAL"],
+        )
+        current_app.config["OU_TREE_LOOP_STARTED"] = True
+    if (
+        current_app.config.get("JOBS_ENABLE")
+        and current_app.config.get("JOB_WORKER_THREADS", 0) > 0
+        and not current_app.config.get("JOB_WORKERS_STARTED")
+    ):
+        app_config = current_app.config
+        start_job_workers(
+            db_url=current_app.config["DB_URL"],
+            config_factory=lambda: app_config,
+            threads=current_app.config["JOB_WORKER_THREADS"],
+            poll_interval=current_app.config["JOB_POLL_INTERVAL"],
+            stale_seconds=current_app.config["JOB_STALE_SECONDS"],
+            max_attempts=current_app.config["JOB_MAX_ATTEMPTS"],
+        )
+        current_app.config["JOB_WORKERS_STARTED"] = True
     return jsonify({"status": "ok"})
 
 
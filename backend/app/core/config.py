@@ -45,7 +45,49 @@ def load_config() -> dict:
         "LDAP_CA_CERT": os.getenv("LDAP_CA_CERT", ""),
         "LDAP_TLS_VERIFY": os.getenv("LDAP_TLS_VERIFY", "true").lower() == "true",
         "LDAP_TLS_ALLOW_WEAK": os.getenv("LDAP_TLS_ALLOW_WEAK", "false").lower() == "true",
+        "LDAP_POOL_SIZE": _get_int("LDAP_POOL_SIZE", 5),
+        "LDAP_POOL_MAX_AGE": _get_int("LDAP_POOL_MAX_AGE", 600),
+        "LDAP_POOL_MAX_IDLE": _get_int("LDAP_POOL_MAX_IDLE", 120),
+        "LDAP_SCHEMA_CACHE_TTL": _get_int("LDAP_SCHEMA_CACHE_TTL", 86400),
+        "LDAP_SCHEMA_CACHE_FILE": os.getenv("LDAP_SCHEMA_CACHE_FILE", ""),
+        "LDAP_PAGE_SIZE": _get_int("LDAP_PAGE_SIZE", 500),
+        "LDAP_VLV_ENABLE": os.getenv("LDAP_VLV_ENABLE", "true").lower() == "true",
+        "LDAP_DN_CACHE_SIZE": _get_int("LDAP_DN_CACHE_SIZE", 10000),
+        "LDAP_DN_CACHE_TTL": _get_int("LDAP_DN_CACHE_TTL", 300),
+        "LDAP_FAST_BIND_ENABLE": os.getenv("LDAP_FAST_BIND_ENABLE", "true").lower() == "true",
+        "LDAP_AUTH_POOL_SIZE": _get_int("LDAP_AUTH_POOL_SIZE", 3),
+        "LDAP_BATCH_CONCURRENCY": _get_int("LDAP_BATCH_CONCURRENCY", 4),
+        "USER_IMPORT_MAX_ROWS": _get_int("USER_IMPORT_MAX_ROWS", 20000),
+        "AUDIT_COUNT_TIMEOUT_MS": _get_int("AUDIT_COUNT_TIMEOUT_MS", 1500),
+        "AUDIT_PARTITION_MONTHS_AHEAD": _get_int("AUDIT_PARTITION_MONTHS_AHEAD", 2),
+        "AUDIT_RETENTION_MONTHS": _get_int("AUDIT_RETENTION_MONTHS", 0),
+        "AUDIT_ARCHIVE_DIR": os.getenv("AUDIT_ARCHIVE_DIR", ""),
+        "AUDIT_MAINTENANCE_INTERVAL": _get_int("AUDIT_MAINTENANCE_INTERVAL", 86400),
+        "AUDIT_ASYNC_ENABLE": os.getenv("AUDIT_ASYNC_ENABLE", "false").lower() == "true",
+        "AUDIT_QUEUE_SIZE": _get_int("AUDIT_QUEUE_SIZE", 10000),
+        "AUDIT_BATCH_SIZE": _get_int("AUDIT_BATCH_SIZE", 500),
+        "AUDIT_FLUSH_INTERVAL_MS": _get_int("AUDIT_FLUSH_INTERVAL_MS", 200),
+        "AUDIT_SPOOL_DIR": os.getenv("AUDIT_SPOOL_DIR", ""),
+        "AUDIT_ROLLUP_INTERVAL": _get_int("AUDIT_ROLLUP_INTERVAL", 60),
+        "JOBS_ENABLE": os.getenv("JOBS_ENABLE", "false").lower() == "true",
+        "JOB_WORKER_THREADS": _get_int("JOB_WORKER_THREADS", 1),
+        "JOB_POLL_INTERVAL": _get_int("JOB_POLL_INTERVAL", 2),
+        "JOB_STALE_SECONDS": _get_int("JOB_STALE_SECONDS", 600),
+        "JOB_MAX_ATTEMPTS": _get_int("JOB_MAX_ATTEMPTS", 3),
+        "LDAP_CIRCUIT_FAILURES": _get_int("LDAP_CIRCUIT_FAILURES", 3),
+        "LDAP_CIRCUIT_OPEN_SECONDS": _get_int("LDAP_CIRCUIT_OPEN_SECONDS", 30),
+        "LDAP_HEDGE_ENABLE": os.getenv("LDAP_HEDGE_ENABLE", "false").lower() == "true",
+        "LDAP_HEDGE_MAX_MS": _get_int("LDAP_HEDGE_MAX_MS", 1000),
+        "LDAP_ADMIN_CACHE_TTL": _get_int("LDAP_ADMIN_CACHE_TTL", 60),
+        "LDAP_POLICY_CACHE_TTL": _get_int("LDAP_POLICY_CACHE_TTL", 600),
         "ADMIN_GROUP_DN": os.getenv("ADMIN_GROUP_DN", ""),
+        "DIRECTORY_SYNC_ENABLE": os.getenv("DIRECTORY_SYNC_ENABLE", "false").lower() == "true",
+        "DIRECTORY_SYNC_INTERVAL": _get_int("DIRECTORY_SYNC_INTERVAL", 60),
+        "DIRECTORY_SYNC_FULL_INTERVAL": _get_int("DIRECTORY_SYNC_FULL_INTERVAL", 86400),
+        "DIRECTORY_READ_SOURCE": os.getenv("DIRECTORY_READ_SOURCE", "ldap"),
+        "OU_TREE_ENABLE": os.getenv("OU_TREE_ENABLE", "false").lower() == "true",
+        "OU_TREE_REFRESH_INTERVAL": _get_int("OU_TREE_REFRESH_INTERVAL", 60),
+        "OU_TREE_COUNT_INTERVAL": _get_int("OU_TREE_COUNT_INTERVAL", 600),
         "OTP_ISSUER": os.getenv("OTP_ISSUER", "ADMTPRO"),
         "OTP_WINDOW": _get_int("OTP_WINDOW", 30),
         "OTP_ACTION_TTL_MINUTES": _get_int("OTP_ACTION_TTL_MINUTES", 10),
@@ -90,6 +132,13 @@ def apply_overrides(config: dict, overrides: dict) -> dict:
             "APP_FOOTER_ENABLED",
             "LDAP_TLS_VERIFY",
             "LDAP_TLS_ALLOW_WEAK",
+            "LDAP_VLV_ENABLE",
+            "LDAP_FAST_BIND_ENABLE",
+            "LDAP_HEDGE_ENABLE",
+            "DIRECTORY_SYNC_ENABLE",
+            "OU_TREE_ENABLE",
+            "JOBS_ENABLE",
+            "AUDIT_ASYNC_ENABLE",
             "SMTP_SSL",
             "SMTP_TLS",
         }:
@@ -101,6 +150,28 @@ def apply_overrides(config: dict, overrides: dict) -> dict:
             "LOGIN_MAX_FAILS",
             "LOGIN_LOCK_MINUTES",
             "OTP_ACTION_TTL_MINUTES",
+            "DIRECTORY_SYNC_INTERVAL",
+            "DIRECTORY_SYNC_FULL_INTERVAL",
+            "LDAP_CIRCUIT_FAILURES",
+            "LDAP_CIRCUIT_OPEN_SECONDS",
+            "LDAP_HEDGE_MAX_MS",
+            "LDAP_ADMIN_CACHE_TTL",
+            "LDAP_POLICY_CACHE_TTL",
+            "OU_TREE_REFRESH_INTERVAL",
+            "OU_TREE_COUNT_INTERVAL",
+            "USER_IMPORT_MAX_ROWS",
+            "JOB_WORKER_THREADS",
+            "JOB_POLL_INTERVAL",
+            "JOB_STALE_SECONDS",
+            "JOB_MAX_ATTEMPTS",
+            "AUDIT_COUNT_TIMEOUT_MS",
+            "AUDIT_PARTITION_MONTHS_AHEAD",
+            "AUDIT_RETENTION_MONTHS",
+            "AUDIT_MAINTENANCE_INTERVAL",
+            "AUDIT_QUEUE_SIZE",
+            "AUDIT_BATCH_SIZE",
+            "AUDIT_FLUSH_INTERVAL_MS",
+            "AUDIT_ROLLUP_INTERVAL",
         }:
             try:
                 config[key] = int(value)
@@ -1,7 +1,44 @@
+import logging
+import threading
 from contextlib import contextmanager
-from typing import Iterator
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Sequence
 
 import psycopg
+from psycopg import ClientCursor
+
+logger = logging.getLogger(__name__)
+
+INDEX_LOCK_ID = 7_304_002
+SCHEMA_LOCK_ID = 7_304_003
+AUDIT_PARTITION_PREFIX = "audit_logs_p"
+
+# Trigram GIN for the mirror's five-column ILIKE '%q%' user search.
+DIRECTORY_INDEXES = [
+    ("idx_directory_users_sam_trgm", "ON directory_users USING gin (sam_account_name gin_trgm_ops)"),
+    ("idx_directory_users_display_name_trgm", "ON directory_users USING gin (display_name gin_trgm_ops)"),
+    ("idx_directory_users_dn_trgm", "ON directory_users USING gin (dn gin_trgm_ops)"),
+    ("idx_directory_users_mail_trgm", "ON directory_users USING gin (mail gin_trgm_ops)"),
+    ("idx_directory_users_mobile_trgm", "ON directory_users USING gin (mobile gin_trgm_ops)"),
+]
+
+# 'simple' keeps tokens as written: details mix Chinese, English, usernames and DNs. Queries
+# must use this exact expression to match the expression index below.
+AUDIT_DETAIL_TSV = "to_tsvector('simple', COALESCE(detail, ''))"
+
+# Index set behind the /audit filters: trigram GIN for the ILIKE '%x%' columns, the keyset
+# order for paging and time ranges, and partial copies of it per result value.
+AUDIT_INDEXES = [
+    ("idx_audit_logs_created", "ON audit_logs (created_at DESC, id DESC)"),
+    ("idx_audit_logs_actor_trgm", "ON audit_logs USING gin (actor gin_trgm_ops)"),
+    ("idx_audit_logs_action_trgm", "ON audit_logs USING gin (action gin_trgm_ops)"),
+    ("idx_audit_logs_target_trgm", "ON audit_logs USING gin (target gin_trgm_ops)"),
+    ("idx_audit_logs_ok", "ON audit_logs (created_at DESC, id DESC) WHERE result = 'ok'"),
+    ("idx_audit_logs_error", "ON audit_logs (created_at DESC, id DESC) WHERE result = 'error'"),
+    ("idx_audit_logs_detail_tsv", f"ON audit_logs USING gin (({AUDIT_DETAIL_TSV}))"),
+    ("idx_audit_logs_before_json", "ON audit_logs USING gin (before_json)"),
+    ("idx_audit_logs_after_json", "ON audit_logs USING gin (after_json)"),
+]
 
 
 @contextmanager
@@ -17,6 +54,335 @@ def get_conn(db_url: str) -> Iterator[psycopg.Connection]:
         conn.close()
 
 
+def count_rows(
+    conn: psycopg.Connection, table: str, clause: str, params: Sequence, *, exact: bool, timeout_ms: int = 1500
+) -> tuple[int, bool]:
+    # (count, estimated). An exact count gets a time budget and falls back to the estimate.
+    if exact:
+        try:
+            with conn.transaction():
+                conn.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+                return conn.execute(f"SELECT COUNT(*) FROM {table} {clause}", params).fetchone()[0], False
+        except psycopg.errors.QueryCanceled:
+            pass
+    # The planner's row estimate is read from statistics and costs the same at any table size.
+    with ClientCursor(conn) as cur:
+        cur.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table} {clause}", params)
+        plan = cur.fetchone()[0]
+    return int(plan[0]["Plan"]["Plan Rows"]), True
+
+
+def copy_csv(db_url: str, query: str, params: Optional[Sequence] = None) -> Iterator[bytes]:
+    # COPY ... TO STDOUT streams CSV straight from the server, with no per-row Python work.
+    with get_conn(db_url) as conn:
+        with conn.cursor() as cur:
+            with cur.copy(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", params) as copy:
+                for data in copy:
+                    yield bytes(data)
+
+
+def ensure_indexes(db_url: str, indexes: Sequence[tuple[str, str]], *, wait: bool = False) -> None:
+    # Built CONCURRENTLY where possible so a large table keeps taking writes.
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        if wait:
+            conn.execute("SELECT pg_advisory_lock(%s)", (INDEX_LOCK_ID,))
+        # Every worker runs init_db on boot; only one of them builds.
+        elif not conn.execute("SELECT pg_try_advisory_lock(%s)", (INDEX_LOCK_ID,)).fetchone()[0]:
+            return
+        try:
+            for name, definition in indexes:
+                try:
+                    _ensure_index(conn, name, definition)
+                except psycopg.Error as exc:
+                    logger.warning("index not created: name=%s error=%s", name, exc)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (INDEX_LOCK_ID,))
+
+
+def _ensure_index(conn: psycopg.Connection, name: str, definition: str, *, unique: bool = False) -> None:
+    # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would skip, so those
+    # are dropped and rebuilt. Partitioned tables can't index CONCURRENTLY; their indexes
+    # cascade to partitions.
+    table = definition.split()[1]
+    partitioned = conn.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table,)).fetchone()
+    concurrently = "" if partitioned and partitioned[0] else "CONCURRENTLY "
+    row = conn.execute(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s",
+        (name,),
+    ).fetchone()
+    if row and row[0]:
+        return
+    if row:
+        logger.warning("rebuilding invalid index: %s", name)
+        conn.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(f"CREATE {kind} {concurrently}IF NOT EXISTS {name} {definition}")
+
+
+def _ensure_indexes_safe(db_url: str, indexes: Sequence[tuple[str, str]]) -> None:
+    try:
+        ensure_indexes(db_url, indexes)
+    except Exception:
+        logger.exception("index maintenance failed")
+
+
+def month_start(value: datetime, offset: int = 0) -> datetime:
+    index = value.year * 12 + value.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def audit_partitions(conn: psycopg.Connection) -> list[tuple[str, Optional[datetime]]]:
+    # (name, upper bound) per partition; the DEFAULT partition has no bound.
+    return conn.execute(
+        """
+        SELECT c.relname,
+               substring(pg_get_expr(c.relpartbound, c.oid) from $$TO \('([^']+)'\)$$)::timestamptz
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_logs'::regclass
+        ORDER BY 2 NULLS LAST
+        """
+    ).fetchall()
+
+
+def ensure_audit_partitions(conn: psycopg.Connection, months_ahead: int = 2) -> list[str]:
+    # Monthly partitions from the current month on. Months already covered by a legacy
+    # (pre-partitioning) partition are skipped.
+    if not audit_logs_partitioned(conn):
+        return []
+    existing = audit_partitions(conn)
+    names = {name for name, _ in existing}
+    floor = max(
+        (upper for name, upper in existing if upper and not name.startswith(AUDIT_PARTITION_PREFIX)),
+        default=None,
+    )
+    now = datetime.now(timezone.utc)
+    created = []
+    for offset in range(months_ahead + 1):
+        start, end = month_start(now, offset), month_start(now, offset + 1)
+        name = f"{AUDIT_PARTITION_PREFIX}{start:%Y%m}"
+        if name in names or (floor and start < floor):
+            continue
+        try:
+            with conn.transaction():
+                if "audit_logs_default" in names:
+                    _create_partition_from_default(conn, name, start, end)
+                else:
+                    conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    )
+            created.append(name)
+        except psycopg.Error as exc:
+            logger.error("audit partition not created: name=%s error=%s", name, exc)
+    if "audit_logs_default" not in names:
+        conn.execute("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT")
+    return created
+
+
+def _create_partition_from_default(conn: psycopg.Connection, name: str, start: datetime, end: datetime) -> None:
+    # Rows dated past the newest partition (clock skew, a late spool replay) sit in the default
+    # partition, and Postgres refuses a partition whose range they fall into. They are moved
+    # into the new table before it is attached, all in the caller's transaction.
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    if not conn.execute(
+        "SELECT 1 FROM audit_logs_default WHERE created_at >= %s AND created_at < %s LIMIT 1",
+        (start, end),
+    ).fetchone():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs {bounds}")
+        return
+    # Holds off new default-partition writes until the attach, which would otherwise fail on them.
+    conn.execute("LOCK TABLE audit_logs_default IN EXCLUSIVE MODE")
+    conn.execute(f"CREATE TABLE {name} (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cur = conn.execute(
+        f"""
+        WITH moved AS (
+          DELETE FROM audit_logs_default WHERE created_at >= %s AND created_at < %s
+          RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+        """,
+        (start, end),
+    )
+    conn.execute(f"ALTER TABLE audit_logs ATTACH PARTITION {name} {bounds}")
+    logger.info("audit rows moved out of the default partition: name=%s rows=%s", name, cur.rowcount)
+
+
+def _create_partitioned_audit_logs(conn: psycopg.Connection) -> None:
+    conn.execute("CREATE SEQUENCE IF NOT EXISTS audit_logs_id_seq")
+    conn.execute(
+        """
+        CREATE TABLE audit_logs (
+          id BIGINT NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+          actor TEXT NOT NULL,
+          actor_role TEXT NOT NULL,
+          action TEXT NOT NULL,
+          target TEXT NOT NULL,
+          result TEXT NOT NULL,
+          ip TEXT NOT NULL,
+          ua TEXT NOT NULL,
+          detail TEXT,
+          before_json JSONB,
+          after_json JSONB,
+          created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+        """
+    )
+    # The parent owns the sequence, so dropping an old partition can never take it along.
+    conn.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+
+def audit_logs_partitioned(conn: psycopg.Connection) -> bool:
+    row = conn.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')").fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def _init_audit_logs(conn: psycopg.Connection) -> None:
+    row = conn.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')").fetchone()
+    if row is None:
+        _create_partitioned_audit_logs(conn)
+    elif row[0] == "r":
+        # Pre-partitioning install. Converting it is left to `python -m app.migrate`, which
+        # prepares the table online first; until then the app keeps writing to the plain table.
+        conn.execute("ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS before_json JSONB")
+        conn.execute("ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS after_json JSONB")
+        logger.warning("audit_logs is not partitioned yet; run `python -m app.migrate`")
+        return
+    elif conn.execute(
+        "SELECT 1 FROM pg_attribute "
+        "WHERE attrelid = 'audit_logs'::regclass AND attname = 'detail_tsv' AND NOT attisdropped"
+    ).fetchone():
+        # Replaced by an expression index; dropping the stored column is a catalog-only change.
+        conn.execute("ALTER TABLE audit_logs DROP COLUMN detail_tsv")
+    ensure_audit_partitions(conn)
+
+
+def migrate_audit_logs(db_url: str) -> bool:
+    # One-time conversion of a plain audit_logs into a partitioned table. The old heap becomes
+    # a partition covering everything up to the end of the current month. All long steps run
+    # online first, so the swap itself only takes brief catalog locks.
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        row = conn.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')").fetchone()
+        if row is None or row[0] != "r":
+            return False
+        newest = conn.execute("SELECT GREATEST(MAX(created_at), NOW()) FROM audit_logs").fetchone()[0]
+        upper = month_start(newest.astimezone(timezone.utc), 1)
+        # Matches the partition bound below, so ATTACH can skip its validation scan.
+        # VALIDATE only takes SHARE UPDATE EXCLUSIVE; writes keep flowing meanwhile.
+        conn.execute("ALTER TABLE audit_logs DROP CONSTRAINT IF EXISTS audit_logs_legacy_bound")
+        conn.execute(
+            f"ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_legacy_bound "
+            f"CHECK (created_at IS NOT NULL AND created_at < '{upper.isoformat()}') NOT VALID"
+        )
+        conn.execute("ALTER TABLE audit_logs VALIDATE CONSTRAINT audit_logs_legacy_bound")
+        # The partition's key must match the parent's (id, created_at). Every index is built
+        # CONCURRENTLY here, so ATTACH and the parent's CREATE INDEX only adopt them.
+        _ensure_index(conn, "audit_logs_legacy_pk", "ON audit_logs (id, created_at)", unique=True)
+        ensure_indexes(db_url, AUDIT_INDEXES, wait=True)
+        built = {
+            name
+            for (name,) in conn.execute(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = 'audit_logs'::regclass AND i.indisvalid"
+            ).fetchall()
+        }
+        with conn.transaction():
+            conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+            conn.execute("LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE")
+            conn.execute(
+                "ALTER TABLE audit_logs DROP CONSTRAINT audit_logs_pkey, "
+                "ADD CONSTRAINT audit_logs_legacy_pkey PRIMARY KEY USING INDEX audit_logs_legacy_pk"
+            )
+            conn.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+            indexes = [(name, definition) for name, definition in AUDIT_INDEXES if name in built]
+            for name, _ in indexes:
+                # Free the names for the parent's indexes, which adopt these.
+                conn.execute(f"ALTER INDEX {name} RENAME TO {name}_legacy")
+            _create_partitioned_audit_logs(conn)
+            conn.execute(
+                f"ALTER TABLE audit_logs ATTACH PARTITION audit_logs_legacy "
+                f"FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')"
+            )
+            conn.execute("ALTER TABLE audit_logs_legacy DROP CONSTRAINT audit_logs_legacy_bound")
+            for name, definition in indexes:
+                conn.execute(f"CREATE INDEX {name} {definition}")
+            ensure_audit_partitions(conn)
+    logger.info("audit_logs migrated to a partitioned table: legacy partition up to %s", upper)
+    return True
+
+
+def _init_audit_rollups(conn: psycopg.Connection) -> None:
+    # Daily counts fed by the audit write path through audit_rollup_deltas. They outlive
+    # retention, so dropped partitions still show up in /audit/stats.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_rollup_deltas (
+          day DATE NOT NULL,
+          action TEXT NOT NULL,
+          result TEXT NOT NULL,
+          actor_role TEXT NOT NULL,
+          count BIGINT NOT NULL
+        );
+        """
+    )
+    exists = conn.execute("SELECT to_regclass('audit_rollups')").fetchone()[0]
+    if exists:
+        return
+    conn.execute(
+        """
+        CREATE TABLE audit_rollups (
+          day DATE NOT NULL,
+          action TEXT NOT NULL,
+          result TEXT NOT NULL,
+          actor_role TEXT NOT NULL,
+          count BIGINT NOT NULL DEFAULT 0,
+          PRIMARY KEY (day, action, result, actor_role)
+        );
+        CREATE TABLE audit_rollup_backfill (
+          cutoff TIMESTAMPTZ NOT NULL,
+          done_until TIMESTAMPTZ
+        );
+        """
+    )
+    # Rows written from here on are counted as they land; older ones are left to
+    # backfill_audit_rollups (python -m app.migrate) so boot never scans audit_logs.
+    conn.execute("INSERT INTO audit_rollup_backfill (cutoff) VALUES (NOW())")
+
+
+def backfill_audit_rollups(db_url: str) -> int:
+    # Counts audit_logs rows older than the rollup cutoff one month per transaction, so the
+    # scan can be interrupted and resumed. Returns the number of months processed.
+    months = 0
+    while True:
+        with get_conn(db_url) as conn:
+            if conn.execute("SELECT to_regclass('audit_rollup_backfill')").fetchone()[0] is None:
+                return months
+            row = conn.execute("SELECT cutoff, done_until FROM audit_rollup_backfill FOR UPDATE").fetchone()
+            if row is None:
+                return months
+            cutoff, lower = row
+            if lower is None:
+                lower = conn.execute("SELECT MIN(created_at) FROM audit_logs").fetchone()[0] or cutoff
+            upper = min(month_start(lower.astimezone(timezone.utc), 1), cutoff)
+            if lower < cutoff:
+                # Through the deltas table, so fold_rollups does the merge as for live writes.
+                conn.execute(
+                    """
+                    INSERT INTO audit_rollup_deltas (day, action, result, actor_role, count)
+                    SELECT (created_at AT TIME ZONE 'UTC')::date, action, result, actor_role, COUNT(*)
+                    FROM audit_logs
+                    WHERE created_at >= %s AND created_at < %s
+                    GROUP BY 1, 2, 3, 4
+                    """,
+                    (lower, upper),
+                )
+                months += 1
+            if upper >= cutoff:
+                conn.execute("DROP TABLE audit_rollup_backfill")
+                return months
+            conn.execute("UPDATE audit_rollup_backfill SET done_until = %s", (upper,))
+
+
 def init_db(db_url: str) -> None:
     with get_conn(db_url) as conn:
         conn.execute(
@@ -30,26 +396,16 @@ def init_db(db_url: str) -> None:
             );
             """
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS audit_logs (
-              id BIGSERIAL PRIMARY KEY,
-              actor TEXT NOT NULL,
-              actor_role TEXT NOT NULL,
-              action TEXT NOT NULL,
-              target TEXT NOT NULL,
-              result TEXT NOT NULL,
-              ip TEXT NOT NULL,
-              ua TEXT NOT NULL,
-              detail TEXT,
-              before_json JSONB,
-              after_json JSONB,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-            """
-        )
-        conn.execute("ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS before_json JSONB")
-        conn.execute("ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS after_json JSONB")
+        # Every worker runs init_db on boot; the audit_logs migration below must run only once.
+        conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+        _init_audit_logs(conn)
+        _init_audit_rollups(conn)
+        try:
+            with conn.transaction():
+                conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except psycopg.Error as exc:
+            # Trusted since PostgreSQL 13; without it the trigram indexes are skipped.
+            logger.warning("pg_trgm unavailable: %s", exc)
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS sms_codes (
@@ -134,3 +490,93 @@ def init_db(db_url: str) -> None:
             );
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS directory_users (
+              object_guid TEXT PRIMARY KEY,
+              dn TEXT NOT NULL,
+              sam_account_name TEXT NOT NULL,
+              display_name TEXT,
+              mail TEXT,
+              mobile TEXT,
+              department TEXT,
+              title TEXT,
+              user_account_control INT NOT NULL DEFAULT 512,
+              password_expiry_at TIMESTAMPTZ,
+              account_expires_at TIMESTAMPTZ,
+              usn_changed BIGINT NOT NULL DEFAULT 0,
+              synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_directory_users_sam ON directory_users (lower(sam_account_name))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_directory_users_display_name ON directory_users (lower(display_name))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_directory_users_department ON directory_users (lower(department))"
+        )
+        # Subtree (OU) filters are DN suffix matches; index the reversed DN for prefix scans.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_directory_users_rdn "
+            "ON directory_users (reverse(lower(dn)) text_pattern_ops)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_directory_users_expiry ON directory_users (password_expiry_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS directory_ous (
+              object_guid TEXT PRIMARY KEY,
+              dn TEXT NOT NULL,
+              name TEXT,
+              description TEXT,
+              usn_changed BIGINT NOT NULL DEFAULT 0,
+              synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_directory_ous_dn ON directory_ous (lower(dn))")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS directory_sync_state (
+              key TEXT PRIMARY KEY,
+              server TEXT NOT NULL,
+              highest_usn BIGINT NOT NULL,
+              last_full_sync TIMESTAMPTZ,
+              last_sync TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+              id BIGSERIAL PRIMARY KEY,
+              kind TEXT NOT NULL,
+              status TEXT NOT NULL DEFAULT 'queued',
+              actor TEXT NOT NULL,
+              params JSONB NOT NULL DEFAULT '{}'::jsonb,
+              payload BYTEA,
+              result JSONB,
+              error TEXT,
+              done INT NOT NULL DEFAULT 0,
+              total INT,
+              attempts INT NOT NULL DEFAULT 0,
+              cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+              worker TEXT,
+              created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+              started_at TIMESTAMPTZ,
+              heartbeat_at TIMESTAMPTZ,
+              finished_at TIMESTAMPTZ
+            );
+            """
+        )
+        # Workers only ever scan the small queued/running slices of the table.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (created_at, id) WHERE status = 'queued'")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (heartbeat_at) WHERE status = 'running'")
+    # Building on a large existing table can take a while; don't hold up worker boot for it.
+    threading.Thread(
+        target=_ensure_indexes_safe, args=(db_url, AUDIT_INDEXES + DIRECTORY_INDEXES), daemon=True
+    ).start()
@@ -0,0 +1,21 @@
+import logging
+
+from .core.config import load_config
+from .core.db import backfill_audit_rollups, init_db, migrate_audit_logs
+
+
+def main() -> None:
+    # One-off schema conversions that are too heavy for worker boot. Safe to re-run.
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    config = load_config()
+    logger = logging.getLogger(__name__)
+    init_db(config["DB_URL"])
+    if not migrate_audit_logs(config["DB_URL"]):
+        logger.info("audit_logs is already partitioned; nothing to do")
+    months = backfill_audit_rollups(config["DB_URL"])
+    if months:
+        logger.info("audit rollups backfilled: months=%s", months)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,80 @@
-import csv
-import io
+from datetime import datetime
+from typing import Iterator, Optional
 
-from .audit_service import list_logs
+from ..core.db import copy_csv
+from .audit_service import log_where
+from .notify_service import notify_where
+from .sms_service import sms_where
 
 
-def export_csv(
+def _limit(sql: str, params: list, limit: Optional[int]) -> tuple[str, list]:
+    if limit:
+        return f"{sql} LIMIT %s", params + [limit]
+    return sql, params
+
+
+def export_audit_csv(
     db_url: str,
     *,
     actor: str = "",
     action: str = "",
     target: str = "",
     result: str = "",
-    limit: int = 1000,
-) -> str:
-    items = list_logs(db_url, actor=actor, action=action, target=target, result=result, limit=limit)
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        ["id", "created_at", "actor", "role", "action", "target", "result", "ip", "ua", "detail", "before", "after"]
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: str = "",
+    changed: str = "",
+    limit: Optional[int] = None,
+) -> Iterator[bytes]:
+    clause, params = log_where(
+        actor=actor,
+        action=action,
+        target=target,
+        result=result,
+        since=since,
+        until=until,
+        q=q,
+        changed=changed,
+    )
+    sql = (
+        "SELECT id, created_at, actor, actor_role AS role, action, target, result, ip, ua, detail, "
+        "before_json AS before, after_json AS after "
+        f"FROM audit_logs {clause} ORDER BY created_at, id"
+    )
+    return copy_csv(db_url, *_limit(sql, params, limit))
+
+
+def export_sms_csv(
+    db_url: str,
+    *,
+    username: str = "",
+    scene: str = "",
+    status: str = "",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> Iterator[bytes]:
+    clause, params = sms_where(username=username, scene=scene, status=status, since=since, until=until)
+    # Verification codes are left out: the export is a delivery record, not a credential dump.
+    sql = (
+        "SELECT id, sent_at, username, phone, scene, send_status, send_attempts, last_error, expires_at, used_at "
+        f"FROM sms_codes {clause} ORDER BY sent_at, id"
+    )
+    return copy_csv(db_url, *_limit(sql, params, limit))
+
+
+def export_notifies_csv(
+    db_url: str,
+    *,
+    username: str = "",
+    status: str = "",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> Iterator[bytes]:
+    clause, params = notify_where(username=username, status=status, since=since, until=until)
+    sql = (
+        "SELECT id, created_at, username, days_left, notify_date, status, last_error "
+        f"FROM password_expiry_notifies {clause} ORDER BY created_at, id"
     )
-    for it in items:
-        writer.writerow(
-            [
-                it.get("id"),
-                it.get("created_at"),
-                it.get("actor"),
-                it.get("actor_role"),
-                it.get("action"),
-                it.get("target"),
-                it.get("result"),
-                it.get("ip"),
-                it.get("ua"),
-                it.get("detail"),
-                it.get("before"),
-                it.get("after"),
-            ]
-        )
-    return output.getvalue()
+    return copy_csv(db_url, *_limit(sql, params, limit))
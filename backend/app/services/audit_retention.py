@@ -0,0 +1,146 @@
+import gzip
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import psycopg
+
+from ..core.db import AUDIT_PARTITION_PREFIX, SCHEMA_LOCK_ID, audit_partitions, ensure_audit_partitions, month_start
+from .audit_service import LOG_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+RETENTION_LOCK_ID = 7_304_004
+
+
+def _archive_partition(conn: psycopg.Connection, name: str, archive_dir: str) -> str:
+    return _archive(conn, f"COPY {name} ({LOG_COLUMNS}) TO STDOUT WITH (FORMAT csv, HEADER)", (), archive_dir, name)
+
+
+def _archive(conn: psycopg.Connection, statement: str, params: tuple, archive_dir: str, name: str) -> str:
+    # Written to a temp file and renamed, so a crash never leaves a truncated archive in place.
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wb") as out:
+        with conn.cursor() as cur:
+            with cur.copy(statement, params) as copy:
+                for data in copy:
+                    out.write(data)
+    with open(tmp_path, "rb") as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _archive_default_rows(conn: psycopg.Connection, cutoff: datetime, archive_dir: str) -> list[str]:
+    # Late rows for months whose partition is gone (or never existed) land in the default
+    # partition. Each expired month is archived next to that month's partition archive and
+    # deleted in the same transaction, so a failed write leaves the rows in place.
+    months = conn.execute(
+        "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') FROM audit_logs_default "
+        "WHERE created_at < %s ORDER BY 1",
+        (cutoff,),
+    ).fetchall()
+    archived = []
+    for (month,) in months:
+        start = month.replace(tzinfo=timezone.utc)
+        end = month_start(start, 1)
+        name = f"{AUDIT_PARTITION_PREFIX}{start:%Y%m}_default_{int(time.time())}"
+        with conn.transaction():
+            path = _archive(
+                conn,
+                f"COPY (DELETE FROM audit_logs_default WHERE created_at >= %s AND created_at < %s "
+                f"RETURNING {LOG_COLUMNS}) TO STDOUT WITH (FORMAT csv, HEADER)",
+                (start, end),
+                archive_dir,
+                name,
+            )
+        logger.info("late audit rows archived from the default partition: month=%s path=%s", f"{start:%Y-%m}", path)
+        archived.append(name)
+    return archived
+
+
+def _detached_partitions(conn: psycopg.Connection) -> list[str]:
+    rows = conn.execute(
+        """
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND NOT relispartition
+          AND (relname = 'audit_logs_legacy' OR relname LIKE %s)
+        ORDER BY relname
+        """,
+        (AUDIT_PARTITION_PREFIX.replace("_", "\\_") + "%",),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def run_audit_maintenance(
+    db_url: str,
+    *,
+    months_ahead: int = 2,
+    retention_months: int = 0,
+    archive_dir: str = "",
+) -> dict:
+    stats: dict = {"created": [], "archived": []}
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        # All workers run this loop; one pass at a time is enough.
+        if not conn.execute("SELECT pg_try_advisory_lock(%s)", (RETENTION_LOCK_ID,)).fetchone()[0]:
+            return stats
+        try:
+            with conn.transaction():
+                # Same lock as init_db, so a booting worker never races this on partition DDL.
+                conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+                stats["created"] = ensure_audit_partitions(conn, months_ahead)
+            if retention_months <= 0:
+                return stats
+            if not archive_dir:
+                logger.warning("audit retention skipped: AUDIT_ARCHIVE_DIR is not set")
+                return stats
+            cutoff = month_start(datetime.now(timezone.utc), -retention_months)
+            # Left over from a pass that stopped between detach and drop.
+            expired = _detached_partitions(conn)
+            for name, upper in audit_partitions(conn):
+                if upper is None or upper > cutoff:
+                    continue
+                # Detached before the copy, so no row can arrive after the archive is taken. A late
+                # spool replay for this month lands in audit_logs_default instead and is archived
+                # from there by _archive_default_rows.
+                conn.execute(f"ALTER TABLE audit_logs DETACH PARTITION {name}")
+                expired.append(name)
+            for name in expired:
+                path = _archive_partition(conn, name, archive_dir)
+                conn.execute(f"DROP TABLE {name}")
+                logger.info("audit partition archived and dropped: name=%s path=%s", name, path)
+                stats["archived"].append(name)
+            if "audit_logs_default" in {name for name, _ in audit_partitions(conn)}:
+                stats["archived"] += _archive_default_rows(conn, cutoff, archive_dir)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (RETENTION_LOCK_ID,))
+    return stats
+
+
+def start_audit_maintenance_loop(
+    *,
+    db_url: str,
+    interval_seconds: int,
+    months_ahead: int,
+    retention_months: int,
+    archive_dir: str,
+) -> None:
+    def _loop() -> None:
+        while True:
+            try:
+                run_audit_maintenance(
+                    db_url,
+                    months_ahead=months_ahead,
+                    retention_months=retention_months,
+                    archive_dir=archive_dir,
+                )
+            except Exception:
+                logger.exception("audit partition maintenance failed")
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=_loop, daemon=True)
+    thread.start()
@@ -1,5 +1,9 @@
+import base64
+import json
+from datetime import datetime, timezone
 from typing import Optional, Tuple
 
+import psycopg
 from psycopg.types.json import Json
 
 
@@ -9,7 +13,12 @@ def _sanitize_text(value: Optional[str]) -> Optional[str]:
     # PostgreSQL TEXT cannot contain NUL bytes.
     return value.replace("\x00", "")
 
-from ..core.db import get_conn
+from ..core.db import AUDIT_DETAIL_TSV, count_rows, get_conn
+from .audit_stats import add_rollups, rollup_day
+from .audit_writer import get_audit_writer
+
+LOG_COLUMNS = "id, actor, actor_role, action, target, result, ip, ua, detail, before_json, after_json, created_at"
+COUNT_TIMEOUT_MS = 1500
 
 
 def write_log(
@@ -36,29 +45,51 @@ def write_log(
     ip = _sanitize_text(ip) or ""
     ua = _sanitize_text(ua) or ""
     detail = _sanitize_text(detail)
+    writer = get_audit_writer(db_url)
+    if writer is not None:
+        # Queued with the event time; the background writer persists it in batches.
+        writer.submit(
+            (
+                actor,
+                actor_role,
+                action,
+                target,
+                result,
+                ip,
+                ua,
+                detail,
+                json.dumps(before) if before is not None else None,
+                json.dumps(after) if after is not None else None,
+                datetime.now(timezone.utc),
+            )
+        )
+        return
     with get_conn(db_url) as conn:
-        conn.execute(
+        created_at = conn.execute(
             """
             INSERT INTO audit_logs
               (actor, actor_role, action, target, result, ip, ua, detail, before_json, after_json)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING created_at
             """,
             (actor, actor_role, action, target, result, ip, ua, detail, before_json, after_json),
-        )
+        ).fetchone()[0]
+        add_rollups(conn, [(rollup_day(created_at), action, result, actor_role)])
 
 
-def list_logs(
-    db_url: str,
+def log_where(
     *,
     actor: str = "",
     action: str = "",
     target: str = "",
     result: str = "",
-    limit: int = 100,
-    offset: int = 0,
-) -> Tuple[list[dict], int]:
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: str = "",
+    changed: str = "",
+) -> Tuple[str, list]:
     where = []
-    params = []
+    params: list = []
     if actor:
         where.append("actor ILIKE %s")
         params.append(f"%{actor}%")
@@ -71,36 +102,167 @@ def list_logs(
     if result:
         where.append("result = %s")
         params.append(result)
+    if since:
+        where.append("created_at >= %s")
+        params.append(since)
+    if until:
+        where.append("created_at < %s")
+        params.append(until)
+    if q:
+        # Served by the GIN expression index idx_audit_logs_detail_tsv.
+        where.append(f"{AUDIT_DETAIL_TSV} @@ websearch_to_tsquery('simple', %s)")
+        params.append(q)
+    if changed:
+        # An attribute counts as changed when an update's two snapshots disagree on it, or when a
+        # creation (after_json only, attributes under "attrs") sets it to a non-empty value.
+        # Deletions have no after snapshot and never match; filter on action for those.
+        # Both arms start with a lookup the GIN indexes on before_json/after_json can serve.
+        where.append(
+            "(((before_json ? %s OR after_json ? %s) AND before_json IS NOT NULL AND after_json IS NOT NULL"
+            " AND before_json -> %s IS DISTINCT FROM after_json -> %s)"
+            " OR (after_json @? %s::jsonpath AND before_json IS NULL"
+            " AND COALESCE(after_json -> 'attrs' ->> %s, '') <> ''))"
+        )
+        params += [changed] * 4 + [f"$.attrs.{json.dumps(changed)}", changed]
+    return ("WHERE " + " AND ".join(where) if where else ""), params
 
-    clause = "WHERE " + " AND ".join(where) if where else ""
-    count_sql = f"SELECT COUNT(*) FROM audit_logs {clause}"
+
+def list_logs(
+    db_url: str,
+    *,
+    actor: str = "",
+    action: str = "",
+    target: str = "",
+    result: str = "",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: str = "",
+    changed: str = "",
+    limit: int = 100,
+    offset: int = 0,
+    estimate: bool = False,
+) -> Tuple[list[dict], int]:
+    clause, params = log_where(
+        actor=actor,
+        action=action,
+        target=target,
+        result=result,
+        since=since,
+        until=until,
+        q=q,
+        changed=changed,
+    )
     sql = (
-        "SELECT id, actor, actor_role, action, target, result, ip, ua, detail, before_json, after_json, created_at "
+        f"SELECT {LOG_COLUMNS} "
         "FROM audit_logs "
         f"{clause} "
-        "ORDER BY created_at DESC "
+        "ORDER BY created_at DESC, id DESC "
         "LIMIT %s OFFSET %s"
     )
 
     with get_conn(db_url) as conn:
-        total = conn.execute(count_sql, params).fetchone()[0]
         rows = conn.execute(sql, params + [limit, offset]).fetchall()
-    items = []
-    for row in rows:
-        items.append(
-            {
-                "id": row[0],
-                "actor": row[1],
-                "actor_role": row[2],
-                "action": row[3],
-                "target": row[4],
-                "result": row[5],
-                "ip": row[6],
-                "ua": row[7],
-                "detail": row[8],
-                "before": row[9],
-                "after": row[10],
-                "created_at": row[11].isoformat(),
-            }
-        )
-    return items, total
+        if estimate:
+            total, _ = count_logs(conn, clause, params, exact=False)
+        else:
+            total = conn.execute(f"SELECT COUNT(*) FROM audit_logs {clause}", params).fetchone()[0]
+    return [_log_from_row(row) for row in rows], total
+
+
+def list_logs_page(
+    db_url: str,
+    *,
+    actor: str = "",
+    action: str = "",
+    target: str = "",
+    result: str = "",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: str = "",
+    changed: str = "",
+    limit: int = 100,
+    cursor: str = "",
+    total: str = "estimate",
+    count_timeout_ms: int = COUNT_TIMEOUT_MS,
+) -> dict:
+    # Keyset pagination: each page seeks past the last (created_at, id) seen, so page N costs
+    # the same as page 1. `total` is "exact", "estimate" or "none".
+    clause, params = log_where(
+        actor=actor,
+        action=action,
+        target=target,
+        result=result,
+        since=since,
+        until=until,
+        q=q,
+        changed=changed,
+    )
+    page_clause, page_params = clause, list(params)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        page_clause = f"{clause} AND " if clause else "WHERE "
+        # The plain created_at bound lets the planner prune newer partitions.
+        page_clause += "created_at <= %s AND (created_at, id) < (%s, %s)"
+        page_params += [created_at, created_at, last_id]
+    sql = (
+        f"SELECT {LOG_COLUMNS} "
+        "FROM audit_logs "
+        f"{page_clause} "
+        "ORDER BY created_at DESC, id DESC "
+        "LIMIT %s"
+    )
+    with get_conn(db_url) as conn:
+        rows = conn.execute(sql, page_params + [limit + 1]).fetchall()
+        count, estimated = None, False
+        if total != "none":
+            count, estimated = count_logs(
+                conn, clause, params, exact=total == "exact", timeout_ms=count_timeout_ms
+            )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][11], rows[-1][0])
+    return {
+        "items": [_log_from_row(row) for row in rows],
+        "nextCursor": next_cursor,
+        "total": count,
+        "totalEstimated": estimated,
+    }
+
+
+def count_logs(
+    conn: psycopg.Connection, clause: str, params: list, *, exact: bool, timeout_ms: int = COUNT_TIMEOUT_MS
+) -> Tuple[int, bool]:
+    # Returns (count, estimated). An exact count gets a time budget and falls back to the estimate.
+    return count_rows(conn, "audit_logs", clause, params, exact=exact, timeout_ms=timeout_ms)
+
+
+def encode_cursor(created_at: datetime, log_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), log_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, log_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _log_from_row(row) -> dict:
+    return {
+        "id": row[0],
+        "actor": row[1],
+        "actor_role": row[2],
+        "action": row[3],
+        "target": row[4],
+        "result": row[5],
+        "ip": row[6],
+        "ua": row[7],
+        "detail": row[8],
+        "before": row[9],
+        "after": row[10],
+        "created_at": row[11].isoformat(),
+    }
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import psycopg
+
+from ..core.db import get_conn, month_start
+
+STATS_INTERVALS = {"day", "week", "month"}
+STATS_DIMENSIONS = ("action", "result", "actor_role")
+MAX_STATS_BUCKETS = 1000
+# Deltas not folded yet are read as well, so stats are current between fold passes.
+ROLLUP_SOURCE = (
+    "(SELECT day, action, result, actor_role, count FROM audit_rollups "
+    "UNION ALL SELECT day, action, result, actor_role, count FROM audit_rollup_deltas) AS r"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def add_rollups(conn: psycopg.Connection, keys: Iterable[tuple[date, str, str, str]]) -> None:
+    # keys are (day, action, result, actor_role), one per audit row. Counts go to an
+    # append-only delta table in the writer's transaction, so concurrent writers never wait
+    # on each other's rollup row; fold_rollups merges them into audit_rollups later.
+    counts = Counter(keys)
+    if not counts:
+        return
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO audit_rollup_deltas (day, action, result, actor_role, count) VALUES (%s, %s, %s, %s, %s)",
+            [key + (count,) for key, count in counts.items()],
+        )
+
+
+def fold_rollups(db_url: str) -> int:
+    # Moves every pending delta into audit_rollups in one statement; rows inserted meanwhile
+    # stay for the next pass.
+    with get_conn(db_url) as conn:
+        cur = conn.execute(
+            """
+            WITH moved AS (
+              DELETE FROM audit_rollup_deltas RETURNING day, action, result, actor_role, count
+            )
+            INSERT INTO audit_rollups (day, action, result, actor_role, count)
+            SELECT day, action, result, actor_role, SUM(count) FROM moved
+            GROUP BY 1, 2, 3, 4
+            ORDER BY 1, 2, 3, 4
+            ON CONFLICT (day, action, result, actor_role)
+            DO UPDATE SET count = audit_rollups.count + EXCLUDED.count
+            """
+        )
+        return cur.rowcount
+
+
+def start_rollup_fold_loop(*, db_url: str, interval_seconds: int) -> None:
+    def _loop() -> None:
+        while True:
+            try:
+                fold_rollups(db_url)
+            except Exception:
+                logger.exception("audit rollup fold failed")
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=_loop, daemon=True)
+    thread.start()
+
+
+def rollup_day(created_at: datetime) -> date:
+    return created_at.astimezone(timezone.utc).date()
+
+
+def _bucket(day: date, interval: str) -> date:
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(bucket: date, interval: str) -> date:
+    if interval == "week":
+        return bucket + timedelta(days=7)
+    if interval == "month":
+        return month_start(datetime(bucket.year, bucket.month, 1), 1).date()
+    return bucket + timedelta(days=1)
+
+
+def audit_stats(
+    db_url: str,
+    *,
+    start: date,
+    end: date,
+    interval: str = "day",
+    action: str = "",
+    result: str = "",
+    actor_role: str = "",
+    top: int = 10,
+) -> dict:
+    # Days are UTC, matching the monthly partitions; `end` is exclusive.
+    buckets = []
+    bucket = _bucket(start, interval)
+    while bucket < end:
+        buckets.append(bucket)
+        if len(buckets) > MAX_STATS_BUCKETS:
+            raise ValueError("too many buckets")
+        bucket = _next_bucket(bucket, interval)
+    where = ["day >= %s", "day < %s"]
+    params: list = [start, end]
+    for column, value in (("action", action), ("result", result), ("actor_role", actor_role)):
+        if value:
+            where.append(f"{column} = %s")
+            params.append(value)
+    clause = "WHERE " + " AND ".join(where)
+    with get_conn(db_url) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT date_trunc(%s, day::timestamp)::date AS bucket,
+                   SUM(count),
+                   COALESCE(SUM(count) FILTER (WHERE result <> 'ok'), 0)
+            FROM {ROLLUP_SOURCE} {clause}
+            GROUP BY 1
+            """,
+            [interval] + params,
+        ).fetchall()
+        tops = {}
+        for column in STATS_DIMENSIONS:
+            tops[column] = [
+                {"key": key, "count": int(count)}
+                for key, count in conn.execute(
+                    f"SELECT {column}, SUM(count) FROM {ROLLUP_SOURCE} {clause} "
+                    f"GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT %s",
+                    params + [top],
+                ).fetchall()
+            ]
+    by_bucket = {bucket: (int(total), int(failed)) for bucket, total, failed in rows}
+    # Empty buckets are filled in so charts get a continuous axis.
+    series = []
+    for bucket in buckets:
+        total, failed = by_bucket.get(bucket, (0, 0))
+        series.append({"bucket": bucket.isoformat(), "total": total, "failed": failed})
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "interval": interval,
+        "total": sum(item["total"] for item in series),
+        "series": series,
+        "top": tops,
+    }
+
+
+def stats_range(since: Optional[datetime], until: Optional[datetime], default_days: int = 30) -> tuple[date, date]:
+    # Rollups are per day, so a partial day at either end counts as the whole day.
+    end = rollup_day(until - timedelta(microseconds=1)) + timedelta(days=1) if until else None
+    if end is None:
+        end = datetime.now(timezone.utc).date() + timedelta(days=1)
+    start = rollup_day(since) if since else end - timedelta(days=default_days)
+    return start, end
@@ -0,0 +1,237 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from ..core.db import get_conn
+from .audit_stats import add_rollups, rollup_day
+
+logger = logging.getLogger(__name__)
+
+AUDIT_INSERT_COLUMNS = (
+    "actor",
+    "actor_role",
+    "action",
+    "target",
+    "result",
+    "ip",
+    "ua",
+    "detail",
+    "before_json",
+    "after_json",
+    "created_at",
+)
+SPOOL_SUFFIX = ".jsonl"
+# A claimed spool file older than this belonged to a process that died mid-replay.
+SPOOL_CLAIM_STALE_SECONDS = 600
+SPOOL_REPLAY_INTERVAL = 30.0
+
+
+def copy_audit_rows(db_url: str, rows: list[tuple]) -> None:
+    columns = ", ".join(AUDIT_INSERT_COLUMNS)
+    with get_conn(db_url) as conn:
+        with conn.cursor() as cur:
+            with cur.copy(f"COPY audit_logs ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        add_rollups(conn, ((rollup_day(row[10]), row[2], row[4], row[1]) for row in rows))
+
+
+def _encode_row(row: tuple) -> str:
+    *values, created_at = row
+    return json.dumps(values + [created_at.isoformat()], ensure_ascii=False)
+
+
+def _decode_row(line: str) -> tuple:
+    *values, created_at = json.loads(line)
+    return tuple(values) + (datetime.fromisoformat(created_at),)
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        put_timeout_ms: int = 100,
+        spool_dir: str = "",
+    ) -> None:
+        self.db_url = db_url
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval_ms, 1) / 1000
+        self.put_timeout = max(put_timeout_ms, 0) / 1000
+        self.spool_dir = spool_dir
+        self._queue: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._last_replay = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="audit-writer")
+        self.stats = {"written": 0, "spooled": 0, "direct": 0, "lost": 0}
+
+    def start(self) -> None:
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, row: tuple) -> None:
+        if self._stop.is_set():
+            self._write([row])
+            return
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: once the queue is full the caller pays for its own write
+            # instead of the process buffering without bound.
+            self.stats["direct"] += 1
+            self._write([row])
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._drain()
+            if batch:
+                self._write(batch)
+            if time.monotonic() - self._last_replay >= SPOOL_REPLAY_INTERVAL:
+                self._replay_spool()
+
+    def _drain(self) -> list[tuple]:
+        # Waits for the first row, then collects until batch_size rows or flush_interval elapses.
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows: list[tuple]) -> None:
+        with self._flush_lock:
+            try:
+                copy_audit_rows(self.db_url, rows)
+            except Exception as exc:
+                logger.warning("audit flush failed: rows=%s error=%s", len(rows), exc)
+                self._spool(rows)
+                return
+            self.stats["written"] += len(rows)
+
+    def _spool(self, rows: list[tuple]) -> None:
+        if self.spool_dir:
+            try:
+                os.makedirs(self.spool_dir, exist_ok=True)
+                path = os.path.join(self.spool_dir, f"audit-{time.time_ns()}-{os.getpid()}{SPOOL_SUFFIX}")
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as fh:
+                    for row in rows:
+                        fh.write(_encode_row(row) + "\n")
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp_path, path)
+                self.stats["spooled"] += len(rows)
+                return
+            except OSError:
+                logger.exception("audit spool write failed: dir=%s", self.spool_dir)
+        # Last resort: the rows go to the application log rather than disappearing silently.
+        self.stats["lost"] += len(rows)
+        for row in rows:
+            logger.error("audit row not persisted: %s", _encode_row(row))
+
+    def _replay_spool(self) -> None:
+        self._last_replay = time.monotonic()
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return
+        with self._flush_lock:
+            self._replay_files()
+
+    def _replay_files(self) -> None:
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith(".replay"):
+                try:
+                    if time.time() - os.path.getmtime(path) > SPOOL_CLAIM_STALE_SECONDS:
+                        os.replace(path, path.rsplit(".", 2)[0])
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(SPOOL_SUFFIX):
+                continue
+            # Renaming claims the file, so several API processes sharing the directory
+            # never replay it twice.
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                with open(claimed, encoding="utf-8") as fh:
+                    rows = [_decode_row(line) for line in fh if line.strip()]
+                copy_audit_rows(self.db_url, rows)
+            except Exception as exc:
+                logger.warning("audit spool replay failed: file=%s error=%s", name, exc)
+                os.replace(claimed, path)
+                return
+            os.remove(claimed)
+            self.stats["written"] += len(rows)
+            logger.info("audit spool replayed: file=%s rows=%s", name, len(rows))
+
+    def flush(self) -> None:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(rows), self.batch_size):
+            self._write(rows[start : start + self.batch_size])
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self.flush()
+
+
+_WRITERS: dict[str, AuditWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_audit_writer(db_url: str) -> Optional[AuditWriter]:
+    return _WRITERS.get(db_url)
+
+
+def start_audit_writer(
+    *,
+    db_url: str,
+    queue_size: int,
+    batch_size: int,
+    flush_interval_ms: int,
+    spool_dir: str,
+) -> AuditWriter:
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(db_url)
+        if writer is None:
+            writer = AuditWriter(
+                db_url,
+                queue_size=queue_size,
+                batch_size=batch_size,
+                flush_interval_ms=flush_interval_ms,
+                spool_dir=spool_dir,
+            )
+            writer.start()
+            _WRITERS[db_url] = writer
+        return writer
@@ -56,3 +56,18 @@ def is_locked(db_url: str, username: str) -> Optional[datetime]:
         if locked_until and locked_until > _now():
             return locked_until
         return None
+
+
+def get_login_state(db_url: str, username: str) -> Optional[dict]:
+    # Lock check and "is there anything to reset" in a single read; login only writes when it must.
+    with get_conn(db_url) as conn:
+        row = conn.execute(
+            """
+            SELECT fail_count, CASE WHEN locked_until > NOW() THEN locked_until END
+            FROM login_attempts WHERE username=%s
+            """,
+            (username,),
+        ).fetchone()
+    if not row:
+        return None
+    return {"fail_count": row[0], "locked_until": row[1]}
@@ -0,0 +1,70 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Optional, TypeVar
+
+from ..adapters.ldap_client import LDAPClient
+from ..core.errors import ADConnectionError
+
+logger = logging.getLogger(__name__)
+
+BATCH_ACTIONS = {"enable", "disable", "move"}
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def run_parallel(
+    fn: Callable[[T], R],
+    items: list[T],
+    workers: int,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> list[R]:
+    # Results keep the input order; progress is reported as items finish, and an exception
+    # from it (e.g. a job cancellation) drops the items that have not started yet.
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ldap-batch") as executor:
+        futures = [executor.submit(fn, item) for item in items]
+        try:
+            for done, _ in enumerate(as_completed(futures), start=1):
+                if progress:
+                    progress(done, len(items))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return [future.result() for future in futures]
+
+
+def _run_item(ldap_client: LDAPClient, action: str, username: str, target_ou: str) -> dict:
+    try:
+        user_dn = ldap_client.get_user_dn(username)
+        if not user_dn:
+            return {"username": username, "status": "not_found"}
+        if action == "enable":
+            ldap_client.set_user_enabled(user_dn, True)
+        elif action == "disable":
+            ldap_client.set_user_enabled(user_dn, False)
+        elif action == "move":
+            ldap_client.move_user(user_dn, target_ou)
+        return {"username": username, "status": "ok"}
+    except ADConnectionError as exc:
+        return {"username": username, "status": "error", "message": str(exc)}
+    except Exception as exc:
+        logger.exception("batch item failed: action=%s username=%s", action, username)
+        return {"username": username, "status": "error", "message": str(exc)}
+
+
+def run_batch(
+    ldap_client: LDAPClient,
+    *,
+    action: str,
+    usernames: Iterable[str],
+    target_ou: str = "",
+    concurrency: int = 4,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> list[dict]:
+    # Never run more items at once than there are pooled connections to the DC.
+    workers = max(1, min(concurrency, ldap_client.pool_size))
+    names = list(dict.fromkeys(str(u).strip() for u in usernames if str(u).strip()))
+    if not names:
+        return []
+    return run_parallel(lambda username: _run_item(ldap_client, action, username, target_ou), names, workers, progress)
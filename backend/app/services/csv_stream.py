@@ -0,0 +1,56 @@
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator
+
+# Rows are buffered up to this size before being handed to the WSGI server as one chunk.
+FLUSH_BYTES = 64 * 1024
+
+
+def iter_csv(header: Iterable[str], rows: Iterable[Iterable]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    # The header goes out on its own so the download starts before the first page is read.
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def coalesce(chunks: Iterable[bytes], size: int = FLUSH_BYTES) -> Iterator[bytes]:
+    # Merges small pieces (COPY yields about one row each) into chunks of roughly `size` bytes.
+    # The first piece (the header) is passed through so the download starts right away.
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is not None:
+        yield first
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    # wbits=31 writes a gzip header and trailer, so the output is a regular .gz file.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,286 @@
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional, Tuple
+
+from ..core.db import count_rows, get_conn
+
+USER_COLUMNS = (
+    "dn, sam_account_name, display_name, mail, mobile, department, title, "
+    "user_account_control, password_expiry_at, account_expires_at"
+)
+
+SORT_COLUMNS = {
+    "displayName": "lower(display_name)",
+    "sAMAccountName": "lower(sam_account_name)",
+    "department": "lower(department)",
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def upsert_users(db_url: str, users: Iterable[dict], synced_at: datetime) -> int:
+    rows = [
+        (
+            u["guid"],
+            u["dn"],
+            u.get("sAMAccountName") or "",
+            u.get("displayName"),
+            u.get("mail"),
+            u.get("mobile"),
+            u.get("department"),
+            u.get("title"),
+            u.get("userAccountControl", 512),
+            u.get("password_expiry_at"),
+            u.get("account_expires_at"),
+            u.get("usn_changed", 0),
+            synced_at,
+        )
+        for u in users
+        if u.get("guid")
+    ]
+    if not rows:
+        return 0
+    with get_conn(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO directory_users
+                  (object_guid, dn, sam_account_name, display_name, mail, mobile, department, title,
+                   user_account_control, password_expiry_at, account_expires_at, usn_changed, synced_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (object_guid) DO UPDATE SET
+                  dn = EXCLUDED.dn,
+                  sam_account_name = EXCLUDED.sam_account_name,
+                  display_name = EXCLUDED.display_name,
+                  mail = EXCLUDED.mail,
+                  mobile = EXCLUDED.mobile,
+                  department = EXCLUDED.department,
+                  title = EXCLUDED.title,
+                  user_account_control = EXCLUDED.user_account_control,
+                  password_expiry_at = EXCLUDED.password_expiry_at,
+                  account_expires_at = EXCLUDED.account_expires_at,
+                  usn_changed = EXCLUDED.usn_changed,
+                  synced_at = EXCLUDED.synced_at
+                """,
+                rows,
+            )
+    return len(rows)
+
+
+def upsert_ous(db_url: str, ous: Iterable[dict], synced_at: datetime) -> int:
+    rows = [
+        (o["guid"], o["dn"], o.get("name"), o.get("description"), o.get("usn_changed", 0), synced_at)
+        for o in ous
+        if o.get("guid")
+    ]
+    if not rows:
+        return 0
+    with get_conn(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO directory_ous (object_guid, dn, name, description, usn_changed, synced_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (object_guid) DO UPDATE SET
+                  dn = EXCLUDED.dn,
+                  name = EXCLUDED.name,
+                  description = EXCLUDED.description,
+                  usn_changed = EXCLUDED.usn_changed,
+                  synced_at = EXCLUDED.synced_at
+                """,
+                rows,
+            )
+    return len(rows)
+
+
+def delete_objects(db_url: str, guids: list[str]) -> int:
+    if not guids:
+        return 0
+    with get_conn(db_url) as conn:
+        deleted = conn.execute("DELETE FROM directory_users WHERE object_guid = ANY(%s)", (guids,)).rowcount
+        deleted += conn.execute("DELETE FROM directory_ous WHERE object_guid = ANY(%s)", (guids,)).rowcount
+    return deleted
+
+
+def prune_unseen(db_url: str, synced_at: datetime) -> int:
+    # After a full load anything not touched by it no longer exists in (or was moved out of) the base DN.
+    with get_conn(db_url) as conn:
+        deleted = conn.execute("DELETE FROM directory_users WHERE synced_at < %s", (synced_at,)).rowcount
+        deleted += conn.execute("DELETE FROM directory_ous WHERE synced_at < %s", (synced_at,)).rowcount
+    return deleted
+
+
+def get_sync_state(db_url: str, key: str) -> Optional[dict]:
+    with get_conn(db_url) as conn:
+        row = conn.execute(
+            "SELECT server, highest_usn, last_full_sync, last_sync FROM directory_sync_state WHERE key = %s",
+            (key,),
+        ).fetchone()
+    if not row:
+        return None
+    return {
+        "server": row[0],
+        "highest_usn": row[1],
+        "last_full_sync": row[2],
+        "last_sync": row[3],
+    }
+
+
+def set_sync_state(db_url: str, key: str, server: str, highest_usn: int, full: bool) -> None:
+    with get_conn(db_url) as conn:
+        conn.execute(
+            """
+            INSERT INTO directory_sync_state (key, server, highest_usn, last_full_sync, last_sync)
+            VALUES (%s, %s, %s, CASE WHEN %s THEN NOW() END, NOW())
+            ON CONFLICT (key) DO UPDATE SET
+              server = EXCLUDED.server,
+              highest_usn = EXCLUDED.highest_usn,
+              last_full_sync = COALESCE(EXCLUDED.last_full_sync, directory_sync_state.last_full_sync),
+              last_sync = NOW()
+            """,
+            (key, server, highest_usn, full),
+        )
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _dn_suffix_pattern(dn: str) -> str:
+    # Subtree match as a prefix of the reversed DN, so idx_directory_users_rdn applies. The DN
+    # is reversed before escaping; escaping first would put each backslash after its character.
+    return _like_escape(f",{dn}".lower()[::-1]) + "%"
+
+
+def _user_where(query: str, ou_dn: str, enabled: Optional[bool], require_mobile: bool) -> Tuple[str, list]:
+    where = []
+    params: list = []
+    if query:
+        # Served by the trigram indexes in DIRECTORY_INDEXES.
+        q = f"%{_like_escape(query.replace('*', ''))}%"
+        where.append(
+            "(sam_account_name ILIKE %s ESCAPE '\\' OR display_name ILIKE %s ESCAPE '\\' "
+            "OR dn ILIKE %s ESCAPE '\\' OR mail ILIKE %s ESCAPE '\\' OR mobile ILIKE %s ESCAPE '\\')"
+        )
+        params.extend([q, q, q, q, q])
+    if ou_dn:
+        where.append("reverse(lower(dn)) LIKE %s ESCAPE '\\'")
+        params.append(_dn_suffix_pattern(ou_dn))
+    if enabled is True:
+        where.append("(user_account_control & 2) = 0")
+    if enabled is False:
+        where.append("(user_account_control & 2) <> 0")
+    if require_mobile:
+        where.append("btrim(COALESCE(mobile, '')) <> ''")
+    return ("WHERE " + " AND ".join(where) if where else ""), params
+
+
+def _user_from_row(row, now: datetime, fields: Optional[Iterable[str]] = None) -> dict:
+    uac = row[7] or 0
+    expiry_dt = row[8]
+    account_dt = row[9]
+    item = {
+        "dn": row[0],
+        "sAMAccountName": row[1],
+        "displayName": row[2],
+        "mail": row[3],
+        "mobile": row[4],
+        "department": row[5],
+        "title": row[6],
+        "enabled": not (uac & 2),
+        "days_left": max((expiry_dt - now).days, 0) if expiry_dt else None,
+        "password_expiry_date": expiry_dt.date().isoformat() if expiry_dt else None,
+        "account_expiry_date": account_dt.date().isoformat() if account_dt else None,
+        "password_never_expires": bool(uac & 0x10000),
+    }
+    if fields is None:
+        return item
+    # The mirror has no memberOf; requested fields it cannot provide are simply absent.
+    return {k: item[k] for k in fields if k in item}
+
+
+def search_users(
+    db_url: str,
+    *,
+    query: str = "",
+    ou_dn: str = "",
+    enabled: Optional[bool] = None,
+    require_mobile: bool = False,
+    sort: str = "displayName",
+    reverse: bool = False,
+    limit: int = 15,
+    offset: int = 0,
+    fields: Optional[Iterable[str]] = None,
+    exact_count: bool = True,
+) -> Tuple[list[dict], int, bool]:
+    # Returns (items, total, estimated). Without exact_count the total is the planner's
+    # estimate, so paging past the first page doesn't rescan every match.
+    clause, params = _user_where(query, ou_dn, enabled, require_mobile)
+    order = SORT_COLUMNS.get(sort, SORT_COLUMNS["displayName"])
+    direction = "DESC" if reverse else "ASC"
+    sql = (
+        f"SELECT {USER_COLUMNS} FROM directory_users {clause} "
+        f"ORDER BY {order} {direction}, object_guid "
+        "LIMIT %s OFFSET %s"
+    )
+    with get_conn(db_url) as conn:
+        total, estimated = count_rows(conn, "directory_users", clause, params, exact=exact_count)
+        rows = conn.execute(sql, params + [limit, offset]).fetchall()
+    now = _now()
+    return [_user_from_row(row, now, fields) for row in rows], total, estimated
+
+
+def iter_users(
+    db_url: str,
+    *,
+    query: str = "",
+    ou_dn: str = "",
+    enabled: Optional[bool] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Iterator[dict]:
+    clause, params = _user_where(query, ou_dn, enabled, False)
+    sql = f"SELECT {USER_COLUMNS} FROM directory_users {clause} ORDER BY lower(sam_account_name)"
+    now = _now()
+    with get_conn(db_url) as conn:
+        # Named cursor: rows are streamed from the server instead of fetched all at once.
+        with conn.cursor(name="directory_users_export") as cur:
+            cur.execute(sql, params)
+            for row in cur:
+                yield _user_from_row(row, now, fields)
+
+
+def list_ous(db_url: str, base_dn: str = "") -> list[dict]:
+    where = ""
+    params: list = []
+    if base_dn:
+        where = "WHERE lower(dn) = lower(%s) OR reverse(lower(dn)) LIKE %s ESCAPE '\\'"
+        params = [base_dn, _dn_suffix_pattern(base_dn)]
+    with get_conn(db_url) as conn:
+        rows = conn.execute(f"SELECT dn, name, description FROM directory_ous {where} ORDER BY dn", params).fetchall()
+    return [{"dn": r[0], "name": r[1], "description": r[2]} for r in rows]
+
+
+def list_users_password_expiring(db_url: str, max_days: int) -> list[dict]:
+    now = _now()
+    with get_conn(db_url) as conn:
+        rows = conn.execute(
+            """
+            SELECT sam_account_name, display_name, mail, mobile, password_expiry_at
+            FROM directory_users
+            WHERE (user_account_control & 2) = 0
+              AND password_expiry_at >= %s
+              AND password_expiry_at < %s + make_interval(days => %s + 1)
+            """,
+            (now, now, max_days),
+        ).fetchall()
+    return [
+        {
+            "sAMAccountName": r[0],
+            "displayName": r[1],
+            "mail": r[2],
+            "mobile": r[3],
+            "days_left": (r[4] - now).days,
+        }
+        for r in rows
+    ]
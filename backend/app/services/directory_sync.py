@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from ..adapters.ldap_client import LDAPClient
+from ..core.db import get_conn
+from .directory_mirror import (
+    delete_objects,
+    get_sync_state,
+    prune_unseen,
+    set_sync_state,
+    upsert_ous,
+    upsert_users,
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_KEY = "default"
+SYNC_LOCK_ID = 7_304_001
+BATCH_SIZE = 500
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _batches(items: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_directory_sync(
+    *,
+    ldap_client: LDAPClient,
+    db_url: str,
+    full: bool = False,
+    full_interval_seconds: int = 86400,
+) -> Optional[dict]:
+    # Only one worker may sync at a time; the others simply skip this round.
+    with get_conn(db_url) as lock_conn:
+        locked = lock_conn.execute("SELECT pg_try_advisory_lock(%s)", (SYNC_LOCK_ID,)).fetchone()[0]
+        if not locked:
+            return None
+        # Session-level lock survives the commit; don't sit idle in a transaction for the whole sync.
+        lock_conn.commit()
+        try:
+            return _sync(ldap_client, db_url, full, full_interval_seconds)
+        finally:
+            lock_conn.execute("SELECT pg_advisory_unlock(%s)", (SYNC_LOCK_ID,))
+
+
+def _sync(ldap_client: LDAPClient, db_url: str, full: bool, full_interval_seconds: int) -> dict:
+    state = get_sync_state(db_url, SYNC_STATE_KEY)
+    # USNs are per DC: the watermark and every search below must hit the same one.
+    ldap_client.pin()
+    # Capture the watermark before reading so changes made during the scan are picked up next round.
+    position = ldap_client.get_sync_position()
+    if not full:
+        full = (
+            state is None
+            or state["server"] != position["server"]
+            or state["last_full_sync"] is None
+            or state["last_full_sync"] < _now() - timedelta(seconds=full_interval_seconds)
+            # A restored or reset DC can move backwards.
+            or state["highest_usn"] > position["highest_usn"]
+        )
+    started = _now()
+    since_usn = 0 if full else state["highest_usn"] + 1
+    stats = {"full": full, "users": 0, "ous": 0, "deleted": 0}
+    for batch in _batches(ldap_client.iter_directory_ous(since_usn), BATCH_SIZE):
+        stats["ous"] += upsert_ous(db_url, batch, started)
+    for batch in _batches(ldap_client.iter_directory_users(since_usn), BATCH_SIZE):
+        stats["users"] += upsert_users(db_url, batch, started)
+    if full:
+        stats["deleted"] = prune_unseen(db_url, started)
+    else:
+        guids = []
+        for guid in ldap_client.iter_deleted_guids(since_usn):
+            guids.append(guid)
+            if len(guids) >= BATCH_SIZE:
+                stats["deleted"] += delete_objects(db_url, guids)
+                guids = []
+        stats["deleted"] += delete_objects(db_url, guids)
+    set_sync_state(db_url, SYNC_STATE_KEY, position["server"], position["highest_usn"], full)
+    logger.info(
+        "directory sync done: full=%s users=%s ous=%s deleted=%s usn=%s",
+        full,
+        stats["users"],
+        stats["ous"],
+        stats["deleted"],
+        position["highest_usn"],
+    )
+    return stats
+
+
+def get_directory_sync_status(db_url: str) -> dict:
+    state = get_sync_state(db_url, SYNC_STATE_KEY)
+    with get_conn(db_url) as conn:
+        users = conn.execute("SELECT COUNT(*) FROM directory_users").fetchone()[0]
+        ous = conn.execute("SELECT COUNT(*) FROM directory_ous").fetchone()[0]
+    return {
+        "server": state["server"] if state else None,
+        "highest_usn": state["highest_usn"] if state else None,
+        "last_full_sync": state["last_full_sync"].isoformat() if state and state["last_full_sync"] else None,
+        "last_sync": state["last_sync"].isoformat() if state else None,
+        "users": users,
+        "ous": ous,
+    }
+
+
+def start_directory_sync_loop(
+    *,
+    ldap_client_factory,
+    db_url: str,
+    interval_seconds: int,
+    full_interval_seconds: int,
+) -> None:
+    if not db_url:
+        return
+
+    def _loop() -> None:
+        while True:
+            try:
+                run_directory_sync(
+                    ldap_client=ldap_client_factory(),
+                    db_url=db_url,
+                    full_interval_seconds=full_interval_seconds,
+                )
+            except Exception:
+                logger.exception("directory sync failed")
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=_loop, daemon=True)
+    thread.start()
@@ -13,8 +13,8 @@ def check_db(db_url: str) -> bool:
 
 def check_ldap(ldap_client: LDAPClient) -> bool:
     try:
-        conn = ldap_client._service_conn()
-        conn.unbind()
+        with ldap_client._service_conn():
+            pass
         return True
     except Exception:
         return False
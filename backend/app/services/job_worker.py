@@ -0,0 +1,197 @@
+import io
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+from ..adapters.ldap_client import ldap_client_from_config
+from .audit_service import write_log
+from .batch_service import run_batch
+from .jobs import JobCancelled, claim_job, finish_job, report_progress, requeue_stale_jobs, touch_job
+from .password_expiry import trigger_password_expiry_check
+from .user_import import run_import
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    def __init__(self, db_url: str, job_id: int, worker: str, interval_seconds: float = 1.0) -> None:
+        self.db_url = db_url
+        self.job_id = job_id
+        self.worker = worker
+        self.interval_seconds = interval_seconds
+        self._last_report = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        # Throttled to one UPDATE per interval, except for the final item.
+        now = time.monotonic()
+        if (total is None or done < total) and now - self._last_report < self.interval_seconds:
+            return
+        self._last_report = now
+        if report_progress(self.db_url, self.job_id, self.worker, done, total):
+            raise JobCancelled()
+
+
+def _heartbeat(ctx: JobContext, stop: threading.Event, interval_seconds: float) -> None:
+    # Keeps heartbeat_at fresh through phases that report no progress (validation, lookups,
+    # a long LDAP scan), so requeue_stale_jobs doesn't hand a live job to another worker.
+    while not stop.wait(interval_seconds):
+        try:
+            if not touch_job(ctx.db_url, ctx.job_id, ctx.worker):
+                return
+        except Exception:
+            logger.warning("job heartbeat failed: id=%s", ctx.job_id, exc_info=True)
+
+
+def _user_import(config: dict, job: dict, ctx: JobContext) -> dict:
+    dry_run = bool(job["params"].get("dryRun"))
+    try:
+        result = run_import(
+            ldap_client_from_config(config),
+            io.BytesIO(job["payload"] or b""),
+            concurrency=config.get("LDAP_BATCH_CONCURRENCY", 4),
+            max_rows=config["USER_IMPORT_MAX_ROWS"],
+            dry_run=dry_run,
+            progress=ctx.progress,
+        )
+    except JobCancelled as exc:
+        # Accounts created before the cancellation exist in AD and are audited all the same.
+        if not dry_run and exc.result:
+            _audit_import(config, job, exc.result, detail=f"job={job['id']} cancelled")
+        raise
+    if not dry_run:
+        _audit_import(config, job, result, detail=f"job={job['id']}")
+    return result
+
+
+def _audit_import(config: dict, job: dict, result: dict, *, detail: str) -> None:
+    write_log(
+        config["DB_URL"],
+        actor=job["actor"],
+        actor_role="admin",
+        action="USER_IMPORT",
+        target="users",
+        result="ok",
+        ip="",
+        ua="",
+        detail=detail,
+        after=result["counts"],
+    )
+
+
+def _user_batch(config: dict, job: dict, ctx: JobContext) -> dict:
+    params = job["params"]
+    results = run_batch(
+        ldap_client_from_config(config),
+        action=params["action"],
+        usernames=params["usernames"],
+        target_ou=params.get("targetOuDn", ""),
+        concurrency=config.get("LDAP_BATCH_CONCURRENCY", 4),
+        progress=ctx.progress,
+    )
+    count = sum(1 for r in results if r["status"] == "ok")
+    return {"count": count, "failed": len(results) - count, "items": results}
+
+
+def _password_expiry_check(config: dict, job: dict, ctx: JobContext) -> dict:
+    trigger_password_expiry_check(
+        ldap_client=ldap_client_from_config(config),
+        db_url=config["DB_URL"],
+        days_value=config["PASSWORD_EXPIRY_DAYS"],
+        aliyun_access_key_id=config["ALIYUN_ACCESS_KEY_ID"],
+        aliyun_access_key_secret=config["ALIYUN_ACCESS_KEY_SECRET"],
+        aliyun_sign_name=config["ALIYUN_SMS_SIGN_NAME"],
+        aliyun_template_code=config["ALIYUN_SMS_TEMPLATE_NOTIFY"],
+        use_mirror=config.get("DIRECTORY_READ_SOURCE") == "mirror",
+        progress=ctx.progress,
+    )
+    return {"status": "ok"}
+
+
+JOB_HANDLERS: dict[str, Callable[[dict, dict, JobContext], dict]] = {
+    "user_import": _user_import,
+    "user_batch": _user_batch,
+    "password_expiry_check": _password_expiry_check,
+}
+
+
+def run_next_job(
+    db_url: str,
+    worker: str,
+    config_factory: Callable[[], dict],
+    heartbeat_seconds: float = 30.0,
+) -> bool:
+    job = claim_job(db_url, worker)
+    if job is None:
+        return False
+    logger.info("job started: id=%s kind=%s worker=%s", job["id"], job["kind"], worker)
+    ctx = JobContext(db_url, job["id"], worker)
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(ctx, stop, heartbeat_seconds), daemon=True).start()
+    try:
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            raise ValueError(f"unknown job kind: {job['kind']}")
+        result = handler(config_factory(), job, ctx)
+    except JobCancelled as exc:
+        logger.info("job cancelled: id=%s kind=%s", job["id"], job["kind"])
+        finished = finish_job(db_url, job["id"], worker, "cancelled", result=exc.result)
+    except Exception as exc:
+        logger.exception("job failed: id=%s kind=%s", job["id"], job["kind"])
+        finished = finish_job(db_url, job["id"], worker, "failed", error=str(exc))
+    else:
+        logger.info("job succeeded: id=%s kind=%s", job["id"], job["kind"])
+        finished = finish_job(db_url, job["id"], worker, "succeeded", result=result)
+    finally:
+        stop.set()
+    if not finished:
+        logger.warning("job was requeued while running, result discarded: id=%s worker=%s", job["id"], worker)
+    return True
+
+
+def run_worker(
+    *,
+    db_url: str,
+    config_factory: Callable[[], dict],
+    poll_interval: int,
+    stale_seconds: int,
+    max_attempts: int,
+) -> None:
+    worker = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    while True:
+        try:
+            requeued = requeue_stale_jobs(db_url, stale_seconds, max_attempts)
+            if requeued:
+                logger.warning("requeued stale jobs: count=%s", requeued)
+            # A few heartbeats per stale window, so one slow UPDATE doesn't get the job requeued.
+            if run_next_job(db_url, worker, config_factory, heartbeat_seconds=max(1, stale_seconds // 3)):
+                continue
+        except Exception:
+            logger.exception("job worker poll failed")
+        time.sleep(poll_interval)
+
+
+def start_job_workers(
+    *,
+    db_url: str,
+    config_factory: Callable[[], dict],
+    threads: int,
+    poll_interval: int,
+    stale_seconds: int,
+    max_attempts: int,
+) -> None:
+    for _ in range(threads):
+        thread = threading.Thread(
+            target=run_worker,
+            kwargs={
+                "db_url": db_url,
+                "config_factory": config_factory,
+                "poll_interval": poll_interval,
+                "stale_seconds": stale_seconds,
+                "max_attempts": max_attempts,
+            },
+            daemon=True,
+        )
+        thread.start()
@@ -0,0 +1,223 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from psycopg.types.json import Json
+
+from ..core.db import get_conn
+
+JOB_COLUMNS = (
+    "id, kind, status, actor, params, result, error, done, total, attempts, cancel_requested, "
+    "created_at, started_at, heartbeat_at, finished_at"
+)
+
+
+class JobCancelled(Exception):
+    # Raised from a job's progress callback; handlers may attach what they finished so far.
+    def __init__(self, result: Optional[dict] = None) -> None:
+        super().__init__("job cancelled")
+        self.result = result
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _job_from_row(row, with_result: bool = True) -> dict:
+    (
+        job_id,
+        kind,
+        status,
+        actor,
+        params,
+        result,
+        error,
+        done,
+        total,
+        attempts,
+        cancel_requested,
+        created_at,
+        started_at,
+        heartbeat_at,
+        finished_at,
+    ) = row
+    progress = None
+    eta_seconds = None
+    if total:
+        progress = min(done / total, 1.0)
+        if status == "running" and started_at and 0 < done < total:
+            elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+            eta_seconds = int(elapsed / done * (total - done))
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "status": status,
+        "actor": actor,
+        "params": params or {},
+        "error": error,
+        "done": done,
+        "total": total,
+        "progress": progress,
+        "eta_seconds": eta_seconds,
+        "attempts": attempts,
+        "cancel_requested": cancel_requested,
+        "created_at": _iso(created_at),
+        "started_at": _iso(started_at),
+        "heartbeat_at": _iso(heartbeat_at),
+        "finished_at": _iso(finished_at),
+    }
+    if with_result:
+        job["result"] = result
+    return job
+
+
+def enqueue_job(db_url: str, kind: str, actor: str, params: dict, payload: Optional[bytes] = None) -> int:
+    with get_conn(db_url) as conn:
+        row = conn.execute(
+            "INSERT INTO jobs (kind, actor, params, payload) VALUES (%s, %s, %s, %s) RETURNING id",
+            (kind, actor, Json(params), payload),
+        ).fetchone()
+    return row[0]
+
+
+def get_job(db_url: str, job_id: int) -> Optional[dict]:
+    with get_conn(db_url) as conn:
+        row = conn.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = %s", (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+
+def list_jobs(db_url: str, *, kind: str = "", status: str = "", limit: int = 50) -> list[dict]:
+    where = []
+    params: list = []
+    if kind:
+        where.append("kind = %s")
+        params.append(kind)
+    if status:
+        where.append("status = %s")
+        params.append(status)
+    clause = "WHERE " + " AND ".join(where) if where else ""
+    with get_conn(db_url) as conn:
+        rows = conn.execute(
+            f"SELECT {JOB_COLUMNS} FROM jobs {clause} ORDER BY id DESC LIMIT %s",
+            params + [limit],
+        ).fetchall()
+    return [_job_from_row(row, with_result=False) for row in rows]
+
+
+def cancel_job(db_url: str, job_id: int) -> Optional[str]:
+    # Queued jobs are cancelled outright; running ones stop at their next progress report.
+    with get_conn(db_url) as conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET
+              cancel_requested = TRUE,
+              status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+              finished_at = CASE WHEN status = 'queued' THEN NOW() ELSE finished_at END,
+              payload = CASE WHEN status = 'queued' THEN NULL ELSE payload END
+            WHERE id = %s
+            RETURNING status
+            """,
+            (job_id,),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def claim_job(db_url: str, worker: str) -> Optional[dict]:
+    # SKIP LOCKED lets any number of workers poll the same queue without blocking each other.
+    with get_conn(db_url) as conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET
+              status = 'running',
+              worker = %s,
+              attempts = attempts + 1,
+              started_at = NOW(),
+              heartbeat_at = NOW()
+            WHERE id = (
+              SELECT id FROM jobs
+              WHERE status = 'queued'
+              ORDER BY created_at, id
+              FOR UPDATE SKIP LOCKED
+              LIMIT 1
+            )
+            RETURNING id, kind, actor, params, payload
+            """,
+            (worker,),
+        ).fetchone()
+    if not row:
+        return None
+    return {"id": row[0], "kind": row[1], "actor": row[2], "params": row[3] or {}, "payload": row[4]}
+
+
+def report_progress(db_url: str, job_id: int, worker: str, done: int, total: Optional[int]) -> bool:
+    # Doubles as the heartbeat; returns True once cancellation has been requested, or once the
+    # job was requeued as stale and no longer belongs to this worker.
+    with get_conn(db_url) as conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET done = %s, total = COALESCE(%s, total), heartbeat_at = NOW()
+            WHERE id = %s AND worker = %s AND status = 'running'
+            RETURNING cancel_requested
+            """,
+            (done, total, job_id, worker),
+        ).fetchone()
+    return row is None or bool(row[0])
+
+
+def touch_job(db_url: str, job_id: int, worker: str) -> bool:
+    # Heartbeat alone, for stretches with no progress to report. False once the job is no longer ours.
+    with get_conn(db_url) as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET heartbeat_at = NOW() WHERE id = %s AND worker = %s AND status = 'running'",
+            (job_id, worker),
+        )
+        return cur.rowcount > 0
+
+
+def finish_job(
+    db_url: str,
+    job_id: int,
+    worker: str,
+    status: str,
+    *,
+    result: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> bool:
+    # The payload (e.g. an uploaded CSV with initial passwords) is dropped once the job is over.
+    # Returns False when the job was requeued to another worker meanwhile and is left alone.
+    with get_conn(db_url) as conn:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET
+              status = %s,
+              result = %s,
+              error = %s,
+              payload = NULL,
+              finished_at = NOW(),
+              heartbeat_at = NOW()
+            WHERE id = %s AND worker = %s AND status = 'running'
+            """,
+            (status, Json(result) if result is not None else None, error, job_id, worker),
+        )
+        return cur.rowcount > 0
+
+
+def requeue_stale_jobs(db_url: str, stale_seconds: int, max_attempts: int) -> int:
+    # Jobs whose worker stopped heartbeating are retried, up to max_attempts in total.
+    with get_conn(db_url) as conn:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET
+              status = CASE
+                WHEN cancel_requested THEN 'cancelled'
+                WHEN attempts >= %s THEN 'failed'
+                ELSE 'queued'
+              END,
+              error = CASE WHEN attempts >= %s THEN 'worker lost' ELSE error END,
+              finished_at = CASE WHEN cancel_requested OR attempts >= %s THEN NOW() ELSE NULL END,
+              payload = CASE WHEN cancel_requested OR attempts >= %s THEN NULL ELSE payload END
+            WHERE status = 'running'
+              AND heartbeat_at < NOW() - make_interval(secs => %s)
+            """,
+            (max_attempts, max_attempts, max_attempts, max_attempts, stale_seconds),
+        )
+        return cur.rowcount
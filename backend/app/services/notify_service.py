@@ -1,22 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
 from ..core.db import get_conn
 
 
-def list_expiry_notifies(
-    db_url: str,
+def notify_where(
     *,
     username: str = "",
     status: str = "",
-    limit: int = 100,
-) -> list[dict]:
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> tuple[str, list]:
     where = []
-    params = []
+    params: list = []
     if username:
         where.append("username = %s")
         params.append(username)
     if status:
         where.append("status = %s")
         params.append(status)
-    clause = "WHERE " + " AND ".join(where) if where else ""
+    if since:
+        where.append("created_at >= %s")
+        params.append(since)
+    if until:
+        where.append("created_at < %s")
+        params.append(until)
+    return ("WHERE " + " AND ".join(where) if where else ""), params
+
+
+def list_expiry_notifies(
+    db_url: str,
+    *,
+    username: str = "",
+    status: str = "",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+) -> list[dict]:
+    clause, params = notify_where(username=username, status=status, since=since, until=until)
     sql = (
         "SELECT id, username, days_left, notify_date, status, last_error, created_at "
         "FROM password_expiry_notifies "
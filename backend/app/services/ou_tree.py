@@ -0,0 +1,234 @@
+import logging
+import re
+import threading
+import time
+from typing import Iterable, Optional
+
+from ..adapters.ldap_client import LDAPClient
+
+logger = logging.getLogger(__name__)
+
+_RDN_SPLIT = re.compile(r"(?<!\\),")
+
+
+def _parent_dn(dn: str) -> str:
+    # The first unescaped comma separates the RDN ("CN=Doe\, John") from its parent.
+    parts = _RDN_SPLIT.split(dn, 1)
+    return parts[1].strip() if len(parts) > 1 else ""
+
+
+class OUTree:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Held for a whole refresh, so a reload and a patch never run at the same time.
+        self._refresh_lock = threading.Lock()
+        # All keys are lowercased DNs; DN comparison in AD is case-insensitive.
+        self._nodes: dict[str, dict] = {}
+        self._children: dict[str, list[str]] = {}
+        self._guids: dict[str, str] = {}
+        self._direct: dict[str, int] = {}
+        self._totals: dict[str, int] = {}
+        self._loaded = False
+        self._dirty = False
+        self._position: dict = {}
+        self._counted_usn: Optional[int] = None
+        self._checked_at = 0.0
+
+    def ensure(self, ldap_client: LDAPClient, max_age: int) -> None:
+        with self._lock:
+            fresh = self._loaded and not self._dirty and time.monotonic() - self._checked_at < max_age
+        if not fresh:
+            self.refresh(ldap_client)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._dirty = True
+
+    def refresh(self, ldap_client: LDAPClient, counts: bool = False) -> None:
+        if not self._refresh_lock.acquire(blocking=False):
+            # Someone is already refreshing: wait for it and use its result. A recount still
+            # runs its own pass afterwards, since the in-flight one may not include counts.
+            with self._refresh_lock:
+                if not counts:
+                    return
+                self._refresh(ldap_client, counts)
+            return
+        try:
+            self._refresh(ldap_client, counts)
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self, ldap_client: LDAPClient, counts: bool) -> None:
+        # USNs are per DC; everything below must be read from the same one.
+        ldap_client.pin()
+        position = ldap_client.get_sync_position()
+        with self._lock:
+            loaded, dirty, previous = self._loaded, self._dirty, self._position
+        if not loaded or dirty or position["server"] != previous.get("server"):
+            self._reload(ldap_client)
+        elif position["highest_usn"] > previous["highest_usn"]:
+            since_usn = previous["highest_usn"] + 1
+            changed = list(ldap_client.iter_directory_ous(since_usn))
+            deleted = set(ldap_client.iter_deleted_guids(since_usn))
+            if not self._patch(changed, deleted):
+                self._reload(ldap_client)
+        with self._lock:
+            self._position = position
+            self._checked_at = time.monotonic()
+            recount = counts and self._counted_usn != position["highest_usn"]
+        if recount:
+            self._recount(ldap_client, position["highest_usn"])
+
+    def children(self, parent_dn: str = "") -> Optional[list[dict]]:
+        # An empty parent lists the top-level OUs; an unknown one returns None.
+        key = parent_dn.lower()
+        with self._lock:
+            if key and key not in self._nodes:
+                return None
+            return [self._item(dn) for dn in self._children.get(key, [])]
+
+    def flat(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"dn": node["dn"], "name": node["name"], "description": node["description"]}
+                for node in self._nodes.values()
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ous": len(self._nodes),
+                "loaded": self._loaded,
+                "highest_usn": self._position.get("highest_usn"),
+                "counted_usn": self._counted_usn,
+            }
+
+    def _item(self, key: str) -> dict:
+        node = self._nodes[key]
+        counted = self._counted_usn is not None
+        return {
+            "dn": node["dn"],
+            "name": node["name"],
+            "description": node["description"],
+            "parentDn": node["parent"],
+            "hasChildren": bool(self._children.get(key)),
+            "childCount": len(self._children.get(key, [])),
+            "userCount": self._direct.get(key, 0) if counted else None,
+            "totalUsers": self._totals.get(key, 0) if counted else None,
+        }
+
+    def _reload(self, ldap_client: LDAPClient) -> None:
+        nodes = {}
+        guids = {}
+        for ou in ldap_client.iter_directory_ous():
+            key = ou["dn"].lower()
+            nodes[key] = {
+                "dn": ou["dn"],
+                "name": ou["name"],
+                "description": ou["description"],
+                "parent": _parent_dn(ou["dn"]),
+                "guid": ou["guid"],
+            }
+            if ou["guid"]:
+                guids[ou["guid"]] = key
+        with self._lock:
+            self._nodes = nodes
+            self._guids = guids
+            self._loaded = True
+            self._dirty = False
+            self._reindex()
+        logger.info("OU tree loaded: ous=%s", len(nodes))
+
+    def _patch(self, changed: Iterable[dict], deleted: set[str]) -> bool:
+        # Only additions and in-place edits are patched. A rename or move changes every
+        # descendant's DN without touching its USN, so those fall back to a reload.
+        with self._lock:
+            for guid in deleted:
+                key = self._guids.get(guid)
+                if key is None:
+                    continue
+                if self._children.get(key):
+                    return False
+                self._nodes.pop(key, None)
+                self._guids.pop(guid, None)
+            for ou in changed:
+                key = ou["dn"].lower()
+                known = self._guids.get(ou["guid"]) if ou["guid"] else None
+                if known is not None and known != key:
+                    return False
+                self._nodes[key] = {
+                    "dn": ou["dn"],
+                    "name": ou["name"],
+                    "description": ou["description"],
+                    "parent": _parent_dn(ou["dn"]),
+                    "guid": ou["guid"],
+                }
+                if ou["guid"]:
+                    self._guids[ou["guid"]] = key
+            self._reindex()
+        return True
+
+    def _recount(self, ldap_client: LDAPClient, usn: int) -> None:
+        direct: dict[str, int] = {}
+        for dn in ldap_client.iter_user_dns():
+            parent = _parent_dn(dn).lower()
+            direct[parent] = direct.get(parent, 0) + 1
+        with self._lock:
+            self._direct = direct
+            self._counted_usn = usn
+            self._reindex()
+        logger.info("OU tree user counts refreshed: users=%s", sum(direct.values()))
+
+    def _reindex(self) -> None:
+        children: dict[str, list[str]] = {}
+        for key, node in self._nodes.items():
+            parent = node["parent"].lower()
+            children.setdefault(parent if parent in self._nodes else "", []).append(key)
+        for keys in children.values():
+            keys.sort(key=lambda k: (self._nodes[k]["name"] or "").lower())
+        totals: dict[str, int] = {}
+        for key, count in self._direct.items():
+            # Credit every indexed ancestor, so a node's total covers its whole subtree.
+            node_key = key
+            while node_key in self._nodes:
+                totals[node_key] = totals.get(node_key, 0) + count
+                node_key = self._nodes[node_key]["parent"].lower()
+        self._children = children
+        self._totals = totals
+
+
+_trees: dict[tuple, OUTree] = {}
+_trees_lock = threading.Lock()
+
+
+def get_ou_tree(ldap_client: LDAPClient) -> OUTree:
+    key = (ldap_client.url, ldap_client.base_dn.lower())
+    with _trees_lock:
+        tree = _trees.get(key)
+        if tree is None:
+            tree = OUTree()
+            _trees[key] = tree
+        return tree
+
+
+def start_ou_tree_loop(
+    *,
+    ldap_client_factory,
+    interval_seconds: int,
+    count_interval_seconds: int,
+) -> None:
+    def _loop() -> None:
+        last_count = 0.0
+        while True:
+            try:
+                ldap_client = ldap_client_factory()
+                counts = time.monotonic() - last_count >= count_interval_seconds
+                get_ou_tree(ldap_client).refresh(ldap_client, counts=counts)
+                if counts:
+                    last_count = time.monotonic()
+            except Exception:
+                logger.exception("OU tree refresh failed")
+            time.sleep(interval_seconds)
+
+    thread = threading.Thread(target=_loop, daemon=True)
+    thread.start()
@@ -1,12 +1,13 @@
 import threading
 import time
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Callable, Iterable, Optional
 
 from ..adapters.ldap_client import LDAPClient
 from ..core.db import get_conn
 from ..services.sms_service import send_via_aliyun
 from ..services.audit_service import write_log
+from ..services.directory_mirror import list_users_password_expiring as list_mirror_users_password_expiring
 
 
 def _today_utc() -> datetime:
@@ -58,13 +59,20 @@ def run_password_expiry_check(
     aliyun_access_key_secret: str,
     aliyun_sign_name: str,
     aliyun_template_code: str,
+    use_mirror: bool = False,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
 ) -> None:
     if not days_list:
         return
     now = _today_utc()
     notify_date = now.date().isoformat()
-    expiring = ldap_client.list_users_password_expiring(max(days_list))
-    for item in expiring:
+    if use_mirror:
+        expiring = list_mirror_users_password_expiring(db_url, max(days_list))
+    else:
+        expiring = ldap_client.iter_users_password_expiring(max(days_list))
+    for done, item in enumerate(expiring, start=1):
+        if progress:
+            progress(done, None)
         username = item.get("sAMAccountName") or ""
         days_left = item.get("days_left")
         phone = item.get("mobile") or ""
@@ -119,6 +127,8 @@ def trigger_password_expiry_check(
     aliyun_access_key_secret: str,
     aliyun_sign_name: str,
     aliyun_template_code: str,
+    use_mirror: bool = False,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
 ) -> None:
     days_list = _parse_days_list(days_value)
     if not days_list:
@@ -133,6 +143,8 @@ def trigger_password_expiry_check(
         aliyun_access_key_secret=aliyun_access_key_secret,
         aliyun_sign_name=aliyun_sign_name,
         aliyun_template_code=aliyun_template_code,
+        use_mirror=use_mirror,
+        progress=progress,
     )
 
 
@@ -146,6 +158,7 @@ def start_password_expiry_loop(
     aliyun_access_key_secret: str,
     aliyun_sign_name: str,
     aliyun_template_code: str,
+    use_mirror: bool = False,
 ) -> None:
     days_list = _parse_days_list(days_value)
     if not days_list:
@@ -165,6 +178,7 @@ def start_password_expiry_loop(
                     aliyun_access_key_secret=aliyun_access_key_secret,
                     aliyun_sign_name=aliyun_sign_name,
                     aliyun_template_code=aliyun_template_code,
+                    use_mirror=use_mirror,
                 )
             except Exception:
                 pass
@@ -0,0 +1,54 @@
+import logging
+from typing import Optional
+
+from ..adapters.ldap_client import LDAPClient
+from ..core.errors import ADConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+def validate_password(password: str, policy: dict, username: str = "") -> Optional[str]:
+    # Only the rules AD applies to the candidate itself; history and minimum age stay with AD.
+    min_length = policy.get("min_length") or 0
+    if len(password) < min_length:
+        return "min_length"
+    if not policy.get("complexity_enabled"):
+        return None
+    if len(username) >= 3 and username.lower() in password.lower():
+        return "contains_username"
+    categories = sum(
+        [
+            any(c.isupper() for c in password),
+            any(c.islower() for c in password),
+            any("0" <= c <= "9" for c in password),
+            any(not c.isalnum() for c in password),
+            # Letters without case (e.g. CJK) count as their own category in AD.
+            any(c.isalpha() and not c.isupper() and not c.islower() for c in password),
+        ]
+    )
+    if categories < 3:
+        return "complexity"
+    return None
+
+
+def check_password(
+    ldap_client: LDAPClient,
+    username: str,
+    password: str,
+    user_dn: Optional[str] = None,
+    *,
+    lookup: bool = False,
+) -> Optional[str]:
+    # Returns the violated rule, or None. Without user_dn (or lookup) only the domain policy is used.
+    try:
+        if lookup and not user_dn:
+            user_dn = ldap_client.get_user_dn(username)
+        if user_dn:
+            policy = ldap_client.get_user_password_policy(user_dn)
+        else:
+            policy = ldap_client.get_password_policy()
+    except ADConnectionError as exc:
+        # AD still enforces the policy on the modify itself.
+        logger.warning("password policy unavailable, skipping local check: user=%s error=%s", username, exc)
+        return None
+    return validate_password(password, policy, username)
@@ -1,6 +1,7 @@
 import logging
 import random
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 from ..core.db import get_conn
 from ..adapters.aliyun_sms import send_sms
@@ -104,16 +105,16 @@ def retry_pending(db_url: str, limit: int = 10) -> list[dict]:
     ]
 
 
-def list_sms(
-    db_url: str,
+def sms_where(
     *,
     username: str = "",
     scene: str = "",
     status: str = "",
-    limit: int = 100,
-) -> list[dict]:
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> tuple[str, list]:
     where = []
-    params = []
+    params: list = []
     if username:
         where.append("username ILIKE %s")
         params.append(f"%{username}%")
@@ -123,7 +124,26 @@ def list_sms(
     if status:
         where.append("send_status = %s")
         params.append(status)
-    clause = "WHERE " + " AND ".join(where) if where else ""
+    if since:
+        where.append("sent_at >= %s")
+        params.append(since)
+    if until:
+        where.append("sent_at < %s")
+        params.append(until)
+    return ("WHERE " + " AND ".join(where) if where else ""), params
+
+
+def list_sms(
+    db_url: str,
+    *,
+    username: str = "",
+    scene: str = "",
+    status: str = "",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+) -> list[dict]:
+    clause, params = sms_where(username=username, scene=scene, status=status, since=since, until=until)
     sql = (
         "SELECT id, username, phone, scene, code, send_status, send_attempts, last_error, sent_at, expires_at, used_at "
         "FROM sms_codes "
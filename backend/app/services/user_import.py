@@ -0,0 +1,200 @@
+import csv
+import gzip
+import io
+import logging
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from ..adapters.ldap_client import LDAPClient
+from ..core.errors import ADConnectionError
+from .batch_service import run_parallel
+from .jobs import JobCancelled
+from .password_policy import validate_password
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+REQUIRED_COLUMNS = ("sAMAccountName", "displayName", "ouDn", "password")
+OPTIONAL_ATTRIBUTES = ("mail", "mobile", "department", "title")
+REPORT_COLUMNS = ["row", "sAMAccountName", "displayName", "ouDn", "status", "message"]
+# Characters AD rejects in sAMAccountName.
+_INVALID_SAM_CHARS = set('"/\\[]:;|=,+*?<>@')
+
+
+class _PrefixedStream(io.RawIOBase):
+    # Replays the bytes read to sniff the format in front of a non-seekable upload stream.
+    def __init__(self, head: bytes, stream: BinaryIO) -> None:
+        self._head = head
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._head:
+            size = min(len(buffer), len(self._head))
+            buffer[:size] = self._head[:size]
+            self._head = self._head[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def open_csv(stream: BinaryIO) -> Iterator[dict]:
+    # Rows are decoded as the upload arrives; gzip is detected from the magic bytes.
+    head = stream.read(2)
+    source = io.BufferedReader(_PrefixedStream(head, stream))
+    if head == GZIP_MAGIC:
+        source = gzip.GzipFile(fileobj=source, mode="rb")
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    return csv.DictReader(text)
+
+
+def _value(row: dict, key: str) -> str:
+    return str(row.get(key) or "").strip()
+
+
+def _is_true(value: str) -> bool:
+    return value.lower() in {"1", "true", "yes"}
+
+
+def validate_rows(rows: Iterator[dict], policy: Optional[dict], max_rows: int) -> tuple[list[dict], list[dict]]:
+    # Returns (valid, report). Every row gets a report entry; invalid ones are never sent to AD.
+    valid: list[dict] = []
+    report: list[dict] = []
+    seen_names: set[str] = set()
+    seen_dns: set[str] = set()
+    for number, row in enumerate(rows, start=2):
+        if len(report) >= max_rows:
+            raise ValueError("too_many_rows")
+        item = {
+            "row": number,
+            "sAMAccountName": _value(row, "sAMAccountName"),
+            "displayName": _value(row, "displayName"),
+            "ouDn": _value(row, "ouDn"),
+            "status": "pending",
+            "message": "",
+        }
+        report.append(item)
+        username = item["sAMAccountName"]
+        password = str(row.get("password") or "")
+        user_dn = f"CN={item['displayName']},{item['ouDn']}".lower()
+        message = ""
+        missing = [column for column in REQUIRED_COLUMNS if not _value(row, column)]
+        if missing:
+            message = "missing:" + ",".join(missing)
+        elif len(username) > 20 or any(c in _INVALID_SAM_CHARS for c in username):
+            message = "invalid_username"
+        elif username.lower() in seen_names:
+            message = "duplicate_username"
+        elif user_dn in seen_dns:
+            message = "duplicate_dn"
+        elif policy is not None:
+            message = validate_password(password, policy, username) or ""
+        if message:
+            item["status"] = "invalid"
+            item["message"] = message
+            continue
+        seen_names.add(username.lower())
+        seen_dns.add(user_dn)
+        valid.append(
+            {
+                "report": item,
+                "password": password,
+                "attributes": {key: _value(row, key) for key in OPTIONAL_ATTRIBUTES},
+                "force_change": _is_true(_value(row, "forceChangeAtFirstLogin")),
+            }
+        )
+    return valid, report
+
+
+def _create(ldap_client: LDAPClient, row: dict) -> None:
+    item = row["report"]
+    try:
+        ldap_client.create_user(
+            sAMAccountName=item["sAMAccountName"],
+            displayName=item["displayName"],
+            ou_dn=item["ouDn"],
+            password=row["password"],
+            attributes=row["attributes"],
+            force_change=row["force_change"],
+        )
+        item["status"] = "created"
+    except ADConnectionError as exc:
+        item["status"] = "error"
+        item["message"] = str(exc)
+    except Exception as exc:
+        logger.exception("import row failed: row=%s username=%s", item["row"], item["sAMAccountName"])
+        item["status"] = "error"
+        item["message"] = str(exc)
+
+
+def run_import(
+    ldap_client: LDAPClient,
+    stream: BinaryIO,
+    *,
+    concurrency: int = 4,
+    max_rows: int = 20000,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    try:
+        policy = ldap_client.get_password_policy()
+    except ADConnectionError as exc:
+        logger.warning("password policy unavailable, import relies on AD checks: error=%s", exc)
+        policy = None
+    reader = open_csv(stream)
+    try:
+        columns = set(reader.fieldnames or [])
+        if not columns.issuperset(REQUIRED_COLUMNS):
+            raise ValueError("missing_columns")
+        valid, report = validate_rows(reader, policy, max_rows)
+    except (csv.Error, OSError, EOFError) as exc:
+        raise ValueError("invalid_csv") from exc
+
+    existing = ldap_client.existing_usernames(row["report"]["sAMAccountName"] for row in valid)
+    known_ous = ldap_client.existing_dns(row["report"]["ouDn"] for row in valid)
+    pending = []
+    for row in valid:
+        item = row["report"]
+        if item["sAMAccountName"].lower() in existing:
+            item["status"] = "exists"
+        elif item["ouDn"].lower() not in known_ous:
+            item["status"] = "invalid"
+            item["message"] = "ou_not_found"
+        elif dry_run:
+            item["status"] = "valid"
+        else:
+            pending.append(row)
+
+    if pending:
+        # Never run more creates at once than there are pooled connections to the DC.
+        workers = max(1, min(concurrency, ldap_client.pool_size))
+        try:
+            run_parallel(lambda row: _create(ldap_client, row), pending, workers, progress)
+        except JobCancelled as exc:
+            # Rows that never started stay "pending"; the ones already created are kept.
+            exc.result = _summary(report)
+            raise
+    return _summary(report)
+
+
+def _summary(report: list[dict]) -> dict:
+    counts: dict[str, int] = {}
+    for item in report:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return {
+        "total": len(report),
+        "created": counts.get("created", 0),
+        "errors": len(report) - counts.get("created", 0) - counts.get("valid", 0) - counts.get("pending", 0),
+        "counts": counts,
+        "items": report,
+    }
+
+
+def report_csv(items: list[dict]) -> str:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=REPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(items)
+    return output.getvalue()
@@ -0,0 +1,36 @@
+import logging
+import time
+
+from .core.config import apply_overrides, load_config
+from .core.db import init_db
+from .services.config_service import get_config
+from .services.job_worker import start_job_workers
+
+
+def _config() -> dict:
+    # Re-read per job so overrides saved through /config apply without restarting the worker.
+    config = load_config()
+    overrides = get_config(config["DB_URL"])
+    if overrides:
+        apply_overrides(config, overrides)
+    return config
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    config = _config()
+    init_db(config["DB_URL"])
+    start_job_workers(
+        db_url=config["DB_URL"],
+        config_factory=_config,
+        threads=max(config["JOB_WORKER_THREADS"], 1),
+        poll_interval=config["JOB_POLL_INTERVAL"],
+        stale_seconds=config["JOB_STALE_SECONDS"],
+        max_attempts=config["JOB_MAX_ATTEMPTS"],
+    )
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == "__main__":
+    main()
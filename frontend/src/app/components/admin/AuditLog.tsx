@@ -22,6 +22,10 @@ export function AuditLogComponent() {
   const [page, setPage] = useState(1);
   const [pageSize, setPageSize] = useState(15);
   const [total, setTotal] = useState(0);
+  const [totalEstimated, setTotalEstimated] = useState(false);
+  // 游标分页：cursors[i] 为第 i+1 页的起始游标，第 1 页为空
+  const [cursors, setCursors] = useState<string[]>(['']);
+  const [hasNext, setHasNext] = useState(false);
 
   const loadLogs = async () => {
     setIsLoading(true);
@@ -31,12 +35,14 @@ export function AuditLogComponent() {
         action?: string;
         result?: string;
         target?: string;
-        page?: number;
         pageSize?: number;
+        cursor?: string;
+        total?: 'exact' | 'estimate' | 'none';
       } = {
-        page,
         pageSize,
+        total: 'estimate',
       };
+      if (cursors[page - 1]) params.cursor = cursors[page - 1];
       if (actor.trim()) params.actor = actor.trim();
       if (target.trim()) params.target = target.trim();
       if (filterAction !== 'all') params.action = filterAction;
@@ -45,6 +51,16 @@ export function AuditLogComponent() {
       const res = await auditApi.list(params);
       setLogs(res.items || []);
       setTotal(res.total || 0);
+      setTotalEstimated(Boolean(res.totalEstimated));
+      const next = res.nextCursor || '';
+      setHasNext(Boolean(next));
+      if (next) {
+        setCursors((prev) => {
+          const updated = prev.slice(0, page);
+          updated[page] = next;
+          return updated;
+        });
+      }
     } catch (err: any) {
       toast.error(err.message || '加载审计日志失败');
     } finally {
@@ -56,14 +72,21 @@ export function AuditLogComponent() {
     loadLogs();
   }, [page, pageSize]);
 
-  useEffect(() => {
+  const resetPaging = () => {
+    setCursors(['']);
     if (page !== 1) {
       setPage(1);
     } else {
       loadLogs();
     }
+  };
+
+  useEffect(() => {
+    resetPaging();
   }, [actor, target, filterAction, filterResult]);
 
+  const totalText = `${totalEstimated ? '约 ' : ''}${total}`;
+
   const uniqueActions = useMemo(() => Array.from(new Set(logs.map((log) => log.action))), [logs]);
 
   const handleExport = async () => {
@@ -91,7 +114,7 @@ export function AuditLogComponent() {
         <div>
           <h2 className="text-2xl font-semibold">审计日志</h2>
           <p className="text-sm text-muted-foreground mt-1">查看系统操作记录</p>
-          <p className="text-sm text-muted-foreground">共 {total} 条日志</p>
+          <p className="text-sm text-muted-foreground">共 {totalText} 条日志</p>
         </div>
         <div className="flex gap-2">
           <Button variant="outline" onClick={loadLogs} disabled={isLoading}>
@@ -146,23 +169,24 @@ export function AuditLogComponent() {
             <SelectItem value="failed">失败</SelectItem>
           </SelectContent>
         </Select>
-        <Button
-          variant="outline"
-          onClick={() => {
-            setPage(1);
-            loadLogs();
-          }}
-        >
+        <Button variant="outline" onClick={resetPaging}>
           <Search className="w-4 h-4 mr-2" />
           查询
         </Button>
       </div>
 
       <div className="flex items-center justify-between">
-        <div className="text-sm text-muted-foreground">共 {total} 条</div>
+        <div className="text-sm text-muted-foreground">共 {totalText} 条</div>
         <div className="flex items-center gap-3">
           <span className="text-sm text-muted-foreground">每页</span>
-          <Select value={String(pageSize)} onValueChange={(v) => setPageSize(Number(v))}>
+          <Select
+            value={String(pageSize)}
+            onValueChange={(v) => {
+              setCursors(['']);
+              setPage(1);
+              setPageSize(Number(v));
+            }}
+          >
             <SelectTrigger className="w-24">
               <SelectValue />
             </SelectTrigger>
@@ -172,45 +196,26 @@ export function AuditLogComponent() {
               <SelectItem value="50">50</SelectItem>
             </SelectContent>
           </Select>
-          <div className="text-sm text-muted-foreground">
-            第 {Math.min(page, Math.max(1, Math.ceil(total / pageSize)))} /{' '}
-            {Math.max(1, Math.ceil(total / pageSize))} 页
-          </div>
+          <div className="text-sm text-muted-foreground">第 {page} 页</div>
           <div className="flex items-center gap-2">
+            <Button variant="outline" size="sm" onClick={() => setPage(1)} disabled={page === 1 || isLoading}>
+              首页
+            </Button>
             <Button
               variant="outline"
               size="sm"
-              onClick={() => setPage(1)}
-              disabled={page === 1}
+              onClick={() => setPage(page - 1)}
+              disabled={page === 1 || isLoading}
             >
-              首页
+              上一页
             </Button>
-            {page > 2 && <span className="text-muted-foreground text-sm">…</span>}
-            {Array.from({ length: Math.min(3, Math.max(1, Math.ceil(total / pageSize))) }, (_, idx) => {
-              const totalPages = Math.max(1, Math.ceil(total / pageSize));
-              const start = Math.max(1, Math.min(page - 1, totalPages - 2));
-              const pageNumber = start + idx;
-              return (
-                <Button
-                  key={pageNumber}
-                  variant={pageNumber === page ? 'default' : 'outline'}
-                  size="sm"
-                  onClick={() => setPage(pageNumber)}
-                >
-                  {pageNumber}
-                </Button>
-              );
-            })}
-            {page < Math.max(1, Math.ceil(total / pageSize)) - 1 && (
-              <span className="text-muted-foreground text-sm">…</span>
-            )}
             <Button
               variant="outline"
               size="sm"
-              onClick={() => setPage(Math.max(1, Math.ceil(total / pageSize)))}
-              disabled={page === Math.max(1, Math.ceil(total / pageSize))}
+              onClick={() => setPage(page + 1)}
+              disabled={!hasNext || isLoading}
             >
-              末页
+              下一页
             </Button>
           </div>
         </div>
@@ -71,7 +71,7 @@ export function OUManagement({ onRequireOtp }: { onRequireOtp?: () => Promise<vo
     try {
       const res = await userApi.list({ ou: ouDn, page: ouUsersPage, pageSize: ouUsersPageSize });
       setOuUsers(res.items || []);
-      setOuUsersTotal(res.total || 0);
+      setOuUsersTotal((prev) => (res.totalEstimated && ouUsersPage > 1 && prev ? prev : res.total || 0));
     } catch (err: any) {
       toast.error(err.message || '加载OU用户失败');
     } finally {
@@ -124,7 +124,8 @@ export function UserManagement({ onRequireOtp }: { onRequireOtp?: () => Promise<
             : undefined,
       }));
       setUsers(items);
-      setTotal(res.total || 0);
+      // Past page 1 the mirror only estimates the total; keep the exact one from page 1.
+      setTotal((prev) => (res.totalEstimated && page > 1 && prev ? prev : res.total || 0));
     } catch (err: any) {
       setError(err.message || '加载用户失败');
     } finally {
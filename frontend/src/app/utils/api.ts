@@ -150,6 +150,17 @@ export interface OU {
   parentDn?: string;
 }
 
+export interface OUTreeNode {
+  dn: string;
+  name: string;
+  description?: string | null;
+  parentDn: string;
+  hasChildren: boolean;
+  childCount: number;
+  userCount: number | null;
+  totalUsers: number | null;
+}
+
 export interface AuditLog {
   id: number;
   actor: string;
@@ -163,6 +174,15 @@ export interface AuditLog {
   after_value?: any;
 }
 
+export interface AuditStats {
+  from: string;
+  to: string;
+  interval: 'day' | 'week' | 'month';
+  total: number;
+  series: { bucket: string; total: number; failed: number }[];
+  top: Record<'action' | 'result' | 'actor_role', { key: string; count: number }[]>;
+}
+
 export interface Config {
   key: string;
   value: any;
@@ -264,7 +284,10 @@ export const authApi = {
 export const userApi = {
   // 查询用户
   list: (params?: { q?: string; ou?: string; status?: string; page?: number; pageSize?: number }) =>
-    api.get<{ items: User[]; total: number; page: number; pageSize: number }>('/users', params),
+    api.get<{ items: User[]; total: number; totalEstimated?: boolean; page: number; pageSize: number }>(
+      '/users',
+      params
+    ),
 
   // 用户详情
   detail: (username: string) =>
@@ -308,7 +331,11 @@ export const userApi = {
 
   // 批量操作
   batch: (action: string, usernames: string[]) =>
-    api.post<{ count: number }>('/users/batch', { action, usernames }),
+    api.post<{
+      count: number;
+      failed: number;
+      items: { username: string; status: 'ok' | 'not_found' | 'error'; message?: string }[];
+    }>('/users/batch', { action, usernames }),
 
   // 导出CSV
   export: (params?: { q?: string; ou?: string; status?: string }) =>
@@ -323,6 +350,10 @@ export const ouApi = {
   // OU列表
   list: () => api.get<{ items: OU[] }>('/ous'),
 
+  // OU树（按父节点懒加载）
+  tree: (parent?: string) =>
+    api.get<{ items: OUTreeNode[]; parentDn: string }>('/ous/tree', parent ? { parent } : undefined),
+
   // 创建OU
   create: (data: { name: string; parentDn: string; description?: string }) =>
     api.post<{ status: string }>('/ous', data),
@@ -336,6 +367,34 @@ export const ouApi = {
     api.delete<{ status: string }>('/ous', { dn }),
 };
 
+export interface Job {
+  id: number;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+  actor: string;
+  done: number;
+  total: number | null;
+  progress: number | null;
+  eta_seconds: number | null;
+  error: string | null;
+  result?: any;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+export const jobApi = {
+  // 任务列表
+  list: (params?: { kind?: string; status?: string; limit?: number }) =>
+    api.get<{ items: Job[] }>('/jobs', params),
+
+  // 任务详情（轮询进度）
+  get: (id: number) => api.get<{ item: Job }>(`/jobs/${id}`),
+
+  // 取消任务
+  cancel: (id: number) => api.post<{ status: string }>(`/jobs/${id}/cancel`),
+};
+
 export const auditApi = {
   // 审计日志查询
   list: (params?: {
@@ -345,11 +404,47 @@ export const auditApi = {
     target?: string;
     page?: number;
     pageSize?: number;
-  }) => api.get<{ items: AuditLog[]; total?: number; page?: number; pageSize?: number }>('/audit', params),
+    from?: string;
+    to?: string;
+    // 全文检索 detail
+    q?: string;
+    // 值发生变化的属性名，如 mobile
+    changed?: string;
+    cursor?: string;
+    total?: 'exact' | 'estimate' | 'none';
+  }) =>
+    api.get<{
+      items: AuditLog[];
+      total?: number | null;
+      totalEstimated?: boolean;
+      nextCursor?: string | null;
+      page?: number;
+      pageSize?: number;
+    }>('/audit', params),
 
   // 导出审计日志
-  export: (params?: { limit?: number }) =>
-    api.get<string>('/audit/export', params),
+  export: (params?: {
+    actor?: string;
+    action?: string;
+    result?: string;
+    target?: string;
+    from?: string;
+    to?: string;
+    q?: string;
+    changed?: string;
+    limit?: number;
+  }) => api.get<string>('/audit/export', params),
+
+  // 审计统计（按日汇总）
+  stats: (params?: {
+    from?: string;
+    to?: string;
+    interval?: 'day' | 'week' | 'month';
+    action?: string;
+    result?: string;
+    actorRole?: string;
+    top?: number;
+  }) => api.get<AuditStats>('/audit/stats', params),
 };
 
 export const configApi = {
@@ -387,6 +482,10 @@ export const passwordExpiryApi = {
   list: (params?: { username?: string; status?: string; limit?: number }) =>
     api.get<{ items: any[] }>('/password-expiry/list', params),
 
+  // 导出密码到期通知记录
+  export: (params?: { username?: string; status?: string; from?: string; to?: string }) =>
+    api.get<string>('/password-expiry/export', params),
+
   // 触发密码到期检查
   trigger: () => api.post<{ status: string }>('/password-expiry/trigger'),
 };